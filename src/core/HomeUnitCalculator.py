@@ -8,7 +8,7 @@ from datetime import datetime as dt_class
 
 import functools
 import logging
-from PyQt5.QtCore import Qt, QRegExp, QEvent, QPoint, QSize
+from PyQt5.QtCore import Qt, QRegExp, QEvent, QPoint, QSize, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont, QRegExpValidator, QIcon, QColor, QCursor, QKeySequence, QPixmap, QPainter
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout,
@@ -31,6 +31,13 @@ from src.core.db_manager import DBManager
 from src.core.encryption_utils import EncryptionUtil
 from src.core.key_manager import get_or_create_key
 from src.core.supabase_manager import SupabaseManager # New import
+from src.core.outbox import (
+    Outbox, OP_SAVE_CALCULATION, OP_SET_RENTAL_ARCHIVED, OP_DELETE_RENTAL,
+    calculation_key, rental_key, rental_archive_key,
+)
+from src.core.resilience import CLOSED as CIRCUIT_CLOSED
+from src.ui.background_workers import OutboxSyncWorker, RealtimeWorker, RentalSyncWorker, SupabaseConnectWorker
+from src.ui.connectivity_monitor import ConnectivityMonitor
 from src.ui.styles import (
     get_stylesheet, get_header_style, get_group_box_style,
     get_line_edit_style, get_button_style, get_results_group_style,
@@ -112,6 +119,13 @@ except ImportError:
 # ----------------------------------------------------------------------------------------------
 
 class MeterCalculationApp(QMainWindow):
+    # Emitted (from a worker thread) with the table name after the query cache refreshed stale results
+    cache_refreshed = pyqtSignal(str)
+    # Emitted (from whichever thread made the call) with the Supabase circuit breaker's new state
+    cloud_state_changed = pyqtSignal(str)
+    # Emitted with whether the Supabase client is usable, each time it has been (re)initialised
+    supabase_ready = pyqtSignal(bool)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Home Unit Calculator")
@@ -125,7 +139,23 @@ class MeterCalculationApp(QMainWindow):
         
         self.db_manager = DBManager()
         self.encryption_util = EncryptionUtil()
-        self.supabase_manager = SupabaseManager() # Initialize SupabaseManager
+        # The one SupabaseManager for the whole app; its client is created in the background
+        # once the window is up (see _initialize_supabase_client)
+        self.supabase_manager = SupabaseManager(db_name=self.db_manager.db_name, connect=False)
+        self._supabase_connect_worker = None
+        self._supabase_reconnect_pending = False
+        # Cloud writes are queued here and replayed in the background when online
+        self.outbox = Outbox(self.db_manager.db_name)
+        self._outbox_worker = None
+        self._outbox_rentals_synced = False
+        self._rental_sync_worker = None
+        # Row changes pushed by Supabase Realtime are applied to the open views in place
+        self._realtime_worker = None
+        self._realtime_connected = False
+        self._realtime_was_connected = False  # Set once the current feed has been subscribed
+        # Reachability of the Supabase host, probed in the background once the client is ready
+        self.connectivity = ConnectivityMonitor(self.supabase_manager, parent=self)
+        self.connectivity.status_changed.connect(self._on_connectivity_changed)
         
         self.load_info_source_combo = QComboBox()
         self.load_info_source_combo.addItems(["Load from PC (CSV)", "Load from Cloud"])
@@ -142,12 +172,26 @@ class MeterCalculationApp(QMainWindow):
         self.rental_info_tab_instance = RentalInfoTab(self)
         self.archived_info_tab_instance = ArchivedInfoTab(self)
 
-        self._initialize_supabase_client()
+        self.cache_refreshed.connect(self._on_cache_refreshed)
+        self.cloud_state_changed.connect(self._on_cloud_state_changed)
+        self.supabase_ready.connect(self._on_supabase_ready)
+        # Stale cached rows are shown at once; re-render when their background refresh lands
+        self.supabase_manager.cache.add_listener(self.cache_refreshed.emit)
+        self.supabase_manager.breaker.add_listener(self.cloud_state_changed.emit)
         self.init_ui()
         self.setup_navigation()
         self.center_window()
         self.refresh_all_rental_tabs()
 
+        # Periodically pull cloud rental changes and retry queued writes once connectivity returns
+        self._outbox_timer = QTimer(self)
+        self._outbox_timer.setInterval(30_000)
+        self._outbox_timer.timeout.connect(self.sync_rentals)
+        self._outbox_timer.start()
+        self._update_outbox_status()
+        # Runs once the event loop is up, i.e. after the window has been shown and painted
+        QTimer.singleShot(0, self._initialize_supabase_client)
+
         # Global keyboard shortcuts
         try:
             from src.ui.keyboard_navigation import KeyboardNavigationManager
@@ -157,27 +201,218 @@ class MeterCalculationApp(QMainWindow):
             print(f"Keyboard navigation failed to initialise: {nav_exc}")
 
     def check_internet_connectivity(self):
-        import socket
-        try:
-            socket.create_connection(("8.8.8.8", 53), timeout=1)
-            return True
-        except OSError:
+        """True unless Supabase is known to be unreachable. Instant: reads cached state, safe from any thread."""
+        # Fail fast while repeated errors have Supabase marked as down; the breaker lets a trial through later
+        if self.supabase_manager.breaker.is_open():
             return False
+        return self.connectivity.is_online()
+
+    def queue_cloud_write(self, op, payload, coalesce_key=None, idempotency_key=None, supersedes=()):
+        """Queues a cloud write in the outbox and starts replaying the queue in the background.
+        Returns immediately, whether or not the network is available."""
+        key = self.outbox.enqueue(op, payload, coalesce_key=coalesce_key,
+                                  idempotency_key=idempotency_key, supersedes=supersedes)
+        self._update_outbox_status()
+        self.sync_outbox()
+        return key
+
+    def queue_cloud_writes(self, op, entries):
+        """Queues several cloud writes of one kind in one transaction, as queue_cloud_write does for one.
+        :param entries: ``(payload, coalesce_key, idempotency_key, supersedes)`` per write."""
+        keys = self.outbox.enqueue_many(op, entries)
+        self._update_outbox_status()
+        self.sync_outbox()
+        return keys
+
+    def sync_outbox(self):
+        """Starts an OutboxSyncWorker if writes are pending and none is running."""
+        if self._outbox_worker is not None and self._outbox_worker.isRunning():
+            return
+        if not self.supabase_manager.is_client_initialized() or self.outbox.counts()["pending"] == 0:
+            return
+        self._outbox_worker = OutboxSyncWorker(
+            self.supabase_manager, self.db_manager.db_name,
+            connectivity_check=self.check_internet_connectivity, parent=self
+        )
+        self._outbox_worker.entry_synced.connect(self._on_outbox_entry_synced)
+        self._outbox_worker.sync_finished.connect(self._on_outbox_sync_finished)
+        self._outbox_worker.start()
 
-    def _initialize_supabase_client(self):
-        # Re-create the SupabaseManager so that it (re)initializes its client
-        # internally. This avoids calling its protected methods directly and
-        # keeps the encapsulation boundary intact.
+    def sync_rentals(self):
+        """Starts an incremental rentals sync in the background; the outbox then uploads local edits."""
+        if self._rental_sync_worker is not None and self._rental_sync_worker.isRunning():
+            return
+        if not self.supabase_manager.is_client_initialized():
+            return
+        self._rental_sync_worker = RentalSyncWorker(
+            self.supabase_manager, self.db_manager.db_name,
+            connectivity_check=self.check_internet_connectivity, parent=self
+        )
+        self._rental_sync_worker.sync_done.connect(self._on_rental_sync_done)
+        self._rental_sync_worker.error_occurred.connect(lambda msg: print(f"Rental sync failed: {msg}"))
+        self._rental_sync_worker.start()
+
+    def _on_cache_refreshed(self, table):
+        """Re-reads views showing cloud data whose cached copy was just revalidated."""
+        if table == "rental_records":
+            self.refresh_all_rental_tabs()
+        elif table == "main_calculations" and self.load_history_source_combo.currentText() == "Load from Cloud":
+            self.history_tab_instance.load_history(silent=True)
+
+    def _on_cloud_state_changed(self, state):
+        """Shows breaker changes in the status bar, and flushes queued writes once Supabase recovers."""
+        self._update_outbox_status()
+        if state == CIRCUIT_CLOSED:
+            self.sync_outbox()
+
+    def _on_connectivity_changed(self, online):
+        """Shows the connection state, and catches up with the cloud as soon as it is back."""
+        self._update_outbox_status()
+        if online:
+            self.sync_rentals()
+            self.sync_outbox()
+
+    def _on_rental_sync_done(self, pulled, pushed):
+        if pulled:
+            self.refresh_all_rental_tabs()
+        self._update_outbox_status()
+        self.sync_outbox()
+
+    def _on_outbox_entry_synced(self, op):
+        if op != OP_SAVE_CALCULATION:
+            self._outbox_rentals_synced = True
+        self._update_outbox_status()
+
+    def _on_outbox_sync_finished(self, replayed, failed):
+        self._update_outbox_status()
+        if replayed:
+            print(f"Outbox: {replayed} queued cloud write(s) synced.")
+        if self._outbox_rentals_synced:
+            self._outbox_rentals_synced = False
+            # With Realtime up, the uploaded rows come back as change events; no reload needed
+            if not self._realtime_connected:
+                self.refresh_all_rental_tabs()
+        if failed:
+            QMessageBox.warning(self, "Cloud Sync", f"{failed} queued cloud change(s) could not be applied and were set aside.")
+
+    def _update_outbox_status(self):
+        """Shows the number of queued cloud writes in the status bar."""
+        try:
+            counts = self.outbox.counts()
+        except Exception as e:
+            print(f"Error reading outbox status: {e}")
+            return
+        if counts["pending"] or counts["failed"]:
+            text = f"Cloud sync: {counts['pending']} pending"
+            if counts["failed"]:
+                text += f", {counts['failed']} failed"
+        else:
+            text = "Cloud sync: up to date"
+        if not self.connectivity.is_online():
+            text += " | Offline"
+        elif self.supabase_manager.breaker.is_open():
+            text += f" | Supabase unreachable, retrying in {self.supabase_manager.breaker.seconds_until_retry():.0f}s"
+        self.statusBar().showMessage(text)
+
+    def start_realtime(self):
+        """(Re)starts the Realtime subscription with the current Supabase credentials."""
+        self.stop_realtime()
+        self._realtime_worker = RealtimeWorker(
+            self.supabase_manager, ("rental_records", "main_calculations", "room_calculations"), parent=self
+        )
+        self._realtime_worker.change_received.connect(self._on_realtime_change)
+        self._realtime_worker.status_changed.connect(self._on_realtime_status)
+        self._realtime_worker.start()
+
+    def stop_realtime(self):
+        if self._realtime_worker is not None:
+            self._realtime_worker.change_received.disconnect()
+            self._realtime_worker.status_changed.disconnect()
+            self._realtime_worker.stop()
+            self._realtime_worker.wait(5000)
+            self._realtime_worker = None
+        self._realtime_connected = False
+        self._realtime_was_connected = False
+
+    def _on_realtime_status(self, connected):
+        reconnected = connected and not self._realtime_connected and self._realtime_was_connected
+        self._realtime_connected = connected
+        if connected:
+            self._realtime_was_connected = True
+        if reconnected:
+            self._catch_up_with_cloud()
+
+    def _catch_up_with_cloud(self):
+        """Re-reads the cloud views after a Realtime outage; changes made meanwhile sent no events."""
+        self.supabase_manager.cache.invalidate("rental_records", "main_calculations", "room_calculations")
+        self.refresh_all_rental_tabs()
+        self.sync_rentals()
+        if self.load_history_source_combo.currentText() == "Load from Cloud":
+            self.history_tab_instance.load_history(silent=True)
+
+    def _on_realtime_change(self, table, event, record, old_record):
+        """Applies one cloud row change to the views showing that table."""
+        # History reads embed room rows in main_calculations results
+        self.supabase_manager.cache.invalidate(
+            *((table, "main_calculations") if table == "room_calculations" else (table,))
+        )
+        if table == "rental_records":
+            self.rental_info_tab_instance.apply_cloud_change(event, record, old_record)
+            self.archived_info_tab_instance.apply_cloud_change(event, record, old_record)
+            # Local rows follow through the incremental pull (one small request)
+            if event != "DELETE":
+                self.sync_rentals()
+        else:
+            self.history_tab_instance.apply_cloud_change(table, event, record, old_record)
+
+    def closeEvent(self, event):
+        self.connectivity.stop()
+        self.stop_realtime()
+        if self._supabase_connect_worker is not None and self._supabase_connect_worker.isRunning():
+            self._supabase_connect_worker.wait(5000)
+        if self._rental_sync_worker is not None and self._rental_sync_worker.isRunning():
+            self._rental_sync_worker.wait(5000)
+        if self._outbox_worker is not None and self._outbox_worker.isRunning():
+            # Stop after the current entry; anything left stays queued for next start
+            self._outbox_worker.requestInterruption()
+            self._outbox_worker.wait(5000)
+        super().closeEvent(event)
 
-        self.supabase_manager = SupabaseManager()
-        
-        if self.supabase_manager.is_client_initialized():
+    def _initialize_supabase_client(self):
+        # (Re)connects the shared SupabaseManager on a worker thread: reading the keyring,
+        # decrypting the config and creating the client must not hold up the GUI.
+        # Cloud actions are enabled by supabase_ready once it finishes.
+        if self._supabase_connect_worker is not None and self._supabase_connect_worker.isRunning():
+            # A reconnect requested mid-way (e.g. config just saved) runs after the current one
+            self._supabase_reconnect_pending = True
+            return
+        self.statusBar().showMessage("Connecting to Supabase…")
+        self._supabase_connect_worker = SupabaseConnectWorker(self.supabase_manager, parent=self)
+        self._supabase_connect_worker.client_ready.connect(self.supabase_ready.emit)
+        self._supabase_connect_worker.finished.connect(self._on_supabase_connect_finished)
+        self._supabase_connect_worker.start()
+
+    def _on_supabase_connect_finished(self):
+        self._supabase_connect_worker = None
+        if self._supabase_reconnect_pending:
+            self._supabase_reconnect_pending = False
+            self._initialize_supabase_client()
+
+    def _on_supabase_ready(self, ready):
+        if ready:
             # Set default load source to Cloud if Supabase is configured
             self.load_history_source_combo.setCurrentText("Load from Cloud")
+            self.connectivity.start()
+            self.start_realtime()
+            self.sync_rentals()
+            self.sync_outbox()
         else:
             print("Supabase client not initialized. Cloud features disabled.")
+            self.connectivity.stop()
+            self.stop_realtime()
             # If Supabase fails to initialize, ensure source is PC (CSV)
             self.load_history_source_combo.setCurrentText("Load from PC (CSV)")
+        self._update_outbox_status()
 
     def init_ui(self):
         central_widget = QWidget(self)
@@ -474,8 +709,8 @@ class MeterCalculationApp(QMainWindow):
             QMessageBox.critical(self, "Save Error", f"Failed to save data to CSV: {e}\n{traceback.format_exc()}")
 
     def save_calculation_to_supabase(self):
-        if not self.supabase_manager.is_client_initialized() or not self.check_internet_connectivity():
-            QMessageBox.warning(self, "Error", "Supabase not configured or no internet.")
+        if not self.supabase_manager.is_client_initialized():
+            QMessageBox.warning(self, "Error", "Supabase not configured.")
             return
         try:
             month = self.main_tab_instance.month_combo.currentText()
@@ -553,21 +788,17 @@ class MeterCalculationApp(QMainWindow):
                     if reply == QMessageBox.No:
                         return
 
-            # Save main calculation using SupabaseManager
-            main_calc_id = self.supabase_manager.save_main_calculation(main_calc_data)
-
-            if main_calc_id:
-                # Save room calculations using SupabaseManager
-                if room_data_for_supabase:
-                    rooms_saved = self.supabase_manager.save_room_calculations(main_calc_id, room_data_for_supabase)
-                    if rooms_saved:
-                        QMessageBox.information(self, "Success", "Calculation data and room info saved to Supabase successfully!")
-                    else:
-                        QMessageBox.critical(self, "Supabase Error", "Failed to save room calculation data to Supabase.")
-                else:
-                    QMessageBox.information(self, "Success", "Main calculation data saved to Supabase successfully (no room data).")
+            # Queue the save; the outbox worker uploads it (now or once back online).
+            # Repeated saves of the same month replace each other while still queued.
+            self.queue_cloud_write(
+                OP_SAVE_CALCULATION,
+                {"main_calc_data": main_calc_data, "room_data_list": room_data_for_supabase or None},
+                coalesce_key=calculation_key(month, year),
+            )
+            if room_data_for_supabase:
+                QMessageBox.information(self, "Success", "Calculation data and room info queued for upload to Supabase.")
             else:
-                QMessageBox.critical(self, "Supabase Error", "Failed to save main calculation data to Supabase.")
+                QMessageBox.information(self, "Success", "Main calculation data queued for upload to Supabase (no room data).")
 
         except Exception as e:
             QMessageBox.critical(self, "Save Error", f"An unexpected error occurred while saving to Supabase: {e}\n{traceback.format_exc()}")
@@ -606,6 +837,74 @@ class MeterCalculationApp(QMainWindow):
         qr.moveCenter(cp)
         self.move(qr.topLeft())
 
+    def archive_rental_records(self, records, archive, source):
+        """
+        Archives or unarchives many rental records at once.
+
+        Local DB rows are updated with one statement and the tabs reloaded once. Cloud
+        records are queued in the outbox, which replays them as one ``in_()`` request; their
+        rows move between the rental tabs right away and their local copies are updated too.
+        :param records: Record dicts of the selected rows (local rows or cloud summaries).
+        :param source: The tabs' load source, "Local DB" or "Cloud (Supabase)".
+        :return: The number of records changed.
+        """
+        if source == "Local DB":
+            changed = self.db_manager.set_rentals_archived([record.get("id") for record in records], archive)
+            self.refresh_all_rental_tabs()
+            return changed
+
+        records = [record for record in records if record.get("supabase_id")]
+        self.queue_cloud_writes(OP_SET_RENTAL_ARCHIVED, [
+            ({"is_archived": archive}, rental_archive_key(record["supabase_id"]), record["supabase_id"], ())
+            for record in records
+        ])
+        self.db_manager.set_rentals_archived(
+            [record["supabase_id"] for record in records], archive, key_column="supabase_id", keep_clean=True
+        )
+        for record in records:
+            moved = dict(record, is_archived=archive)
+            self.rental_info_tab_instance.apply_cloud_change("UPDATE", moved, record)
+            self.archived_info_tab_instance.apply_cloud_change("UPDATE", moved, record)
+        return len(records)
+
+    def delete_rental_records(self, records, source):
+        """
+        Deletes many rental records at once; see archive_rental_records. Deleting cloud
+        records also deletes their local copies. Local images no remaining row uses are removed.
+        :return: The number of records deleted.
+        """
+        if source == "Local DB":
+            deleted = self.db_manager.delete_rentals([record.get("id") for record in records])
+        else:
+            records = [record for record in records if record.get("supabase_id")]
+            # Also drops any not-yet-uploaded edits or archive toggles of these records
+            self.queue_cloud_writes(OP_DELETE_RENTAL, [
+                ({}, rental_key(record["supabase_id"]), record["supabase_id"], (rental_archive_key(record["supabase_id"]),))
+                for record in records
+            ])
+            deleted = self.db_manager.delete_rentals([record["supabase_id"] for record in records], key_column="supabase_id")
+            for record in records:
+                self.rental_info_tab_instance.apply_cloud_change("DELETE", {}, record)
+                self.archived_info_tab_instance.apply_cloud_change("DELETE", {}, record)
+
+        paths = [row[column] for row in deleted for column in row.keys()]
+        image_store = self.rental_info_tab_instance.image_store
+        for path in image_store.release(paths):
+            print(f"Deleted associated local file: {path}")
+        for path in paths:
+            # Images saved before the shared store existed belong to one record each
+            if path and not image_store.contains(path) and os.path.exists(path) and self.rental_info_tab_instance._is_safe_path(path):
+                try:
+                    os.remove(path)
+                    print(f"Deleted associated local file: {path}")
+                except OSError as e:
+                    print(f"Warning: Failed to delete associated local file {path}: {e}")
+
+        if source == "Local DB":
+            self.refresh_all_rental_tabs()
+            return len(deleted)
+        return len(records)
+
     def refresh_all_rental_tabs(self):
         # This method will be called when rental info is updated
         # It should trigger a refresh in all tabs that display rental info
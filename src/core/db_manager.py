@@ -2,8 +2,56 @@ import os
 import sqlite3
 import json
 import re
+from contextlib import contextmanager
+from datetime import datetime
 from src.core.encryption_utils import EncryptionUtil
 
+# Columns of the ``rentals`` table that describe a tenant (everything except the
+# local autoincrement ``id``). Shared by single inserts and bulk imports.
+RENTAL_COLUMNS = (
+    "tenant_name", "room_number", "advanced_paid",
+    "photo_path", "nid_front_path", "nid_back_path", "police_form_path",
+    "created_at", "updated_at", "is_archived", "supabase_id",
+)
+
+RENTAL_INSERT_SQL = (
+    "INSERT OR REPLACE INTO rentals (" + ", ".join(RENTAL_COLUMNS) + ") "
+    "VALUES (" + ", ".join(f":{col}" for col in RENTAL_COLUMNS) + ")"
+)
+
+# Bulk imports add rows but never overwrite: a row already present (the same supabase_id,
+# or for a local-only row the same tenant, room and created_at) is skipped. Rows linked to
+# the cloud arrive marked as synced, so RentalSync.push does not upload them again.
+RENTAL_IMPORT_SQL = (
+    "INSERT OR IGNORE INTO rentals (" + ", ".join(RENTAL_COLUMNS) + ", synced_at) "
+    "SELECT " + ", ".join(f":{col}" for col in RENTAL_COLUMNS) + ", "
+    "CASE WHEN :supabase_id IS NOT NULL THEN :updated_at END "
+    "WHERE :supabase_id IS NOT NULL OR NOT EXISTS ("
+    "SELECT 1 FROM rentals WHERE supabase_id IS NULL AND tenant_name = :tenant_name "
+    "AND room_number = :room_number AND created_at IS :created_at)"
+)
+
+# Keys per ``IN (...)`` list; older SQLite builds allow at most 999 bound parameters.
+IN_CLAUSE_CHUNK = 500
+
+
+@contextmanager
+def plain_connection(db_name: str):
+    """
+    A short-lived SQLite connection (rows as ``sqlite3.Row``) that commits on
+    success and rolls back on error. For helpers called per image, per upload
+    chunk or per status refresh, often from worker threads: unlike DBManager it
+    neither reads the encryption key from the keyring nor bootstraps app_config.
+    """
+    conn = sqlite3.connect(db_name)
+    conn.row_factory = sqlite3.Row
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
 class DBManager:
     def __init__(self, db_name="app_config.db"):
         self.db_name = db_name
@@ -98,6 +146,17 @@ class DBManager:
                     if "duplicate column name" not in str(e):
                         raise # Re-raise other operational errors
             
+            # Add synced_at (the updated_at value last exchanged with the cloud) for incremental sync.
+            # Existing rows are assumed to be in sync with the cloud copy they came from.
+            if 'synced_at' not in column_names:
+                try:
+                    self.execute_query("ALTER TABLE rentals ADD COLUMN synced_at TEXT;")
+                    self.execute_query("UPDATE rentals SET synced_at = updated_at WHERE supabase_id IS NOT NULL;")
+                    print("Added 'synced_at' column to rentals table.")
+                except sqlite3.OperationalError as e:
+                    if "duplicate column name" not in str(e):
+                        raise # Re-raise other operational errors
+
             # Now, create a unique index on the column.
             # This is the recommended way to add a unique constraint to an existing table in SQLite.
             try:
@@ -172,6 +231,50 @@ class DBManager:
             print(f"An unexpected error occurred during query execution: {e}")
             raise
 
+    def iter_query(self, query: str, params: tuple | dict | None = None, batch_size: int = 500):
+        """
+        Lazily yields the rows of a SELECT query.
+
+        A dedicated cursor is used and rows are pulled with ``fetchmany`` so that
+        only ``batch_size`` rows are held in memory at a time, no matter how large
+        the result set is. The shared ``self.cursor`` is left untouched.
+
+        :param query: The SELECT statement to run.
+        :param params: Optional positional or named parameters.
+        :param batch_size: Number of rows fetched from SQLite per round.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(query, params if params is not None else ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        except sqlite3.Error as e:
+            print(f"Database query error: {e}\nQuery: {query}\nParams: {params}")
+            raise
+        finally:
+            cursor.close()
+
+    def execute_many(self, query: str, seq_of_params) -> int:
+        """
+        Executes a data-modifying query once per parameter set inside a single
+        transaction. Either every row is written or, on error, none are.
+
+        :param query: The INSERT/UPDATE/DELETE statement.
+        :param seq_of_params: Iterable of tuples or dicts.
+        :return: The number of rows affected.
+        :raises sqlite3.Error: If any statement fails (the batch is rolled back).
+        """
+        try:
+            with self.conn:  # Commits on success, rolls back on exception
+                cursor = self.conn.executemany(query, seq_of_params)
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Database batch error: {e}\nQuery: {query}")
+            raise
+
     def create_table(self, query: str):
         """
         Executes a CREATE TABLE query.
@@ -266,16 +369,81 @@ class DBManager:
         ``record_data`` follows the structure assembled in RentalInfoTab.save_rental_record.
         Extra keys are ignored.
         """
-        insert_sql = (
-            "INSERT OR REPLACE INTO rentals (tenant_name, room_number, advanced_paid, "
-            "photo_path, nid_front_path, nid_back_path, police_form_path, "
-            "created_at, updated_at, is_archived, supabase_id) "
-            "VALUES (:tenant_name, :room_number, :advanced_paid, :photo_path, "
-            ":nid_front_path, :nid_back_path, :police_form_path, :created_at, :updated_at, "
-            ":is_archived, :supabase_id)"
-        )
         # Execute and return the lastrowid
-        return int(self.execute_query(insert_sql, record_data))
+        return int(self.execute_query(RENTAL_INSERT_SQL, record_data))
+
+    def insert_rental_records(self, records: list[dict]) -> int:
+        """Insert many rental records in one transaction and return how many were written.
+
+        Each dict must provide every key in ``RENTAL_COLUMNS``. Records already
+        present are skipped (see ``RENTAL_IMPORT_SQL``), so importing a file twice
+        adds nothing the second time.
+        """
+        if not records:
+            return 0
+        return self.execute_many(RENTAL_IMPORT_SQL, records)
+
+    @staticmethod
+    def _rental_key_column(key_column: str) -> str:
+        if key_column not in ("id", "supabase_id"):
+            raise ValueError(f"Rentals can be selected by id or supabase_id, not {key_column!r}")
+        return key_column
+
+    def set_rentals_archived(self, keys: list, is_archived: bool, key_column: str = "id", keep_clean: bool = False) -> int:
+        """Set the archive flag of many rentals with one UPDATE per 500 keys, in one transaction.
+
+        :param keys: Values of *key_column* selecting the rows.
+        :param key_column: ``"id"`` or ``"supabase_id"``.
+        :param keep_clean: The change is being sent to the cloud separately (through the outbox);
+                           rows with no other unsynced edit stay marked as synced so
+                           ``RentalSync.push`` does not upload them again.
+        :return: The number of rows updated.
+        """
+        column = self._rental_key_column(key_column)
+        keys = [key for key in keys if key is not None]
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        synced_at = "CASE WHEN synced_at = updated_at THEN :now ELSE synced_at END" if keep_clean else "synced_at"
+        updated = 0
+        try:
+            with self.conn:
+                for start in range(0, len(keys), IN_CLAUSE_CHUNK):
+                    chunk = keys[start:start + IN_CLAUSE_CHUNK]
+                    names = {f"k{i}": key for i, key in enumerate(chunk)}
+                    cursor = self.conn.execute(
+                        f"UPDATE rentals SET is_archived = :is_archived, updated_at = :now, synced_at = {synced_at} "
+                        f"WHERE {column} IN ({', '.join(':' + name for name in names)})",
+                        {"is_archived": 1 if is_archived else 0, "now": now, **names},
+                    )
+                    updated += cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Database error archiving rentals: {e}")
+            raise
+        return updated
+
+    def delete_rentals(self, keys: list, key_column: str = "id") -> list[sqlite3.Row]:
+        """Delete many rentals with one DELETE per 500 keys, in one transaction.
+
+        :param keys: Values of *key_column* selecting the rows.
+        :param key_column: ``"id"`` or ``"supabase_id"``.
+        :return: The deleted rows' image paths, so unreferenced files can be released.
+        """
+        column = self._rental_key_column(key_column)
+        keys = [key for key in keys if key is not None]
+        deleted = []
+        try:
+            with self.conn:
+                for start in range(0, len(keys), IN_CLAUSE_CHUNK):
+                    chunk = keys[start:start + IN_CLAUSE_CHUNK]
+                    where = f"WHERE {column} IN ({', '.join('?' * len(chunk))})"
+                    # Not DELETE ... RETURNING: that needs SQLite 3.35, newer than some supported Pythons ship
+                    deleted += self.conn.execute(
+                        f"SELECT photo_path, nid_front_path, nid_back_path, police_form_path FROM rentals {where}", chunk
+                    ).fetchall()
+                    self.conn.execute(f"DELETE FROM rentals {where}", chunk)
+        except sqlite3.Error as e:
+            print(f"Database error deleting rentals: {e}")
+            raise
+        return deleted
 
 if __name__ == "__main__":
     # Example usage and testing
@@ -0,0 +1,218 @@
+"""Shared HTTP session and on-disk cache for remote images.
+
+All image downloads go through one ``requests.Session`` so connections to
+Supabase Storage are pooled and kept alive instead of paying a TCP and TLS
+handshake per image.
+
+:class:`HttpCache` keeps downloaded bodies in ``data/http_cache`` and follows
+the response's caching headers:
+
+* within ``Cache-Control: max-age`` (Storage serves objects with the
+  ``cacheControl`` they were uploaded with) the file on disk is used with no
+  network I/O at all. URLs carrying a content digest never change and never
+  expire;
+* after that the copy is revalidated with ``If-None-Match`` /
+  ``If-Modified-Since``; a ``304`` costs no body transfer;
+* if the network is down, an expired copy is served rather than nothing.
+
+Each entry is a body file plus a ``.json`` sidecar with its headers. The
+cache is capped at ``max_bytes``; the least recently used entries (by body
+mtime, bumped on every hit) are evicted first.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.core.image_store import ImageStore
+
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+
+# Freshness for responses without max-age/Expires: a tenth of the time since
+# Last-Modified (the usual HTTP heuristic), at most a day.
+_HEURISTIC_FRACTION = 0.1
+_MAX_HEURISTIC_SECONDS = 24 * 3600
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session used for image downloads."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            # Matches the app's other downloads: bundled executables may lack a CA store
+            session.verify = False
+            _session = session
+        return _session
+
+
+def _expires_at(headers, now: float) -> float:
+    """Absolute time until which a response may be used without revalidation."""
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    if "no-cache" in directives or "no-store" in directives:
+        return 0.0
+    if directives.get("max-age", "").isdigit():
+        return now + int(directives["max-age"])
+    try:
+        if headers.get("Expires"):
+            return parsedate_to_datetime(headers["Expires"]).timestamp()
+        if headers.get("Last-Modified"):
+            age = now - parsedate_to_datetime(headers["Last-Modified"]).timestamp()
+            return now + min(max(age, 0) * _HEURISTIC_FRACTION, _MAX_HEURISTIC_SECONDS)
+    except (TypeError, ValueError):
+        pass
+    return 0.0
+
+
+class HttpCache:
+    CACHE_DIR = Path.cwd() / "data" / "http_cache"
+
+    def __init__(self, cache_dir: str | os.PathLike | None = None, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir) if cache_dir else self.CACHE_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / key, self.cache_dir / f"{key}.json"
+
+    def _load_meta(self, meta_path: Path) -> dict | None:
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def fetch(self, url: str, timeout: int = 15) -> Path:
+        """
+        Returns a local file with the body of *url*, downloading or revalidating only
+        when the cached copy (if any) is no longer fresh. Safe to call from any thread.
+        :raises requests.RequestException: If the URL cannot be fetched and nothing is cached.
+        """
+        body_path, meta_path = self._paths(url)
+        meta = self._load_meta(meta_path) if body_path.exists() else None
+        now = time.time()
+
+        if meta is not None and now < meta.get("expires", 0):
+            self._touch(body_path)
+            return body_path
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            resp = get_session().get(url, headers=headers, timeout=timeout, stream=True)
+        except requests.RequestException as e:
+            if meta is not None:
+                print(f"Could not revalidate {url} ({e}); using cached copy")
+                self._touch(body_path)
+                return body_path
+            raise
+
+        with resp:
+            if resp.status_code == 304 and meta is not None:
+                meta["expires"] = self._expiry(url, resp.headers, now)
+                self._write_meta(meta_path, meta)
+                self._touch(body_path)
+                return body_path
+            resp.raise_for_status()
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as tmp:
+                    for chunk in resp.iter_content(chunk_size=64 * 1024):
+                        tmp.write(chunk)
+                os.replace(tmp_path, body_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        self._write_meta(meta_path, {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "expires": self._expiry(url, resp.headers, now),
+        })
+        self._evict()
+        return body_path
+
+    @staticmethod
+    def _expiry(url: str, headers, now: float) -> float:
+        if ImageStore.digest_of(url):
+            return float("inf")  # Content-addressed object: its URL changes whenever its bytes do
+        return _expires_at(headers, now)
+
+    @staticmethod
+    def _touch(body_path: Path):
+        try:
+            os.utime(body_path)  # Marks the entry as recently used for LRU eviction
+        except OSError:
+            pass
+
+    @staticmethod
+    def _write_meta(meta_path: Path, meta: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=meta_path.parent, suffix=".part")
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+            json.dump(meta, tmp)
+        os.replace(tmp_path, meta_path)
+
+    def _evict(self):
+        """Deletes least recently used entries until the cache fits in ``max_bytes``."""
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self.cache_dir.iterdir():
+                if path.suffix:  # Sidecars and partial downloads go with their body
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            for _mtime, size, path in sorted(entries):
+                for victim in (path, path.with_suffix(".json")):
+                    try:
+                        victim.unlink()
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+
+_default_cache: HttpCache | None = None
+_default_cache_lock = threading.Lock()
+
+
+def default_http_cache() -> HttpCache:
+    """Return the shared cache under ``data/http_cache``."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+        return _default_cache
@@ -0,0 +1,273 @@
+"""Content-addressed, deduplicated storage for tenant document images.
+
+Every image is stored once under ``data/images/<sha256><ext>``, where the
+extension is derived from the file's magic bytes. The same NID scan selected
+twice, or downloaded again from Supabase Storage, therefore maps to the same
+blob and is never rewritten.
+
+Blobs are reference-counted from the image path columns of the local
+``rentals`` table and, when an outbox is given, from the payloads of queued
+cloud saves; :meth:`ImageStore.release` and :meth:`ImageStore.collect_garbage`
+only remove blobs nothing points at.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import urllib.parse
+from datetime import datetime
+from pathlib import Path
+
+# Image path columns of the local ``rentals`` table that may reference a blob
+RENTAL_IMAGE_COLUMNS = ("photo_path", "nid_front_path", "nid_back_path", "police_form_path")
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_CHUNK_SIZE = 1024 * 1024
+_STALE_PART_SECONDS = 3600
+
+# (magic prefix, extension, MIME type). WEBP is checked separately since its
+# signature is split around the RIFF chunk size.
+_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", ".png", "image/png"),
+    (b"GIF87a", ".gif", "image/gif"),
+    (b"GIF89a", ".gif", "image/gif"),
+    (b"BM", ".bmp", "image/bmp"),
+    (b"%PDF-", ".pdf", "application/pdf"),
+)
+
+
+def sniff_image_type(head: bytes) -> tuple[str, str]:
+    """Return ``(extension, mime_type)`` for the leading bytes of a file."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp", "image/webp"
+    for magic, ext, mime in _SIGNATURES:
+        if head.startswith(magic):
+            return ext, mime
+    return ".img", "application/octet-stream"
+
+
+def hash_file(file_path: str | os.PathLike) -> str:
+    """Return the hex SHA-256 of a file, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ImageStore:
+    def __init__(self, root_dir: str | os.PathLike, db_manager, outbox=None):
+        """
+        :param outbox: Optional ``Outbox``; blobs its queued payloads name count as referenced,
+                       so a cloud-only save still waiting to upload keeps its images.
+        """
+        self.root = Path(root_dir)
+        self.db_manager = db_manager
+        self.outbox = outbox
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._create_table()
+
+    def _create_table(self):
+        """Creates the table remembering which blob each remote URL resolved to."""
+        try:
+            self.db_manager.create_table("""
+                CREATE TABLE IF NOT EXISTS image_url_index (
+                    url TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    created_at TEXT
+                )
+            """)
+        except sqlite3.Error as e:
+            print(f"Error creating image_url_index table: {e}")
+            raise
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def digest_of(path_or_url: str | None) -> str | None:
+        """Return the SHA-256 encoded in a store file name or URL, if it has one."""
+        if not path_or_url:
+            return None
+        name = urllib.parse.urlparse(str(path_or_url)).path if str(path_or_url).lower().startswith("http") else str(path_or_url)
+        stem = Path(name).stem.lower()
+        return stem if _DIGEST_RE.match(stem) else None
+
+    def path_for(self, digest: str, ext: str) -> Path:
+        return self.root / f"{digest}{ext}"
+
+    def find_blob(self, digest: str) -> Path | None:
+        """Return the stored blob for *digest*, whatever extension it was sniffed with."""
+        for ext in {e for _, e, _ in _SIGNATURES} | {".webp", ".img"}:
+            candidate = self.path_for(digest, ext)
+            if candidate.exists():
+                return candidate
+        return None
+
+    def contains(self, path: str | None) -> bool:
+        """True if *path* is a blob managed by this store."""
+        if not path or str(path).lower().startswith("http"):
+            return False
+        p = Path(path)
+        return p.parent.resolve() == self.root.resolve() and self.digest_of(p.name) is not None
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+
+    def _commit_temp(self, tmp_path: str, digest: str, ext: str) -> Path:
+        dest = self.path_for(digest, ext)
+        if dest.exists():
+            os.remove(tmp_path)  # Identical content already stored
+        else:
+            os.replace(tmp_path, dest)
+        return dest
+
+    def add_file(self, source_path: str | os.PathLike) -> Path:
+        """
+        Adds a local file to the store and returns the blob path.
+
+        Files already in the store are returned untouched; otherwise the file is
+        hashed while being copied to a temp file in the store directory, so the
+        content is read exactly once.
+        """
+        if self.contains(str(source_path)):
+            return Path(source_path)
+
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp, open(source_path, "rb") as src:
+                head = b""
+                for chunk in iter(lambda: src.read(_CHUNK_SIZE), b""):
+                    if not head:
+                        head = chunk[:16]
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            ext, _mime = sniff_image_type(head)
+            return self._commit_temp(tmp_path, digest.hexdigest(), ext)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def add_url(self, url: str, timeout: int = 15) -> Path:
+        """
+        Returns a local blob for a remote image, downloading it only if the
+        content is not already stored.
+
+        Content-addressed uploads carry their digest in the URL, so those never
+        need a download. Other URLs are downloaded once and remembered in
+        ``image_url_index``.
+        """
+        digest = self.digest_of(url)
+        if digest is None:
+            row = self.db_manager.execute_query(
+                "SELECT sha256 FROM image_url_index WHERE url = ?", (url,), fetch_one=True
+            )
+            digest = row["sha256"] if row else None
+        if digest:
+            blob = self.find_blob(digest)
+            if blob is not None:
+                return blob
+
+        from src.core.http_cache import get_session  # Imported lazily; only needed when a download is unavoidable
+
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as tmp, get_session().get(url, timeout=timeout, stream=True) as resp:
+                resp.raise_for_status()
+                head = b""
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    if not head:
+                        head = chunk[:16]
+                    hasher.update(chunk)
+                    tmp.write(chunk)
+            ext, _mime = sniff_image_type(head)
+            blob = self._commit_temp(tmp_path, hasher.hexdigest(), ext)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.db_manager.execute_query(
+            "INSERT OR REPLACE INTO image_url_index (url, sha256, created_at) VALUES (?, ?, ?)",
+            (url, hasher.hexdigest(), datetime.now().isoformat()),
+        )
+        print(f"Downloaded remote image to {blob}")
+        return blob
+
+    # ------------------------------------------------------------------
+    # Reference counting / garbage collection
+    # ------------------------------------------------------------------
+
+    def reference_counts(self) -> dict[str, int]:
+        """Return ``{digest: number of rentals image columns and queued outbox payloads pointing at it}``."""
+        union = " UNION ALL ".join(f"SELECT {col} AS path FROM rentals" for col in RENTAL_IMAGE_COLUMNS)
+        rows = list(self.db_manager.execute_query(
+            f"SELECT path, COUNT(*) FROM ({union}) WHERE path IS NOT NULL GROUP BY path"
+        ))
+        if self.outbox is not None:
+            rows.extend((path, 1) for path in self.outbox.referenced_paths())
+        counts: dict[str, int] = {}
+        for path, count in rows:
+            digest = self.digest_of(path) if self.contains(path) else None
+            if digest:
+                counts[digest] = counts.get(digest, 0) + count
+        return counts
+
+    def release(self, paths) -> list[str]:
+        """
+        Deletes the given blobs if no rentals row references them any more.
+        Call after the referencing row was removed or changed.
+
+        :return: The blob paths that were actually deleted.
+        """
+        counts = self.reference_counts()
+        removed = []
+        for path in {p for p in paths if self.contains(p)}:
+            if counts.get(self.digest_of(path), 0) == 0 and os.path.exists(path):
+                try:
+                    os.remove(path)
+                    removed.append(str(path))
+                except OSError as e:
+                    print(f"Warning: Failed to delete unreferenced image {path}: {e}")
+        return removed
+
+    def collect_garbage(self, dry_run: bool = False) -> list[str]:
+        """
+        Removes every store blob that no rentals row references, along with
+        stale ``.part`` files from interrupted writes.
+
+        :param dry_run: Only report what would be deleted.
+        :return: Paths that were (or would be) deleted.
+        """
+        counts = self.reference_counts()
+        stale_before = time.time() - _STALE_PART_SECONDS
+        orphans = []
+        for entry in self.root.iterdir():
+            if not entry.is_file():
+                continue
+            digest = self.digest_of(entry.name)
+            if entry.suffix == ".part":
+                if entry.stat().st_mtime < stale_before:  # Leave in-flight writes alone
+                    orphans.append(str(entry))
+            elif digest and counts.get(digest, 0) == 0:
+                orphans.append(str(entry))
+
+        if not dry_run:
+            for path in orphans:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Warning: Failed to delete orphaned image {path}: {e}")
+            removed_digests = [(d,) for d in (self.digest_of(p) for p in orphans) if d]
+            if removed_digests:
+                self.db_manager.execute_many("DELETE FROM image_url_index WHERE sha256 = ?", removed_digests)
+        print(f"Image store GC: {len(orphans)} orphaned blob(s){' (dry run)' if dry_run else ' removed'}.")
+        return orphans
@@ -0,0 +1,864 @@
+"""Local stand-in for the Supabase endpoints the app uses.
+
+Serves, from memory, the subset of the REST API that ``SupabaseManager`` and
+``ResumableUploader`` call, so cloud code paths can be exercised and measured
+without a Supabase project:
+
+* **PostgREST** (``/rest/v1/<table>``): ``select`` with column lists, JSON
+  paths (``main_data->field``) and embedded child tables
+  (``room_calculations(...)``); the ``eq``/``neq``/``gt``/``gte``/``lt``/``lte``/
+  ``in``/``is`` filters, negated with ``not.``, and ``or=(...)`` with nested ``and(...)``; ``order``;
+  ``limit``/``offset`` and the ``Range`` header; ``insert`` (and upsert with
+  ``Prefer: resolution=merge-duplicates``), ``update`` and ``delete``.
+* **RPC**: ``save_calculation`` and ``history_monthly_totals``, ported from
+  the SQL in ``supabase/migrations``. Any other function answers ``PGRST202``
+  like an undeployed one.
+* **Storage**: object upload (single request and TUS resumable), public
+  download, ``list`` and ``remove``. ``get_public_url`` is built by the client
+  and resolves to the public download route.
+
+Realtime is not served; ``RealtimeFeed`` just keeps retrying.
+
+A :class:`FaultProfile` adds latency, limits bandwidth and fails a share of
+requests with ``503``. Faults are drawn from a seeded random generator, and
+every request is counted per route, so a benchmark run with the same seed and
+the same request sequence sees the same faults and can assert on round trips.
+
+Run it with ``python -m src.core.local_supabase --port 54321 --latency 80``
+and enter the printed URL and key in the "Supabase Config" tab, or start
+:class:`LocalSupabaseServer` from a script.
+"""
+import argparse
+import base64
+import copy
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# supabase-py rejects keys that are not JWT-shaped; the stand-in accepts any key.
+ANON_KEY = ".".join(
+    base64.urlsafe_b64encode(json.dumps(part).encode("utf-8")).decode("ascii").rstrip("=")
+    for part in ({"alg": "HS256", "typ": "JWT"}, {"role": "anon", "iss": "local-supabase"})
+) + ".local"
+
+# Child tables embedded by ``select=...,child(...)``, and the column pointing at the parent's id.
+FOREIGN_KEYS = {
+    ("main_calculations", "room_calculations"): "main_calculation_id",
+}
+
+# Filled with the current time on insert, like the real tables' column default.
+# updated_at is not filled in: the app writes it.
+CREATED_AT_COLUMN = "created_at"
+
+# Tables whose changed_at is set to the current time on every insert and update,
+# like the trigger in the rental_records_changed_at migration.
+CHANGED_AT_TABLES = ("rental_records",)
+
+_TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}")
+_AMOUNT_RE = re.compile(r"^[-+]?([0-9]+(\.[0-9]*)?|\.[0-9]+)$")
+_THROTTLE_CHUNK = 16 * 1024
+
+
+class PostgrestError(Exception):
+    """An error answered in PostgREST's JSON shape."""
+
+    def __init__(self, status: int, code: str, message: str, details: str | None = None):
+        super().__init__(message)
+        self.status = status
+        self.body = {"code": code, "message": message, "details": details, "hint": None}
+
+
+@dataclass
+class FaultProfile:
+    """
+    Network conditions imposed on every request.
+    :param latency_ms: Delay added before each response.
+    :param jitter_ms: Extra delay drawn uniformly from ``[0, jitter_ms]``.
+    :param bandwidth_kbps: Cap on request and response bodies in KiB/s (0 for unlimited).
+    :param error_rate: Share of requests answered with ``503`` instead of being served.
+    :param seed: Seed of the generator that draws jitter and failures.
+    """
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    bandwidth_kbps: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _normalise_timestamp(value):
+    """Timestamps come back from timestamptz columns in UTC, whatever offset they were written with."""
+    if isinstance(value, str) and _TIMESTAMP_RE.match(value):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.astimezone(timezone.utc).isoformat()
+    return value
+
+
+def _split_top_level(text: str, sep: str = ",") -> list[str]:
+    """Splits on *sep* outside parentheses and double quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == sep and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current or parts:
+        parts.append("".join(current))
+    return [part.strip() for part in parts]
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+
+def _coerce(raw: str, sample):
+    """Converts a filter operand to the type of the column value it is compared with."""
+    if isinstance(sample, bool):
+        return raw.lower() == "true"
+    if isinstance(sample, (int, float)):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    if isinstance(sample, str) and _TIMESTAMP_RE.match(sample) and _TIMESTAMP_RE.match(raw):
+        return _normalise_timestamp(raw)
+    return raw
+
+
+def _comparable(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    return float(value)
+
+
+def _matches(row: dict, column: str, op: str, operand: str) -> bool:
+    value = row.get(column)
+    if op == "is":
+        operand = operand.lower()
+        return value is None if operand == "null" else value is (operand == "true")
+    if op == "in":
+        members = [_unquote(m) for m in _split_top_level(operand.strip()[1:-1])] if operand.startswith("(") else []
+        return value is not None and any(_comparable(value) == _coerce(m, value) for m in members)
+    if value is None:
+        return False
+    target = _coerce(_unquote(operand), value)
+    value = _comparable(value)
+    try:
+        if op == "eq":
+            return value == target
+        if op == "neq":
+            return value != target
+        if op == "gt":
+            return value > target
+        if op == "gte":
+            return value >= target
+        if op == "lt":
+            return value < target
+        if op == "lte":
+            return value <= target
+    except TypeError:
+        return False
+    raise PostgrestError(400, "PGRST100", f'"failed to parse filter ({op})"')
+
+
+def _logic_matches(row: dict, expression: str, conjunction) -> bool:
+    """Evaluates the inside of ``or=(...)`` / ``and(...)``."""
+    results = []
+    for term in _split_top_level(expression):
+        if term.startswith(("and(", "or(")):
+            name, _, rest = term.partition("(")
+            results.append(_logic_matches(row, rest[:-1], all if name == "and" else any))
+        else:
+            column, op, operand = term.split(".", 2)
+            negate = op == "not"
+            if negate:
+                op, _, operand = operand.partition(".")
+            results.append(_matches(row, column, op, operand) != negate)
+    return conjunction(results)
+
+
+class LocalSupabase:
+    """The in-memory database and bucket store behind :class:`LocalSupabaseServer`."""
+
+    def __init__(self, tables: dict[str, list[dict]] | None = None):
+        """:param tables: Initial rows per table, e.g. loaded from a JSON seed file."""
+        self.tables: dict[str, list[dict]] = {}
+        self.buckets: dict[str, dict[str, dict]] = {}
+        self._last_ids: dict[str, int] = {}
+        self._uploads: dict[str, dict] = {}
+        self._lock = threading.RLock()
+        for table, rows in (tables or {}).items():
+            self.tables[table] = []
+            for row in rows:
+                self._insert_row(table, dict(row))
+
+    # ------------------------------------------------------------------
+    # Rows
+    # ------------------------------------------------------------------
+
+    def _rows(self, table: str) -> list[dict]:
+        return self.tables.setdefault(table, [])
+
+    def _insert_row(self, table: str, row: dict) -> dict:
+        # ids behave like a bigint identity column; explicit (e.g. seeded) ids move it forward
+        if row.get("id") is None:
+            row["id"] = self._last_ids.get(table, 0) + 1
+        if isinstance(row["id"], int):
+            self._last_ids[table] = max(self._last_ids.get(table, 0), row["id"])
+        row.setdefault(CREATED_AT_COLUMN, _now())
+        if table in CHANGED_AT_TABLES:
+            row["changed_at"] = _now()
+        row = {key: _normalise_timestamp(value) for key, value in row.items()}
+        self._rows(table).append(row)
+        return row
+
+    @staticmethod
+    def _filtered(rows: list[dict], filters: list[tuple[str, str]]) -> list[dict]:
+        for column, expression in filters:
+            if column in ("or", "and"):
+                conjunction = any if column == "or" else all
+                rows = [row for row in rows if _logic_matches(row, expression.strip()[1:-1], conjunction)]
+            elif "." in column:
+                continue  # Filters on embedded tables are not needed by the app
+            else:
+                op, _, operand = expression.partition(".")
+                negate = op == "not"
+                if negate:
+                    op, _, operand = operand.partition(".")
+                rows = [row for row in rows if _matches(row, column, op, operand) != negate]
+        return rows
+
+    @staticmethod
+    def _ordered(rows: list[dict], order: list[str]) -> list[dict]:
+        rows = list(rows)
+        for spec in reversed(order):
+            column, *modifiers = spec.split(".")
+            desc = "desc" in modifiers
+            nulls_first = "nullsfirst" in modifiers or (desc and "nullslast" not in modifiers)
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present.sort(key=lambda row: _comparable(row[column]), reverse=desc)
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    def project(self, table: str, row: dict, select: str) -> dict:
+        """Shapes *row* as ``select=`` asks: columns, ``alias:column``, JSON paths and embedded children."""
+        result = {}
+        for item in _split_top_level(select or "*"):
+            if not item:
+                continue
+            alias, _, expression = item.partition(":") if ":" in item.split("(")[0] else ("", "", item)
+            if expression == "*":
+                result.update(copy.deepcopy(row))
+            elif "(" in expression:
+                child, _, columns = expression.partition("(")
+                child = child.split("!")[0]
+                fk = FOREIGN_KEYS.get((table, child), f"{table.rstrip('s')}_id")
+                children = [r for r in self._rows(child) if r.get(fk) == row.get("id")]
+                result[alias or child] = [self.project(child, r, columns[:-1]) for r in children]
+            elif "->" in expression:
+                path = re.split(r"->>?", expression)
+                value = row.get(path[0])
+                for key in path[1:]:
+                    value = value.get(key) if isinstance(value, dict) else None
+                if re.findall(r"->>?", expression)[-1] == "->>" and value is not None and not isinstance(value, str):
+                    value = json.dumps(value)
+                result[alias or path[-1]] = copy.deepcopy(value)
+            else:
+                result[alias or expression] = copy.deepcopy(row.get(expression))
+        return result
+
+    def select(self, table: str, select: str, filters, order, offset: int, limit: int | None) -> tuple[list[dict], int]:
+        """:return: ``(page, total)``: the projected rows in range and the number matching the filters."""
+        with self._lock:
+            rows = self._ordered(self._filtered(self._rows(table), filters), order)
+            page = rows[offset:offset + limit if limit is not None else None]
+            return [self.project(table, row, select) for row in page], len(rows)
+
+    def insert(self, table: str, rows: list[dict], on_conflict: str | None = None) -> list[dict]:
+        with self._lock:
+            written = []
+            for row in rows:
+                existing = None
+                if on_conflict:
+                    keys = [key.strip() for key in on_conflict.split(",")]
+                    existing = next(
+                        (r for r in self._rows(table)
+                         if all(row.get(k) is not None and _normalise_timestamp(row.get(k)) == r.get(k) for k in keys)),
+                        None,
+                    )
+                if existing is not None:
+                    existing.update({key: _normalise_timestamp(value) for key, value in row.items()})
+                    if table in CHANGED_AT_TABLES:
+                        existing["changed_at"] = _normalise_timestamp(_now())
+                    written.append(existing)
+                else:
+                    written.append(self._insert_row(table, dict(row)))
+            return copy.deepcopy(written)
+
+    def update(self, table: str, values: dict, filters) -> list[dict]:
+        with self._lock:
+            rows = self._filtered(self._rows(table), filters)
+            values = {key: _normalise_timestamp(value) for key, value in values.items()}
+            if table in CHANGED_AT_TABLES:
+                values["changed_at"] = _normalise_timestamp(_now())
+            for row in rows:
+                row.update(values)
+            return copy.deepcopy(rows)
+
+    def delete(self, table: str, filters) -> list[dict]:
+        with self._lock:
+            doomed = self._filtered(self._rows(table), filters)
+            doomed_ids = {id(row) for row in doomed}
+            self.tables[table] = [row for row in self._rows(table) if id(row) not in doomed_ids]
+            return copy.deepcopy(doomed)
+
+    # ------------------------------------------------------------------
+    # RPC (ports of supabase/migrations)
+    # ------------------------------------------------------------------
+
+    def rpc(self, name: str, params: dict):
+        handler = {
+            "save_calculation": self._save_calculation,
+            "history_monthly_totals": self._history_monthly_totals,
+        }.get(name)
+        if handler is None:
+            raise PostgrestError(404, "PGRST202", f"Could not find the function public.{name} in the schema cache")
+        with self._lock:
+            return handler(params)
+
+    def _upsert_month(self, params: dict) -> int:
+        month, year = params["p_month"], int(params["p_year"])
+        main = next((r for r in self._rows("main_calculations") if r.get("month") == month and r.get("year") == year), None)
+        if main is None:
+            main = self._insert_row("main_calculations", {"month": month, "year": year, "main_data": params["p_main_data"]})
+        else:
+            main["main_data"] = params["p_main_data"]
+        return main["id"]
+
+    @staticmethod
+    def _room_values(room: dict) -> dict:
+        return {key: room.get(key) for key in ("room_data", "photo_url", "nid_front_url", "nid_back_url", "police_form_url")}
+
+    def _month_rooms(self, main_id: int) -> list[dict]:
+        return [r for r in self._rows("room_calculations") if r.get("main_calculation_id") == main_id]
+
+    @staticmethod
+    def _room_name(room: dict):
+        return (room.get("room_data") or {}).get("room_name")
+
+    def _match_room(self, main_id: int, room: dict, incoming: list[dict]) -> dict | None:
+        """The stored row *room* updates: by id, else by a room_name unique among *incoming* and the stored rows."""
+        stored = self._month_rooms(main_id)
+        if room.get("id") is not None:
+            return next((r for r in stored if r.get("id") == room["id"]), None)
+        name = self._room_name(room)
+        if name is None or sum(1 for other in incoming if self._room_name(other) == name) != 1:
+            return None
+        named = [r for r in stored if self._room_name(r) == name]
+        return named[0] if len(named) == 1 else None
+
+    def _save_calculation(self, params: dict) -> int:
+        main_id = self._upsert_month(params)
+        rooms = params.get("p_rooms")
+        if rooms is None:
+            return main_id
+        kept = set()
+        # Rooms with an id claim their rows before any room is paired by name
+        for room in sorted(rooms, key=lambda room: room.get("id") is None):
+            target = self._match_room(main_id, room, rooms)
+            if target is None or target["id"] in kept:
+                target = self._insert_row("room_calculations", {"main_calculation_id": main_id, **self._room_values(room)})
+            elif any(target.get(key) != value for key, value in self._room_values(room).items()):
+                target.update(self._room_values(room))
+            kept.add(target["id"])
+        self.tables["room_calculations"] = [
+            r for r in self._rows("room_calculations")
+            if r.get("main_calculation_id") != main_id or r.get("id") in kept
+        ]
+        return main_id
+
+    @staticmethod
+    def _room_amount(room_data, key: str) -> float:
+        value = (room_data or {}).get(key) if isinstance(room_data, dict) else None
+        text = "" if value is None else str(value).strip()
+        return float(text) if _AMOUNT_RE.match(text) else 0.0
+
+    def _history_monthly_totals(self, params: dict) -> list[dict]:
+        month, year = params.get("p_month"), params.get("p_year")
+        months = {
+            calc["id"]: calc for calc in self._rows("main_calculations")
+            if (month is None or calc.get("month") == month) and (year is None or calc.get("year") == year)
+        }
+        totals = {}
+        for room in self._rows("room_calculations"):
+            calc = months.get(room.get("main_calculation_id"))
+            if calc is None:
+                continue
+            row = totals.setdefault((calc.get("year"), calc.get("month")), {
+                "month": calc.get("month"), "year": calc.get("year"),
+                "house_rent": 0.0, "water_bill": 0.0, "gas_bill": 0.0, "unit_bill": 0.0,
+            })
+            for key in ("house_rent", "water_bill", "gas_bill", "unit_bill"):
+                row[key] += self._room_amount(room.get("room_data"), key)
+        return [totals[key] for key in sorted(totals)]
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def put_object(self, bucket: str, path: str, data: bytes, content_type: str, cache_control: str, upsert: bool) -> bool:
+        """:return: False if the object exists and *upsert* is not set."""
+        with self._lock:
+            objects = self.buckets.setdefault(bucket, {})
+            if path in objects and not upsert:
+                return False
+            now = _now()
+            objects[path] = {
+                "data": data,
+                "content_type": content_type or "application/octet-stream",
+                "cache_control": cache_control or "3600",
+                "etag": f'"{hashlib.md5(data).hexdigest()}"',
+                "created_at": objects[path]["created_at"] if path in objects else now,
+                "updated_at": now,
+            }
+            return True
+
+    def get_object(self, bucket: str, path: str) -> dict | None:
+        with self._lock:
+            return self.buckets.get(bucket, {}).get(path)
+
+    def list_objects(self, bucket: str, prefix: str, limit: int, offset: int) -> list[dict]:
+        """Lists the files and folders directly under *prefix*, like Storage's ``list``."""
+        prefix = prefix.strip("/")
+        with self._lock:
+            entries = {}
+            for path, obj in self.buckets.get(bucket, {}).items():
+                if prefix and not path.startswith(prefix + "/"):
+                    continue
+                name, slash, _rest = path[len(prefix) + 1 if prefix else 0:].partition("/")
+                if slash:
+                    entries.setdefault(name, {"name": name, "id": None, "metadata": None})
+                else:
+                    entries[name] = {
+                        "name": name,
+                        "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{bucket}/{path}")),
+                        "updated_at": obj["updated_at"],
+                        "created_at": obj["created_at"],
+                        "metadata": {"size": len(obj["data"]), "mimetype": obj["content_type"], "eTag": obj["etag"]},
+                    }
+            names = sorted(entries)[offset:offset + limit]
+            return [entries[name] for name in names]
+
+    def remove_objects(self, bucket: str, paths: list[str]) -> list[dict]:
+        with self._lock:
+            objects = self.buckets.get(bucket, {})
+            removed = [path for path in paths if objects.pop(path, None) is not None]
+            return [{"name": path, "bucket_id": bucket} for path in removed]
+
+    def create_upload(self, bucket: str, path: str, length: int, content_type: str, cache_control: str, upsert: bool) -> str:
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = {
+                "bucket": bucket, "path": path, "length": length, "data": bytearray(),
+                "content_type": content_type, "cache_control": cache_control, "upsert": upsert,
+            }
+        return upload_id
+
+    def get_upload(self, upload_id: str) -> dict | None:
+        with self._lock:
+            return self._uploads.get(upload_id)
+
+    def append_upload(self, upload_id: str, offset: int, chunk: bytes) -> int | None:
+        """:return: The new offset, or None if *offset* is not where the upload stands."""
+        with self._lock:
+            upload = self._uploads[upload_id]
+            if offset != len(upload["data"]):
+                return None
+            upload["data"] += chunk
+            if len(upload["data"]) >= upload["length"]:
+                del self._uploads[upload_id]
+                self.put_object(
+                    upload["bucket"], upload["path"], bytes(upload["data"]),
+                    upload["content_type"], upload["cache_control"], upload["upsert"],
+                )
+            return len(upload["data"])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "LocalSupabaseServer"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # ------------------------------------------------------------------
+    # Plumbing
+    # ------------------------------------------------------------------
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.server.throttle(len(body))
+        self.server.count("bytes_in", len(body))
+        return body
+
+    def _send(self, status: int, body: bytes = b"", headers: dict | None = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            for start in range(0, len(body), _THROTTLE_CHUNK):
+                chunk = body[start:start + _THROTTLE_CHUNK]
+                self.server.throttle(len(chunk))
+                self.wfile.write(chunk)
+            self.server.count("bytes_out", len(body))
+
+    def _send_json(self, status: int, payload, headers: dict | None = None):
+        self._send(status, json.dumps(payload).encode("utf-8"), {"Content-Type": "application/json", **(headers or {})})
+
+    def _dispatch(self):
+        url = urllib.parse.urlsplit(self.path)
+        route = url.path.rstrip("/")
+        self.server.count_request(self.command, route)
+        # Always drain the body: postgrest-py sends "{}" with GETs, and unread bytes would corrupt the next keep-alive request
+        body = self._read_body()
+
+        if self.server.inject_delay_and_fault():
+            self._send_json(503, {"code": "503", "message": "Injected failure", "details": None, "hint": None})
+            return
+        try:
+            if route.startswith("/rest/v1/rpc/"):
+                self._rpc(route[len("/rest/v1/rpc/"):], body)
+            elif route.startswith("/rest/v1/"):
+                self._rest(route[len("/rest/v1/"):], url.query, body)
+            elif route.startswith("/storage/v1/"):
+                self._storage(route[len("/storage/v1/"):], body)
+            else:
+                self._send_json(404, {"message": f"No route for {self.command} {url.path}"})
+        except PostgrestError as e:
+            self._send_json(e.status, e.body)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"code": "PGRST100", "message": str(e), "details": None, "hint": None})
+
+    do_GET = do_HEAD = do_POST = do_PATCH = do_PUT = do_DELETE = _dispatch
+
+    # ------------------------------------------------------------------
+    # PostgREST
+    # ------------------------------------------------------------------
+
+    def _prefer(self) -> set[str]:
+        return {item.strip() for item in (self.headers.get("Prefer") or "").split(",") if item.strip()}
+
+    def _rest(self, table: str, query: str, body: bytes):
+        params = urllib.parse.parse_qsl(query, keep_blank_values=True)
+        select = ",".join(value for key, value in params if key == "select") or "*"
+        order = [spec for key, value in params if key == "order" for spec in _split_top_level(value)]
+        reserved = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+        filters = [(key, value) for key, value in params if key not in reserved]
+        prefer = self._prefer()
+        representation = "return=representation" in prefer
+
+        if self.command in ("GET", "HEAD"):
+            offset = int(dict(params).get("offset", 0))
+            limit = int(dict(params)["limit"]) if "limit" in dict(params) else None
+            range_header = self.headers.get("Range")
+            if range_header and re.fullmatch(r"\d+-\d*", range_header):
+                start, _, end = range_header.partition("-")
+                offset = int(start)
+                limit = int(end) - offset + 1 if end else None
+            rows, total = self.server.db.select(table, select, filters, order, offset, limit)
+            last = offset + len(rows) - 1
+            content_range = f"{offset}-{last}" if rows else "*"
+            content_range += f"/{total}" if any(p.startswith("count=") for p in prefer) else "/*"
+            self._send_json(200, rows, {"Content-Range": content_range})
+            return
+
+        if self.command == "POST":
+            payload = json.loads(body or b"[]")
+            rows = payload if isinstance(payload, list) else [payload]
+            on_conflict = None
+            if "resolution=merge-duplicates" in prefer:
+                on_conflict = dict(params).get("on_conflict") or "id"
+            written = self.server.db.insert(table, rows, on_conflict)
+        elif self.command == "PATCH":
+            written = self.server.db.update(table, json.loads(body or b"{}"), filters)
+        elif self.command == "DELETE":
+            written = self.server.db.delete(table, filters)
+        else:
+            raise PostgrestError(405, "PGRST117", f"Unsupported HTTP method: {self.command}")
+
+        if representation:
+            self._send_json(201 if self.command == "POST" else 200, [
+                self.server.db.project(table, row, select) for row in written
+            ])
+        else:
+            self._send(201 if self.command == "POST" else 204)
+
+    def _rpc(self, name: str, body: bytes):
+        if self.command != "POST":
+            raise PostgrestError(405, "PGRST117", "RPC functions are called with POST")
+        self._send_json(200, self.server.db.rpc(name, json.loads(body or b"{}")))
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _storage(self, route: str, body: bytes):
+        db = self.server.db
+        if route == "upload/resumable" and self.command == "POST":
+            metadata = {}
+            for item in (self.headers.get("Upload-Metadata") or "").split(","):
+                key, _, value = item.strip().partition(" ")
+                if key:
+                    metadata[key] = base64.b64decode(value).decode("utf-8") if value else ""
+            upload_id = db.create_upload(
+                metadata["bucketName"], metadata["objectName"], int(self.headers["Upload-Length"]),
+                metadata.get("contentType"), metadata.get("cacheControl"),
+                (self.headers.get("x-upsert") or "").lower() == "true",
+            )
+            self._send(201, headers={"Location": f"/storage/v1/upload/resumable/{upload_id}", "Tus-Resumable": "1.0.0"})
+            return
+
+        if route.startswith("upload/resumable/"):
+            upload_id = route.rsplit("/", 1)[1]
+            upload = db.get_upload(upload_id)
+            if upload is None:
+                self._send(404)
+            elif self.command == "HEAD":
+                self._send(200, headers={"Upload-Offset": str(len(upload["data"])), "Upload-Length": str(upload["length"]),
+                                         "Tus-Resumable": "1.0.0", "Cache-Control": "no-store"})
+            elif self.command == "PATCH":
+                offset = db.append_upload(upload_id, int(self.headers.get("Upload-Offset", -1)), body)
+                if offset is None:
+                    self._send(409)
+                else:
+                    self._send(204, headers={"Upload-Offset": str(offset), "Tus-Resumable": "1.0.0"})
+            else:
+                self._send(405)
+            return
+
+        if route.startswith("object/public/") and self.command in ("GET", "HEAD"):
+            bucket, _, path = route[len("object/public/"):].partition("/")
+            obj = db.get_object(bucket, urllib.parse.unquote(path))
+            if obj is None:
+                self._send_json(400, {"statusCode": "404", "error": "not_found", "message": "Object not found"})
+            elif self.headers.get("If-None-Match") == obj["etag"]:
+                self._send(304, headers={"ETag": obj["etag"]})
+            else:
+                self._send(200, obj["data"], {
+                    "Content-Type": obj["content_type"],
+                    "Cache-Control": f"max-age={obj['cache_control']}",
+                    "ETag": obj["etag"],
+                })
+            return
+
+        if route.startswith("object/list/") and self.command == "POST":
+            options = json.loads(body or b"{}")
+            self._send_json(200, db.list_objects(
+                route[len("object/list/"):], options.get("prefix", ""),
+                int(options.get("limit", 100)), int(options.get("offset", 0)),
+            ))
+            return
+
+        if route.startswith("object/") and self.command == "DELETE":
+            bucket = route[len("object/"):]
+            self._send_json(200, db.remove_objects(bucket, json.loads(body or b"{}").get("prefixes", [])))
+            return
+
+        if route.startswith("object/") and self.command in ("POST", "PUT"):
+            bucket, _, path = route[len("object/"):].partition("/")
+            path = urllib.parse.unquote(path)
+            data, content_type = body, self.headers.get("Content-Type")
+            cache_control = self.headers.get("cache-control")
+            if content_type and content_type.startswith("multipart/form-data"):
+                data, content_type, cache_control = self._parse_multipart(body, content_type, cache_control)
+            upsert = self.command == "PUT" or (self.headers.get("x-upsert") or "").lower() == "true"
+            if not db.put_object(bucket, path, data, content_type, (cache_control or "3600").replace("max-age=", ""), upsert):
+                self._send_json(400, {"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"})
+                return
+            self._send_json(200, {"Key": f"{bucket}/{path}", "Id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"{bucket}/{path}"))})
+            return
+
+        self._send_json(404, {"statusCode": "404", "error": "not_found", "message": f"No route for {self.command} {route}"})
+
+    @staticmethod
+    def _parse_multipart(body: bytes, content_type: str, cache_control: str | None):
+        """Extracts the file part (and cacheControl field) of a multipart upload."""
+        boundary = content_type.split("boundary=", 1)[1].strip('"').encode("ascii")
+        data, file_type = body, None
+        for part in body.split(b"--" + boundary):
+            head, sep, content = part.partition(b"\r\n\r\n")
+            if not sep:
+                continue
+            content = content[:-2] if content.endswith(b"\r\n") else content
+            head_text = head.decode("utf-8", "replace")
+            if 'name="cacheControl"' in head_text:
+                cache_control = content.decode("utf-8")
+            elif "filename=" in head_text or 'name=""' in head_text:
+                data = content
+                match = re.search(r"Content-Type:\s*([^\r\n]+)", head_text, re.IGNORECASE)
+                file_type = match.group(1).strip() if match else None
+        return data, file_type, cache_control
+
+
+class LocalSupabaseServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 54321,
+        faults: FaultProfile | None = None,
+        tables: dict[str, list[dict]] | None = None,
+        verbose: bool = False,
+    ):
+        """
+        :param port: Port to listen on; 0 picks a free one (see :attr:`url`).
+        :param faults: Injected latency, bandwidth cap and error rate; none by default.
+        :param tables: Initial rows per table.
+        """
+        super().__init__((host, port), _Handler)
+        self.db = LocalSupabase(tables)
+        self.verbose = verbose
+        self._stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        self.set_faults(faults or FaultProfile())
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def set_faults(self, faults: FaultProfile):
+        """Applies new network conditions and reseeds the fault generator."""
+        with self._stats_lock:
+            self.faults = faults
+            self._random = random.Random(faults.seed)
+
+    def inject_delay_and_fault(self) -> bool:
+        """Sleeps for the configured latency. :return: True if this request is to fail."""
+        with self._stats_lock:
+            faults = self.faults
+            jitter = self._random.uniform(0, faults.jitter_ms) if faults.jitter_ms else 0.0
+            fail = faults.error_rate > 0 and self._random.random() < faults.error_rate
+            if fail:
+                self._stats["injected_errors"] += 1
+        if faults.latency_ms or jitter:
+            time.sleep((faults.latency_ms + jitter) / 1000)
+        return fail
+
+    def throttle(self, size: int):
+        if self.faults.bandwidth_kbps > 0 and size:
+            time.sleep(size / (self.faults.bandwidth_kbps * 1024))
+
+    def count_request(self, method: str, route: str):
+        parts = route.strip("/").split("/")
+        # Group by API and table/function/bucket, e.g. "GET rest/v1/rental_records",
+        # "POST rest/v1/rpc/save_calculation" or "GET storage/v1/object/public/rental-images"
+        if parts[2:4] in (["object", "public"], ["object", "list"]):
+            depth = 5
+        elif parts[2:3] in (["rpc"], ["object"], ["upload"]):
+            depth = 4
+        else:
+            depth = 3
+        self.count(f"{method} {'/'.join(parts[:depth])}")
+        self.count("requests")
+
+    def count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def stats(self) -> dict[str, int]:
+        """Request counts per route plus ``requests``, ``bytes_in``, ``bytes_out`` and ``injected_errors``."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats.clear()
+
+    def start(self) -> "LocalSupabaseServer":
+        """Serves on a background thread; :meth:`stop` ends it."""
+        self._thread = threading.Thread(target=self.serve_forever, name="local-supabase", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Supabase endpoints HomeUnitCalculator uses.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency", type=float, default=0.0, help="Added latency per request, in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra latency up to this many ms")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="Body transfer cap in KiB/s (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failed with 503 (0-1)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for jitter and injected failures")
+    parser.add_argument("--data", help="JSON file of initial rows: {\"table\": [row, ...], ...}")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    tables = None
+    if args.data:
+        with open(args.data, encoding="utf-8") as f:
+            tables = json.load(f)
+
+    faults = FaultProfile(args.latency, args.jitter, args.bandwidth, args.error_rate, args.seed)
+    server = LocalSupabaseServer(args.host, args.port, faults, tables, verbose=args.verbose)
+    print(f"Local Supabase listening on {server.url}")
+    print(f"Anon key: {ANON_KEY}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Requests served: {json.dumps(server.stats(), indent=2, sort_keys=True)}")
+
+
+if __name__ == "__main__":
+    main()
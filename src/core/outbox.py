@@ -0,0 +1,297 @@
+"""Durable queue of cloud writes, replayed when Supabase is reachable.
+
+Saves, archive toggles and deletes are recorded in the local ``outbox`` table
+and return immediately; ``OutboxSyncWorker`` replays them in order once the
+network is back. Entries survive restarts.
+
+* Every entry carries an idempotency key. For rental records it is the
+  record's ``supabase_id`` (generated locally for new tenants), so replaying an
+  insert whose acknowledgement was lost updates the row instead of duplicating
+  it. Calculation saves are upserts on (month, year) and idempotent already.
+* Entries with the same ``coalesce_key`` replace each other while still
+  pending: ten edits to one tenant before reconnecting become one upload.
+  The replacement keeps the original entry's place in the queue.
+* Consecutive archive toggles (to the same state) and consecutive deletes are
+  replayed as one bulk request (see :func:`replay_group`).
+"""
+import json
+import sqlite3
+import uuid
+from datetime import datetime
+
+from src.core.db_manager import plain_connection
+
+OP_SAVE_CALCULATION = "save_calculation"
+OP_SAVE_RENTAL = "save_rental"
+OP_SET_RENTAL_ARCHIVED = "set_rental_archived"
+OP_DELETE_RENTAL = "delete_rental"
+
+# Failed replays of one entry before it is parked as 'failed' so it no longer
+# blocks the entries queued behind it.
+MAX_ATTEMPTS = 5
+
+
+def rental_key(supabase_id: str) -> str:
+    return f"rental:{supabase_id}"
+
+
+def rental_archive_key(supabase_id: str) -> str:
+    return f"rental-archive:{supabase_id}"
+
+
+def calculation_key(month: str, year: int) -> str:
+    return f"calculation:{month}:{year}"
+
+
+class Outbox:
+    def __init__(self, db_name: str = "app_config.db"):
+        # A fresh plain connection per call: the sync worker uses the outbox from its own thread.
+        self.db_name = db_name
+        self._create_table()
+
+    def _create_table(self):
+        """Creates the outbox table if it doesn't exist."""
+        try:
+            with plain_connection(self.db_name) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS outbox (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        op TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        idempotency_key TEXT NOT NULL,
+                        coalesce_key TEXT,
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        last_error TEXT,
+                        created_at TEXT,
+                        updated_at TEXT
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox (status, id)")
+        except sqlite3.Error as e:
+            print(f"Error creating outbox table: {e}")
+            raise
+
+    def enqueue(
+        self,
+        op: str,
+        payload: dict,
+        coalesce_key: str | None = None,
+        idempotency_key: str | None = None,
+        supersedes: tuple[str, ...] = (),
+    ) -> str:
+        """
+        Queues a cloud write.
+
+        A pending entry with the same ``coalesce_key`` is overwritten in place:
+        it keeps its position in the queue and its idempotency key, so a record's
+        insert still runs before later changes that depend on it. Pending entries
+        whose key is listed in *supersedes* are dropped.
+        :return: The entry's idempotency key.
+        """
+        return self.enqueue_many(op, [(payload, coalesce_key, idempotency_key, supersedes)])[0]
+
+    def enqueue_many(self, op: str, entries: list[tuple[dict, str | None, str | None, tuple[str, ...]]]) -> list[str]:
+        """
+        Queues several writes of one kind in a single transaction, each as with :meth:`enqueue`.
+        :param entries: ``(payload, coalesce_key, idempotency_key, supersedes)`` per write.
+        :return: The entries' idempotency keys, in order.
+        """
+        now = datetime.now().isoformat()
+        keys = []
+        with plain_connection(self.db_name) as conn:  # Coalesce, drop superseded entries and insert in one transaction
+            for payload, coalesce_key, idempotency_key, supersedes in entries:
+                keys.append(self._enqueue(conn, now, op, payload, coalesce_key, idempotency_key, supersedes))
+        return keys
+
+    @staticmethod
+    def _enqueue(conn, now, op, payload, coalesce_key, idempotency_key, supersedes) -> str:
+        if supersedes:
+            conn.execute(
+                f"DELETE FROM outbox WHERE status = 'pending' AND coalesce_key IN ({', '.join('?' * len(supersedes))})",
+                supersedes,
+            )
+        row = None
+        if coalesce_key:
+            row = conn.execute(
+                "SELECT id, idempotency_key FROM outbox WHERE status = 'pending' AND coalesce_key = ? "
+                "ORDER BY id LIMIT 1",
+                (coalesce_key,),
+            ).fetchone()
+        if row:
+            idempotency_key = idempotency_key or row["idempotency_key"]
+            conn.execute(
+                "UPDATE outbox SET op = ?, payload = ?, idempotency_key = ?, attempts = 0, "
+                "last_error = NULL, updated_at = ? WHERE id = ?",
+                (op, json.dumps(payload), idempotency_key, now, row["id"]),
+            )
+        else:
+            idempotency_key = idempotency_key or str(uuid.uuid4())
+            conn.execute(
+                "INSERT INTO outbox (op, payload, idempotency_key, coalesce_key, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (op, json.dumps(payload), idempotency_key, coalesce_key, now, now),
+            )
+        return idempotency_key
+
+    def pending(self, limit: int = 50) -> list[dict]:
+        """Return up to *limit* pending entries, oldest first, with decoded payloads."""
+        with plain_connection(self.db_name) as conn:
+            rows = conn.execute(
+                "SELECT id, op, payload, idempotency_key, attempts, updated_at FROM outbox "
+                "WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "op": row["op"],
+                "payload": json.loads(row["payload"]),
+                "idempotency_key": row["idempotency_key"],
+                "attempts": row["attempts"],
+                "updated_at": row["updated_at"],
+            }
+            for row in rows
+        ]
+
+    def mark_done(self, entries: list[dict]) -> int:
+        """
+        Removes replayed entries. An entry that was coalesced with a newer change
+        while it was being replayed (its ``updated_at`` moved on) stays queued.
+        """
+        if not entries:
+            return 0
+        with plain_connection(self.db_name) as conn:
+            return conn.executemany(
+                "DELETE FROM outbox WHERE id = ? AND updated_at = ?",
+                [(e["id"], e["updated_at"]) for e in entries],
+            ).rowcount
+
+    def mark_failed(self, entry_id: int, error: str) -> bool:
+        """
+        Records a failed replay.
+        :return: True if the entry used up its attempts and was parked as 'failed'.
+        """
+        with plain_connection(self.db_name) as conn:
+            conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, last_error = ?, updated_at = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE status END WHERE id = ?",
+                (error, datetime.now().isoformat(), MAX_ATTEMPTS, entry_id),
+            )
+            row = conn.execute("SELECT status FROM outbox WHERE id = ?", (entry_id,)).fetchone()
+        return bool(row and row["status"] == "failed")
+
+    def retry_failed(self) -> int:
+        """Puts parked entries back into the queue."""
+        with plain_connection(self.db_name) as conn:
+            return conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, updated_at = ? WHERE status = 'failed'",
+                (datetime.now().isoformat(),),
+            ).rowcount
+
+    def queued_keys(self) -> set[str]:
+        """Return the coalesce keys of pending and failed entries."""
+        with plain_connection(self.db_name) as conn:
+            rows = conn.execute("SELECT DISTINCT coalesce_key FROM outbox WHERE coalesce_key IS NOT NULL").fetchall()
+        return {row["coalesce_key"] for row in rows}
+
+    def referenced_urls(self) -> set[str]:
+        """Return the http(s) URLs in queued payloads; Storage GC must not remove images a queued save still points at."""
+        return {value for value in self._payload_strings() if value.lower().startswith(("http://", "https://"))}
+
+    def referenced_paths(self) -> set[str]:
+        """Return the other strings in queued payloads; the image store must keep blobs a queued save still uploads."""
+        return {value for value in self._payload_strings() if not value.lower().startswith(("http://", "https://"))}
+
+    def _payload_strings(self):
+        """Yields every string value in the payloads of pending and failed entries."""
+        with plain_connection(self.db_name) as conn:
+            rows = conn.execute("SELECT payload FROM outbox").fetchall()
+        for row in rows:
+            stack = [json.loads(row["payload"])]
+            while stack:
+                value = stack.pop()
+                if isinstance(value, dict):
+                    stack.extend(value.values())
+                elif isinstance(value, list):
+                    stack.extend(value)
+                elif isinstance(value, str):
+                    yield value
+
+    def counts(self) -> dict[str, int]:
+        """Return ``{"pending": n, "failed": m}``."""
+        with plain_connection(self.db_name) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        counts = {"pending": 0, "failed": 0}
+        for status, count in rows:
+            counts[status] = count
+        return counts
+
+
+def replay_entry(supabase_manager, entry: dict) -> str | None:
+    """
+    Performs one queued write against Supabase.
+    :return: None on success, otherwise an error message.
+    """
+    op, payload, key = entry["op"], entry["payload"], entry["idempotency_key"]
+
+    if op == OP_SAVE_CALCULATION:
+        ok = supabase_manager.save_calculation(payload["main_calc_data"], payload.get("room_data_list"))
+        return None if ok else "Failed to save calculation."
+
+    if op == OP_SAVE_RENTAL:
+        record_data = dict(payload["record_data"], supabase_id=key)
+        result = supabase_manager.save_rental_record(record_data, payload["image_paths"], create_missing=True)
+        return None if isinstance(result, str) and result.startswith("Successfully") else str(result)
+
+    if op == OP_SET_RENTAL_ARCHIVED:
+        ok = supabase_manager.update_rental_record_archive_status(key, payload["is_archived"])
+        return None if ok else "Failed to update archive status."
+
+    if op == OP_DELETE_RENTAL:
+        ok = supabase_manager.delete_rental_record(key, missing_ok=True)
+        return None if ok else "Failed to delete rental record."
+
+    return f"Unknown outbox operation: {op}"
+
+
+def _bulk_key(entry: dict):
+    """Entries with the same (non-None) key can be replayed together in one request."""
+    if entry["op"] == OP_SET_RENTAL_ARCHIVED:
+        return OP_SET_RENTAL_ARCHIVED, bool(entry["payload"]["is_archived"])
+    if entry["op"] == OP_DELETE_RENTAL:
+        return (OP_DELETE_RENTAL,)
+    return None
+
+
+def group_entries(entries: list[dict]) -> list[list[dict]]:
+    """Splits *entries* into runs of consecutive entries that :func:`replay_group` can send at once."""
+    groups = []
+    for entry in entries:
+        key = _bulk_key(entry)
+        if groups and key is not None and _bulk_key(groups[-1][0]) == key:
+            groups[-1].append(entry)
+        else:
+            groups.append([entry])
+    return groups
+
+
+def replay_group(supabase_manager, entries: list[dict]) -> str | None:
+    """
+    Performs a run of entries from :func:`group_entries` as one bulk request
+    (a single entry goes through :func:`replay_entry`).
+    :return: None on success, otherwise an error message.
+    """
+    if len(entries) == 1:
+        return replay_entry(supabase_manager, entries[0])
+    supabase_ids = [entry["idempotency_key"] for entry in entries]
+
+    if entries[0]["op"] == OP_SET_RENTAL_ARCHIVED:
+        ok = supabase_manager.update_rental_records_archive_status(supabase_ids, entries[0]["payload"]["is_archived"])
+        return None if ok else "Failed to update archive status."
+
+    if entries[0]["op"] == OP_DELETE_RENTAL:
+        ok = supabase_manager.delete_rental_records(supabase_ids)
+        return None if ok else "Failed to delete rental records."
+
+    return f"Cannot replay {entries[0]['op']} entries together"
@@ -0,0 +1,97 @@
+"""In-memory read-through cache for Supabase query results.
+
+Entries are keyed by ``(table, projection, filters...)``. A cached result is:
+
+* **fresh** for ``ttl`` seconds and returned without any network I/O;
+* **stale** until ``max_stale`` seconds: it is still returned at once, and a
+  single background refresh is started (stale-while-revalidate). Listeners
+  registered with :meth:`QueryCache.add_listener` are told which table was
+  refreshed so the UI can re-read it;
+* expired after that and fetched synchronously again.
+
+Writes invalidate every key of the tables they touch. All methods are thread
+safe; results are deep-copied in and out so callers may mutate them freely.
+"""
+import copy
+import threading
+import time
+from typing import Callable, Hashable
+
+
+class QueryCache:
+    def __init__(self, ttl: float = 60.0, max_stale: float = 600.0):
+        """
+        :param ttl: Seconds a result is served without revalidation. 0 disables caching.
+        :param max_stale: Seconds a result may still be served while it is being refreshed.
+        """
+        self.ttl = ttl
+        self.max_stale = max(max_stale, ttl)
+        self._entries: dict[tuple, tuple[float, object]] = {}
+        self._refreshing: set[tuple] = set()
+        self._generation: dict[str, int] = {}
+        self._listeners: list[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback: Callable[[str], None]):
+        """Registers ``callback(table)``, called from a worker thread after a background refresh."""
+        self._listeners.append(callback)
+
+    def get_or_fetch(self, key: tuple[Hashable, ...], fetch: Callable[[], object]):
+        """
+        Returns the cached result for *key*, calling *fetch* when there is none.
+        Exceptions from *fetch* propagate and nothing is cached.
+        :param key: ``(table, projection, *filters)``; the first element names the table.
+        """
+        if self.ttl <= 0:
+            return fetch()
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self._generation.get(key[0], 0)
+            if entry is not None:
+                age = now - entry[0]
+                if age < self.ttl:
+                    return copy.deepcopy(entry[1])
+                if age < self.max_stale:
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, fetch, generation), daemon=True).start()
+                    return copy.deepcopy(entry[1])
+
+        value = fetch()
+        self._store(key, value, generation)
+        return value
+
+    def _store(self, key: tuple, value, generation: int) -> bool:
+        with self._lock:
+            # A write to the table since the fetch started makes this result outdated; drop it.
+            if self._generation.get(key[0], 0) != generation:
+                return False
+            self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+            return True
+
+    def _refresh(self, key: tuple, fetch: Callable[[], object], generation: int):
+        try:
+            stored = self._store(key, fetch(), generation)
+        except Exception as e:
+            print(f"Background refresh of {key[0]} failed: {e}")
+            stored = False
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+        if stored:
+            for callback in list(self._listeners):
+                try:
+                    callback(key[0])
+                except Exception as e:
+                    print(f"Cache listener failed: {e}")
+
+    def invalidate(self, *tables: str):
+        """Drops every cached result of the given tables (all tables if none given)."""
+        with self._lock:
+            targets = set(tables) or {key[0] for key in self._entries}
+            for table in targets:
+                self._generation[table] = self._generation.get(table, 0) + 1
+            for key in [k for k in self._entries if k[0] in targets]:
+                del self._entries[key]
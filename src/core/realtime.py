@@ -0,0 +1,153 @@
+"""Supabase Realtime feed of row changes.
+
+Subscribes to ``postgres_changes`` for a set of tables over the Realtime
+websocket (Phoenix channel protocol) so open views can apply inserts, updates
+and deletes made on any machine as they happen, instead of re-reading whole
+tables.
+
+The synchronous supabase-py client has no Realtime support, so this speaks the
+protocol directly with ``websockets``. :meth:`RealtimeFeed.run` is a coroutine
+meant to own an event loop on a worker thread (see ``RealtimeWorker``); it
+reconnects with capped exponential backoff until :meth:`RealtimeFeed.stop` is
+called.
+
+The tables must be in the ``supabase_realtime`` publication (see the
+``realtime_publication`` migration).
+"""
+import asyncio
+import itertools
+import json
+import random
+import urllib.parse
+from typing import Callable
+
+import websockets
+
+HEARTBEAT_SECONDS = 25
+MAX_RECONNECT_DELAY = 60
+
+INSERT = "INSERT"
+UPDATE = "UPDATE"
+DELETE = "DELETE"
+
+
+class RealtimeFeed:
+    def __init__(
+        self,
+        supabase_url: str,
+        supabase_key: str,
+        tables: tuple[str, ...],
+        on_change: Callable[[str, str, dict, dict], None],
+        on_status: Callable[[bool], None] | None = None,
+        schema: str = "public",
+    ):
+        """
+        :param tables: Tables to watch.
+        :param on_change: Called as ``on_change(table, event, record, old_record)`` with
+                          ``event`` one of INSERT/UPDATE/DELETE. ``old_record`` holds at least
+                          the primary key for updates and deletes.
+        :param on_status: Called with True once subscribed and False when the connection drops.
+        """
+        parsed = urllib.parse.urlparse(supabase_url)
+        scheme = "wss" if parsed.scheme == "https" else "ws"
+        query = urllib.parse.urlencode({"apikey": supabase_key, "vsn": "1.0.0"})
+        self.url = f"{scheme}://{parsed.netloc}/realtime/v1/websocket?{query}"
+        self.supabase_key = supabase_key
+        self.tables = tables
+        self.schema = schema
+        self.on_change = on_change
+        self.on_status = on_status or (lambda connected: None)
+        self.topic = "realtime:app-changes"
+        self._refs = itertools.count(1)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stopping: asyncio.Event | None = None
+        self._stop_requested = False
+
+    def _message(self, topic: str, event: str, payload: dict) -> str:
+        return json.dumps({"topic": topic, "event": event, "payload": payload, "ref": str(next(self._refs))})
+
+    def _join_message(self) -> str:
+        return self._message(self.topic, "phx_join", {
+            "config": {
+                "broadcast": {"self": False},
+                "presence": {"key": ""},
+                "postgres_changes": [
+                    {"event": "*", "schema": self.schema, "table": table} for table in self.tables
+                ],
+            },
+            "access_token": self.supabase_key,
+        })
+
+    def stop(self):
+        """Ends :meth:`run`. Safe to call from any thread, also before :meth:`run` started."""
+        self._stop_requested = True
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    async def run(self):
+        """Connects, subscribes and dispatches changes until :meth:`stop` is called."""
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        if self._stop_requested:
+            self._stopping.set()
+        attempt = 0
+        while not self._stopping.is_set():
+            try:
+                async with websockets.connect(self.url, ping_interval=None, close_timeout=5) as ws:
+                    await ws.send(self._join_message())
+                    heartbeat = asyncio.ensure_future(self._heartbeat(ws))
+                    stopping = asyncio.ensure_future(self._stopping.wait())
+                    try:
+                        receiving = asyncio.ensure_future(self._receive(ws))
+                        done, _pending = await asyncio.wait(
+                            {receiving, stopping}, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        if receiving in done:
+                            receiving.result()  # Re-raises what ended the connection
+                        else:
+                            receiving.cancel()
+                        attempt = 0
+                    finally:
+                        heartbeat.cancel()
+                        stopping.cancel()
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                print(f"Realtime connection lost: {e}")
+            self.on_status(False)
+            if self._stopping.is_set():
+                break
+            attempt += 1
+            delay = random.uniform(0, min(MAX_RECONNECT_DELAY, 2 ** attempt))
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _heartbeat(self, ws):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            await ws.send(self._message("phoenix", "heartbeat", {}))
+
+    async def _receive(self, ws):
+        async for raw in ws:
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+            event = message.get("event")
+            payload = message.get("payload") or {}
+
+            if event == "phx_reply" and message.get("topic") == self.topic:
+                if payload.get("status") == "ok":
+                    self.on_status(True)
+                else:
+                    print(f"Realtime subscription refused: {payload.get('response')}")
+            elif event == "system" and payload.get("status") == "error":
+                print(f"Realtime subscription error: {payload.get('message')}")
+            elif event == "postgres_changes":
+                data = payload.get("data") or {}
+                table, change = data.get("table"), data.get("type")
+                if table in self.tables and change in (INSERT, UPDATE, DELETE):
+                    try:
+                        self.on_change(table, change, data.get("record") or {}, data.get("old_record") or {})
+                    except Exception as e:
+                        print(f"Realtime change handler failed: {e}")
@@ -0,0 +1,206 @@
+"""Incremental two-way sync between the local ``rentals`` table and the cloud
+``rental_records`` table.
+
+Rows are paired by ``supabase_id``. Only changes move:
+
+* **Pull** reads cloud rows whose ``changed_at`` (stamped by the database on
+  every write) is past a stored watermark, ordered by ``(changed_at,
+  supabase_id)`` and paged, so an up-to-date client costs one empty request.
+* **Push** picks local rows edited since they were last exchanged with the cloud
+  (``updated_at > synced_at``) and queues them in the outbox, which uploads them
+  idempotently whenever Supabase is reachable. A row counts as exchanged only
+  once its upload succeeded (:func:`mark_pushed`); until then it stays dirty, so
+  a pull does not overwrite it and an upload set aside as failed is not lost.
+
+Uploads carry the local edit's ``updated_at``. When a row changed on both
+sides, the later edit wins. Rows that were
+never saved to the cloud (no ``supabase_id``) stay local-only. Cloud deletions
+are not tracked by the watermark; deletions made in this app go through the
+outbox.
+"""
+import json
+import os
+import urllib.parse
+from datetime import datetime
+
+from src.core.db_manager import plain_connection
+from src.core.image_store import RENTAL_IMAGE_COLUMNS
+from src.core.outbox import OP_SAVE_RENTAL, rental_key
+
+# The format the app writes to rentals.updated_at; string comparison follows time order.
+LOCAL_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_PULL_WATERMARK = "rentals_pull_watermark"
+
+
+def to_local_timestamp(value) -> str | None:
+    """Normalise a cloud timestamp (ISO 8601, possibly with an offset) to local ``LOCAL_TS_FORMAT``."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return str(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return dt.strftime(LOCAL_TS_FORMAT)
+
+
+def _same_object(local_path: str | None, url: str | None) -> bool:
+    """True if *local_path* is the file that was uploaded to *url* (uploads keep the base name)."""
+    if not local_path or not url or str(local_path).lower().startswith("http"):
+        return False
+    return (
+        os.path.basename(local_path) == os.path.basename(urllib.parse.urlparse(url).path)
+        and os.path.exists(local_path)
+    )
+
+
+def mark_pushed(db_name: str, entries: list[dict]) -> int:
+    """
+    Marks the local rows uploaded by the replayed outbox *entries* as synced. A row
+    edited again since its upload was queued keeps its newer edit dirty.
+    :return: Number of rows marked.
+    """
+    params = [
+        (entry["idempotency_key"], entry["payload"]["record_data"].get("updated_at"))
+        for entry in entries if entry["op"] == OP_SAVE_RENTAL
+    ]
+    if not params:
+        return 0
+    with plain_connection(db_name) as conn:
+        return conn.executemany(
+            "UPDATE rentals SET synced_at = updated_at WHERE supabase_id = ? AND updated_at = ?", params
+        ).rowcount
+
+
+class RentalSync:
+    def __init__(self, db_manager, supabase_manager, outbox, page_size: int = 500):
+        """
+        :param db_manager: A DBManager owned by the calling thread.
+        :param supabase_manager: An initialised SupabaseManager.
+        :param outbox: The Outbox local changes are pushed through.
+        :param page_size: Cloud rows fetched per request.
+        """
+        self.db_manager = db_manager
+        self.supabase_manager = supabase_manager
+        self.outbox = outbox
+        self.page_size = page_size
+        self.db_manager.bootstrap_rentals_table()
+        self.db_manager.create_table(
+            "CREATE TABLE IF NOT EXISTS sync_state (name TEXT PRIMARY KEY, value TEXT)"
+        )
+
+    def _get_state(self, name: str) -> dict:
+        row = self.db_manager.execute_query("SELECT value FROM sync_state WHERE name = ?", (name,), fetch_one=True)
+        return json.loads(row["value"]) if row else {}
+
+    def _set_state(self, name: str, value: dict):
+        self.db_manager.execute_query(
+            "INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)", (name, json.dumps(value))
+        )
+
+    # ------------------------------------------------------------------
+    # Pull
+    # ------------------------------------------------------------------
+
+    def pull(self) -> int:
+        """
+        Applies cloud changes since the last pull to the local table.
+        :return: Number of local rows inserted or updated.
+        """
+        watermark = self._get_state(_PULL_WATERMARK)
+        applied = 0
+        while True:
+            rows = self.supabase_manager.get_rental_records_changed_since(
+                watermark.get("changed_at"), watermark.get("supabase_id"), limit=self.page_size
+            )
+            if not rows:
+                break
+            with self.db_manager.conn:  # One transaction per page
+                for row in rows:
+                    if row.get("supabase_id") and self._apply_remote(row):
+                        applied += 1
+            watermark = {"changed_at": rows[-1]["changed_at"], "supabase_id": rows[-1]["supabase_id"]}
+            self._set_state(_PULL_WATERMARK, watermark)
+            if len(rows) < self.page_size:
+                break
+        return applied
+
+    def _apply_remote(self, row: dict) -> bool:
+        """Writes one cloud row locally unless a newer local edit is waiting to be pushed."""
+        conn = self.db_manager.conn
+        local = conn.execute(
+            f"SELECT id, updated_at, synced_at, {', '.join(RENTAL_IMAGE_COLUMNS)} FROM rentals WHERE supabase_id = ?",
+            (row["supabase_id"],),
+        ).fetchone()
+        cloud_ts = to_local_timestamp(row.get("updated_at"))
+
+        if local is not None:
+            local_ts = local["updated_at"] or ""
+            dirty = local["synced_at"] is None or local_ts > local["synced_at"]
+            if dirty and local_ts >= (cloud_ts or ""):
+                return False  # Local edit is newer; push sends it
+
+        values = {
+            "tenant_name": row.get("tenant_name"),
+            "room_number": row.get("room_number"),
+            "advanced_paid": row.get("advanced_paid") or 0.0,
+            "is_archived": 1 if row.get("is_archived") else 0,
+            "created_at": to_local_timestamp(row.get("created_at")),
+            "updated_at": cloud_ts,
+            "synced_at": cloud_ts,
+            "supabase_id": row["supabase_id"],
+        }
+        for column in RENTAL_IMAGE_COLUMNS:
+            url = row.get(column.replace("_path", "_url"))
+            # Keep the local copy of an image that is unchanged in the cloud
+            values[column] = local[column] if local is not None and _same_object(local[column], url) else url
+
+        columns = list(values)
+        if local is None:
+            conn.execute(
+                f"INSERT INTO rentals ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})",
+                values,
+            )
+        else:
+            conn.execute(
+                f"UPDATE rentals SET {', '.join(f'{c} = :{c}' for c in columns if c != 'created_at')} WHERE id = :id",
+                {**values, "id": local["id"]},
+            )
+        return True
+
+    # ------------------------------------------------------------------
+    # Push
+    # ------------------------------------------------------------------
+
+    def push(self) -> int:
+        """
+        Queues local edits made since the last exchange for upload. Rows that already
+        have an entry in the outbox, pending or failed, are left to it.
+        :return: Number of rows queued.
+        """
+        rows = self.db_manager.execute_query(
+            "SELECT id, supabase_id, tenant_name, room_number, advanced_paid, created_at, updated_at, is_archived, "
+            f"{', '.join(RENTAL_IMAGE_COLUMNS)} FROM rentals "
+            "WHERE supabase_id IS NOT NULL AND (synced_at IS NULL OR updated_at > synced_at)"
+        )
+        queued = self.outbox.queued_keys()
+        rows = [row for row in rows if rental_key(row["supabase_id"]) not in queued]
+        for row in rows:
+            record_data = {key: row[key] for key in row.keys()}
+            image_paths = {column[:-len("_path")]: row[column] for column in RENTAL_IMAGE_COLUMNS}
+            self.outbox.enqueue(
+                OP_SAVE_RENTAL,
+                {"record_data": record_data, "image_paths": image_paths},
+                coalesce_key=rental_key(row["supabase_id"]),
+                idempotency_key=row["supabase_id"],
+            )
+        return len(rows)
+
+    def sync(self) -> tuple[int, int]:
+        """Pulls, then pushes. :return: ``(pulled, pushed)``."""
+        pulled = self.pull()
+        pushed = self.push()
+        print(f"Rental sync: {pulled} pulled, {pushed} pushed.")
+        return pulled, pushed
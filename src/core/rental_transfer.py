@@ -0,0 +1,254 @@
+"""Streaming bulk import/export for the local ``rentals`` table.
+
+Records are moved one at a time as JSON Lines (``.jsonl``) or CSV so that memory
+use stays flat however many tenants are involved:
+
+* Export walks the table through :meth:`DBManager.iter_query`, which pulls rows
+  from SQLite in small ``fetchmany`` batches instead of materialising the whole
+  result set.
+* Import parses the file lazily and writes it in batched transactions via
+  :meth:`DBManager.insert_rental_records`, which skips records already present.
+
+Local image files are copied into an ``<export name>_images`` folder next to the
+export, and records refer to them relative to the export file, so the export
+can be moved to another machine together with that folder. Import adds them to
+the image store. Image URLs are carried as they are.
+"""
+import csv
+import json
+import os
+import shutil
+from typing import Callable, Iterator
+
+from src.core.db_manager import RENTAL_COLUMNS
+from src.core.image_store import RENTAL_IMAGE_COLUMNS, ImageStore, hash_file
+
+SUPPORTED_FORMATS = ("jsonl", "csv")
+
+# Cloud rows (``rental_records``) name the image columns *_url instead of *_path.
+_URL_KEY_ALIASES = {
+    "photo_url": "photo_path",
+    "nid_front_url": "nid_front_path",
+    "nid_back_url": "nid_back_path",
+    "police_form_url": "police_form_path",
+}
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def detect_format(file_path: str, fmt: str | None = None) -> str:
+    """Return the transfer format for *file_path*, honouring an explicit *fmt*."""
+    if fmt:
+        fmt = fmt.lower().lstrip(".")
+    else:
+        ext = os.path.splitext(file_path)[1].lower().lstrip(".")
+        fmt = "jsonl" if ext in ("jsonl", "ndjson", "json") else ext
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported rental transfer format: {fmt!r} (expected one of {SUPPORTED_FORMATS})")
+    return fmt
+
+
+def images_dir_for(file_path: str) -> str:
+    """Return the folder an export's image files go to: ``<name>_images`` next to *file_path*."""
+    return os.path.splitext(file_path)[0] + "_images"
+
+
+def _is_url(value) -> bool:
+    return str(value).lower().startswith(("http://", "https://"))
+
+
+def _bundle_image(path: str | None, images_dir: str, bundled: dict) -> str | None:
+    """
+    Copies the local image *path* into *images_dir* (once per file; named by content)
+    and returns its path relative to the export file. URLs and missing files are
+    returned unchanged.
+    """
+    if not path or _is_url(path) or not os.path.isfile(path):
+        return path
+    name = bundled.get(path)
+    if name is None:
+        name = f"{ImageStore.digest_of(path) or hash_file(path)}{os.path.splitext(path)[1].lower()}"
+        target = os.path.join(images_dir, name)
+        if not os.path.exists(target):
+            os.makedirs(images_dir, exist_ok=True)
+            shutil.copyfile(path, target)
+        bundled[path] = name
+    return f"{os.path.basename(images_dir)}/{name}"
+
+
+def _unbundle_image(value: str | None, base_dir: str, image_store) -> str | None:
+    """
+    Adds the image an imported record names (relative to the export file, or a local
+    path) to *image_store* and returns the blob path. URLs, and files that are not
+    there, are returned unchanged.
+    """
+    if not value or _is_url(value) or image_store is None:
+        return value
+    for candidate in (os.path.join(base_dir, value), value):
+        if os.path.isfile(candidate):
+            return str(image_store.add_file(candidate))
+    return value
+
+
+def _normalise_record(raw: dict) -> dict:
+    """Map an imported row onto the ``rentals`` columns with sensible types."""
+    record = dict(raw)
+    for url_key, path_key in _URL_KEY_ALIASES.items():
+        if not record.get(path_key) and record.get(url_key):
+            record[path_key] = record[url_key]
+
+    normalised = {col: (record.get(col) if record.get(col) != "" else None) for col in RENTAL_COLUMNS}
+
+    if not normalised["tenant_name"] or not normalised["room_number"]:
+        raise ValueError("tenant_name and room_number are required")
+
+    try:
+        normalised["advanced_paid"] = float(normalised["advanced_paid"] or 0.0)
+    except (TypeError, ValueError):
+        normalised["advanced_paid"] = 0.0
+
+    archived = normalised["is_archived"]
+    if isinstance(archived, str):
+        archived = archived.strip().lower() in ("1", "true", "yes")
+    normalised["is_archived"] = 1 if archived else 0
+    return normalised
+
+
+def export_rentals(
+    db_manager,
+    file_path: str,
+    fmt: str | None = None,
+    include_archived: bool = True,
+    batch_size: int = 1000,
+    progress_callback: ProgressCallback | None = None,
+) -> int:
+    """
+    Streams the local ``rentals`` table to *file_path*.
+
+    :param db_manager: A connected :class:`DBManager`.
+    :param file_path: Destination ``.jsonl`` or ``.csv`` file.
+    :param fmt: Force ``"jsonl"`` or ``"csv"``; otherwise inferred from the extension.
+    :param include_archived: Also export archived tenants.
+    :param batch_size: Rows fetched from SQLite per round.
+    :param progress_callback: Called as ``callback(rows_written, total_rows)``.
+    :return: Number of records written.
+    """
+    fmt = detect_format(file_path, fmt)
+    images_dir = images_dir_for(file_path)
+    bundled: dict[str, str] = {}  # Local path -> file name in images_dir
+    where = "" if include_archived else " WHERE is_archived = 0"
+    total = db_manager.execute_query(f"SELECT COUNT(*) FROM rentals{where}", fetch_one=True)[0]
+    query = f"SELECT {', '.join(RENTAL_COLUMNS)} FROM rentals{where} ORDER BY id"
+
+    written = 0
+    with open(file_path, "w", newline="", encoding="utf-8") as out:
+        writer = None
+        if fmt == "csv":
+            writer = csv.DictWriter(out, fieldnames=list(RENTAL_COLUMNS))
+            writer.writeheader()
+
+        for row in db_manager.iter_query(query, batch_size=batch_size):
+            record = dict(zip(RENTAL_COLUMNS, row))
+            for column in RENTAL_IMAGE_COLUMNS:
+                record[column] = _bundle_image(record[column], images_dir, bundled)
+            if writer is not None:
+                writer.writerow(record)
+            else:
+                out.write(json.dumps(record, ensure_ascii=False))
+                out.write("\n")
+            written += 1
+            if progress_callback and written % batch_size == 0:
+                progress_callback(written, total)
+
+    if progress_callback:
+        progress_callback(written, total)
+    print(f"Exported {written} rental records to {file_path} ({len(set(bundled.values()))} image files in {images_dir}).")
+    return written
+
+
+def iter_rental_file(file_path: str, fmt: str | None = None, progress_callback: ProgressCallback | None = None) -> Iterator[dict]:
+    """
+    Lazily yields raw records from a JSONL or CSV export.
+
+    The file is read in binary so the byte offset can be tracked for
+    ``progress_callback(bytes_read, total_bytes)`` without buffering the file.
+    """
+    fmt = detect_format(file_path, fmt)
+    total_bytes = os.path.getsize(file_path)
+    bytes_read = 0
+
+    with open(file_path, "rb") as raw:
+        def _lines():
+            nonlocal bytes_read
+            for line in raw:
+                bytes_read += len(line)
+                yield line.decode("utf-8-sig" if bytes_read == len(line) else "utf-8")
+
+        if fmt == "csv":
+            for row in csv.DictReader(_lines()):
+                yield row
+                if progress_callback:
+                    progress_callback(bytes_read, total_bytes)
+        else:
+            for line_no, line in enumerate(_lines(), start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {line_no}: {e}") from e
+                if progress_callback:
+                    progress_callback(bytes_read, total_bytes)
+
+
+def import_rentals(
+    db_manager,
+    file_path: str,
+    fmt: str | None = None,
+    batch_size: int = 1000,
+    progress_callback: ProgressCallback | None = None,
+    image_store=None,
+) -> tuple[int, list[str]]:
+    """
+    Streams records from *file_path* into the local ``rentals`` table.
+
+    Rows are written in transactions of ``batch_size``. Records already in the
+    table (see :meth:`DBManager.insert_rental_records`) are left as they are.
+    Rows missing a tenant name or room number are skipped and reported.
+
+    :param image_store: The :class:`ImageStore` that the export's image files are
+                        added to. Without one, image references are imported as they are.
+    :return: ``(imported_count, errors)`` where *errors* lists skipped rows.
+    """
+    base_dir = os.path.dirname(os.path.abspath(file_path))
+    imported = valid = 0
+    errors: list[str] = []
+    batch: list[dict] = []
+    last_reported = [0]
+
+    def _report(done: int, total: int):
+        # Throttle to whole-percent steps so the UI thread isn't flooded with signals
+        if progress_callback and (done == total or done - last_reported[0] >= max(total // 100, 1)):
+            last_reported[0] = done
+            progress_callback(done, total)
+
+    for index, raw in enumerate(iter_rental_file(file_path, fmt, _report), start=1):
+        try:
+            record = _normalise_record(raw)
+            for column in RENTAL_IMAGE_COLUMNS:
+                record[column] = _unbundle_image(record[column], base_dir, image_store)
+            batch.append(record)
+            valid += 1
+        except (ValueError, TypeError, AttributeError, OSError) as e:
+            errors.append(f"Record {index}: {e}")
+            continue
+        if len(batch) >= batch_size:
+            imported += db_manager.insert_rental_records(batch)
+            batch.clear()
+
+    if batch:
+        imported += db_manager.insert_rental_records(batch)
+
+    print(f"Imported {imported} rental records from {file_path} "
+          f"({valid - imported} already present, {len(errors)} skipped).")
+    return imported, errors
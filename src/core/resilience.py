@@ -0,0 +1,155 @@
+"""Retry and circuit-breaker policy for calls to Supabase.
+
+* **Retries.** Idempotent requests that fail with a transient error (network
+  error, timeout, 5xx) are retried with jittered exponential backoff ("full
+  jitter": a random delay between 0 and ``base * 2**attempt``, capped), so
+  several clients recovering from the same outage don't retry in lockstep.
+* **Circuit breaker.** After ``failure_threshold`` transient failures in a row
+  the breaker *opens* and further calls fail at once with
+  :class:`CircuitOpenError` instead of waiting for a timeout each. After
+  ``reset_timeout`` seconds it lets a single trial call through (*half open*);
+  success closes it again, failure re-opens it.
+
+Errors that are not transient (a rejected request, a missing RPC) mean the
+service answered, so they neither trip the breaker nor get retried.
+"""
+import random
+import threading
+import time
+from typing import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a call while the circuit breaker is open."""
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter delay before retry number *attempt* (0-based)."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        is_transient: Callable[[Exception], bool],
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+    ):
+        """
+        :param is_transient: Tells whether an exception is worth retrying and counts as a service failure.
+        :param failure_threshold: Consecutive transient failures that open the breaker.
+        :param reset_timeout: Seconds the breaker stays open before a trial call is allowed.
+        :param base_delay: First retry delay bound, doubled on each further retry.
+        :param max_delay: Upper bound of a single retry delay.
+        """
+        self.is_transient = is_transient
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._listeners: list[Callable[[str], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, callback: Callable[[str], None]):
+        """Registers ``callback(state)``, called from the calling thread whenever the state changes."""
+        self._listeners.append(callback)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def is_open(self) -> bool:
+        """True while calls are being refused (half-open counts as closed: a trial may go through)."""
+        return self.state == OPEN
+
+    def seconds_until_retry(self) -> float:
+        """Seconds left before an open breaker allows a trial call."""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def _set_state(self, state: str):
+        # Called with the lock held; returns whether listeners must be told
+        changed = state != self._state
+        self._state = state
+        return changed
+
+    def _notify(self, state: str):
+        for callback in list(self._listeners):
+            try:
+                callback(state)
+            except Exception as e:
+                print(f"Circuit breaker listener failed: {e}")
+
+    def _before_call(self):
+        changed = False
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("Supabase is unavailable; not retrying until the circuit breaker resets.")
+                changed = self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._trial_in_flight:
+                    raise CircuitOpenError("Supabase is unavailable; a trial request is already in progress.")
+                self._trial_in_flight = True
+        if changed:
+            self._notify(HALF_OPEN)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            changed = self._set_state(CLOSED)
+        if changed:
+            self._notify(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            changed = False
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                changed = self._set_state(OPEN)
+        if changed:
+            self._notify(OPEN)
+
+    def call(self, fn: Callable[[], object], retries: int = 0):
+        """
+        Runs *fn* through the breaker, retrying transient failures up to *retries* times.
+        :raises CircuitOpenError: If the breaker is open (also between retries).
+        :raises Exception: The last error from *fn* once retries are used up, or any non-transient error.
+        """
+        attempt = 0
+        while True:
+            self._before_call()
+            try:
+                result = fn()
+            except Exception as e:
+                if not self.is_transient(e):
+                    self.record_success()  # The service answered; the request itself was refused
+                    raise
+                self.record_failure()
+                if attempt >= retries or self.is_open():
+                    raise
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                print(f"Transient Supabase error ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+            else:
+                self.record_success()
+                return result
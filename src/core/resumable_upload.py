@@ -0,0 +1,214 @@
+"""Chunked, resumable uploads to Supabase Storage over the TUS protocol.
+
+Large document scans are streamed from the open file handle one chunk at a
+time, so peak memory is a single chunk regardless of file size. The TUS upload
+URL handed out by Storage is remembered in the local ``resumable_uploads``
+table; if the connection drops, the next attempt (in this run or after a
+restart) asks the server for the last acknowledged offset with ``HEAD`` and
+continues from there instead of starting over.
+
+Supabase requires every chunk except the last to be exactly 6 MB.
+"""
+import base64
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import requests
+
+from src.core.db_manager import plain_connection
+
+TUS_VERSION = "1.0.0"
+CHUNK_SIZE = 6 * 1024 * 1024
+
+# Storage discards unfinished uploads after 24 hours; don't try to resume older ones.
+_RESUME_WINDOW_SECONDS = 23 * 3600
+
+
+class UploadError(Exception):
+    """Raised when a resumable upload cannot be completed."""
+
+
+def _encode_metadata(metadata: dict) -> str:
+    return ",".join(
+        f"{key} {base64.b64encode(str(value).encode('utf-8')).decode('ascii')}"
+        for key, value in metadata.items()
+    )
+
+
+class ResumableUploader:
+    def __init__(
+        self,
+        supabase_url: str,
+        supabase_key: str,
+        db_name: str = "app_config.db",
+        chunk_size: int = CHUNK_SIZE,
+        max_retries: int = 5,
+        timeout: int = 60,
+    ):
+        self.endpoint = f"{supabase_url.rstrip('/')}/storage/v1/upload/resumable"
+        self.supabase_key = supabase_key
+        self.db_name = db_name
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._create_table()
+
+    def _create_table(self):
+        """Creates the table holding in-progress TUS upload URLs."""
+        try:
+            with plain_connection(self.db_name) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS resumable_uploads (
+                        fingerprint TEXT PRIMARY KEY,
+                        upload_url TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                """)
+        except sqlite3.Error as e:
+            print(f"Error creating resumable_uploads table: {e}")
+            raise
+
+    def _headers(self, **extra) -> dict:
+        headers = {
+            "Authorization": f"Bearer {self.supabase_key}",
+            "apikey": self.supabase_key,
+            "Tus-Resumable": TUS_VERSION,
+        }
+        headers.update(extra)
+        return headers
+
+    # ------------------------------------------------------------------
+    # Resume state (a fresh connection per call: uploads run on pool threads)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _fingerprint(local_file_path: str, bucket_name: str, object_path: str) -> str:
+        stat = os.stat(local_file_path)
+        return f"{bucket_name}/{object_path}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _load_upload_url(self, fingerprint: str) -> str | None:
+        with plain_connection(self.db_name) as conn:
+            row = conn.execute(
+                "SELECT upload_url, created_at FROM resumable_uploads WHERE fingerprint = ?",
+                (fingerprint,),
+            ).fetchone()
+        if row and time.time() - row["created_at"] < _RESUME_WINDOW_SECONDS:
+            return row["upload_url"]
+        return None
+
+    def _store_upload_url(self, fingerprint: str, upload_url: str | None):
+        with plain_connection(self.db_name) as conn:
+            if upload_url is None:
+                conn.execute("DELETE FROM resumable_uploads WHERE fingerprint = ?", (fingerprint,))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO resumable_uploads (fingerprint, upload_url, created_at) VALUES (?, ?, ?)",
+                    (fingerprint, upload_url, time.time()),
+                )
+
+    # ------------------------------------------------------------------
+    # Protocol
+    # ------------------------------------------------------------------
+
+    def _create_upload(self, session, size: int, bucket_name: str, object_path: str, content_type: str, upsert: bool) -> str:
+        metadata = {
+            "bucketName": bucket_name,
+            "objectName": object_path,
+            "contentType": content_type,
+            "cacheControl": "3600",
+        }
+        resp = session.post(
+            self.endpoint,
+            headers=self._headers(**{
+                "Upload-Length": str(size),
+                "Upload-Metadata": _encode_metadata(metadata),
+                "x-upsert": "true" if upsert else "false",
+            }),
+            timeout=self.timeout,
+        )
+        if resp.status_code != 201 or "Location" not in resp.headers:
+            raise UploadError(f"Could not create upload for {object_path}: {resp.status_code} {resp.text}")
+        return requests.compat.urljoin(self.endpoint, resp.headers["Location"])
+
+    def _server_offset(self, session, upload_url: str) -> int | None:
+        """Return the server's acknowledged offset, or None if the upload is gone."""
+        resp = session.head(upload_url, headers=self._headers(), timeout=self.timeout)
+        if resp.status_code in (404, 410):
+            return None
+        resp.raise_for_status()
+        return int(resp.headers["Upload-Offset"])
+
+    def upload(
+        self,
+        local_file_path: str,
+        bucket_name: str,
+        object_path: str,
+        content_type: str,
+        upsert: bool = True,
+        progress_callback=None,
+    ):
+        """
+        Streams *local_file_path* to ``bucket_name/object_path``, resuming any
+        earlier interrupted attempt for the same unchanged file.
+
+        Transient network errors are retried with exponential backoff; each
+        retry re-reads the server offset, so only unacknowledged bytes are sent
+        again.
+        :param progress_callback: Called as ``callback(bytes_sent, total_bytes)``.
+        :raises UploadError: If the upload still fails after ``max_retries`` attempts.
+        """
+        size = os.path.getsize(local_file_path)
+        fingerprint = self._fingerprint(local_file_path, bucket_name, object_path)
+        upload_url = self._load_upload_url(fingerprint)
+        attempt = 0
+
+        with requests.Session() as session, open(local_file_path, "rb") as f:
+            while True:
+                try:
+                    offset = self._server_offset(session, upload_url) if upload_url else None
+                    if offset is None:
+                        upload_url = self._create_upload(session, size, bucket_name, object_path, content_type, upsert)
+                        self._store_upload_url(fingerprint, upload_url)
+                        offset = 0
+                    elif offset:
+                        print(f"Resuming upload of {object_path} at {offset}/{size} bytes")
+
+                    f.seek(offset)
+                    while offset < size:
+                        chunk = f.read(self.chunk_size)
+                        resp = session.patch(
+                            upload_url,
+                            data=chunk,
+                            headers=self._headers(**{
+                                "Upload-Offset": str(offset),
+                                "Content-Type": "application/offset+octet-stream",
+                            }),
+                            timeout=self.timeout,
+                        )
+                        if resp.status_code in (404, 410):
+                            upload_url = None  # Expired on the server; start a new upload
+                            raise requests.ConnectionError(f"Upload URL expired ({resp.status_code})")
+                        if resp.status_code == 409:
+                            # Offset mismatch; the HEAD on the next round re-syncs
+                            raise requests.ConnectionError("Upload offset conflict")
+                        resp.raise_for_status()
+                        offset = int(resp.headers.get("Upload-Offset", offset + len(chunk)))
+                        attempt = 0  # Progress was made; reset the retry budget
+                        if progress_callback:
+                            progress_callback(offset, size)
+
+                    self._store_upload_url(fingerprint, None)
+                    return
+                except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                    status = getattr(getattr(e, "response", None), "status_code", None)
+                    if status is not None and 400 <= status < 500 and status not in (408, 429):
+                        self._store_upload_url(fingerprint, None)
+                        raise UploadError(f"Upload of {object_path} rejected: {e}") from e
+                    attempt += 1
+                    if attempt > self.max_retries:
+                        raise UploadError(f"Upload of {object_path} failed after {self.max_retries} retries: {e}") from e
+                    delay = min(2 ** attempt, 30)
+                    print(f"Upload of {object_path} interrupted ({e}); retrying in {delay}s")
+                    time.sleep(delay)
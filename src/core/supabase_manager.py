@@ -1,20 +1,148 @@
 import os
 import json
+import socket
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+import httpx
 from postgrest.exceptions import APIError
 from gotrue.errors import AuthApiError
 from src.core.db_manager import DBManager # To get Supabase URL and Key
-from datetime import datetime
+from src.core.image_store import ImageStore, hash_file, sniff_image_type
+from src.core.upload_ledger import UploadLedger
+from src.core.resumable_upload import ResumableUploader, CHUNK_SIZE
+from datetime import datetime, timedelta, timezone
+from urllib.parse import unquote, urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import functools
+import threading
+from collections import Counter
+from src.core.query_cache import QueryCache
+from src.core.resilience import CircuitBreaker
+from src.core.realtime import RealtimeFeed
+
+# Upper bound on concurrent Storage uploads; keeps slow links from being saturated.
+MAX_UPLOAD_WORKERS = 6
+
+# Document images attached to a room or rental; each has a ``<key>_path`` / ``<key>_url`` pair.
+ROOM_IMAGE_KEYS = ("photo", "nid_front", "nid_back", "police_form")
+
+# Seconds query results are served from cache, and how long stale results may be
+# shown while they are refreshed in the background.
+CACHE_TTL_SECONDS = 60
+CACHE_MAX_STALE_SECONDS = 600
+
+# Per-request timeouts (seconds); a hung request fails and counts toward the circuit breaker.
+REQUEST_TIMEOUT_SECONDS = 10
+STORAGE_TIMEOUT_SECONDS = 60
+
+# Seconds a connectivity probe (TCP connect to the project host) may take.
+PROBE_TIMEOUT_SECONDS = 3
+
+# Extra attempts for idempotent requests that fail transiently.
+MAX_RETRIES = 2
+
+# Error codes worth retrying: HTTP timeouts, throttling and gateway errors, plus
+# Postgres serialization failures and statement timeouts.
+TRANSIENT_ERROR_CODES = {"408", "429", "500", "502", "503", "504", "40001", "57014"}
+
+# Rows per request for paged reads; well under PostgREST's default max-rows of 1000.
+PAGE_SIZE = 200
+
+# Keys per in_() filter in bulk writes; 100 UUIDs keep the request URL well under common proxy limits.
+BULK_CHUNK_SIZE = 100
+
+# Storage garbage collection: objects listed per request (Storage's maximum), paths per
+# remove() call, and how old an unreferenced object must be before it counts as orphaned;
+# younger ones may belong to a save whose row has not been written yet.
+STORAGE_LIST_PAGE_SIZE = 1000
+STORAGE_REMOVE_BATCH_SIZE = 100
+STORAGE_GC_GRACE_SECONDS = 24 * 60 * 60
+
+# Tables whose ``<key>_url`` columns (see ROOM_IMAGE_KEYS) point into Storage.
+IMAGE_URL_TABLES = ("rental_records", "room_calculations")
+
+RENTAL_RECORD_COLUMNS = (
+    "id, supabase_id, tenant_name, room_number, advanced_paid, photo_url, nid_front_url, "
+    "nid_back_url, police_form_url, is_archived, created_at, updated_at"
+)
+
+# Lean projections for list views. Image URLs and the duplicated meter_N/diff_N keys
+# of main_data make up most of each row; they are fetched when a record is opened.
+RENTAL_SUMMARY_COLUMNS = "id, supabase_id, tenant_name, room_number, advanced_paid, is_archived, created_at, updated_at"
+HISTORY_SUMMARY_FIELDS = (
+    "meter_readings", "diff_readings", "total_unit_cost", "total_diff_units",
+    "per_unit_cost", "added_amount", "grand_total",
+)
+HISTORY_SUMMARY_SELECT = "id, month, year, created_at, " + ", ".join(
+    f"main_data->{field}" for field in HISTORY_SUMMARY_FIELDS
+)
+
+
+def _is_transient(exc: Exception) -> bool:
+    """True for failures that say nothing about the request itself: network errors, timeouts, 5xx."""
+    if isinstance(exc, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(exc, APIError):
+        return str(exc.code) in TRANSIENT_ERROR_CODES
+    return False
+
+
+def _invalidates(*tables):
+    """Decorator for write methods: drops cached reads of *tables* once the write returns."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.cache.invalidate(*tables)
+        return wrapper
+    return decorator
+
+
+def _aware_timestamp(value) -> str:
+    """Return *value* (a local timestamp, e.g. ``rentals.updated_at``) offset-aware; now if missing or unparsable."""
+    try:
+        dt = datetime.fromisoformat(str(value)) if value else datetime.now()
+    except ValueError:
+        dt = datetime.now()
+    return dt.astimezone().isoformat()
 
 class SupabaseManager:
-    def __init__(self):
+    def __init__(self, cache_ttl: float = CACHE_TTL_SECONDS, db_name: str = "app_config.db", connect: bool = True):
+        """
+        :param db_name: Local database holding the encrypted Supabase URL and key.
+        :param connect: Create the client now. Pass False to construct cheaply and call
+                        ``connect()`` later, e.g. from a worker thread.
+        """
+        self.cache = QueryCache(ttl=cache_ttl, max_stale=CACHE_MAX_STALE_SECONDS)
+        self.breaker = CircuitBreaker(_is_transient)
         self.supabase: Client = None
-        self.db_manager = DBManager() # Use DBManager to get Supabase config
-        self._initialize_supabase_client()
+        self.uploader: ResumableUploader | None = None
+        self.ledger: UploadLedger | None = None
+        self.db_name = db_name
+        self._credentials: tuple[str, str] | None = None
+        self._connect_lock = threading.Lock()
+        # The column the incremental rentals pull pages by; see get_rental_records_changed_since
+        self._rentals_change_column = "changed_at"
+        if connect:
+            self.connect()
+
+    def connect(self) -> bool:
+        """
+        (Re)creates the client from the stored configuration. Thread safe; the slow parts
+        (keyring, decryption, client construction) run in the calling thread.
+        :return: True if the client is ready.
+        """
+        with self._connect_lock:
+            self._initialize_supabase_client()
+        return self.is_client_initialized()
 
     def _initialize_supabase_client(self):
         """Initializes the Supabase client using credentials from the local DB."""
-        config = self.db_manager.get_config()
+        # A short-lived connection: this may run on a worker thread
+        with DBManager(self.db_name) as db:
+            config = db.get_config()
         supabase_url = config.get("SUPABASE_URL")
         supabase_key = config.get("SUPABASE_KEY")
 
@@ -25,15 +153,74 @@ class SupabaseManager:
 
 
         try:
-            self.supabase = create_client(supabase_url, supabase_key)
+            client = create_client(
+                supabase_url, supabase_key,
+                options=ClientOptions(
+                    postgrest_client_timeout=REQUEST_TIMEOUT_SECONDS,
+                    storage_client_timeout=STORAGE_TIMEOUT_SECONDS,
+                ),
+            )
+            self.uploader = ResumableUploader(supabase_url, supabase_key, db_name=self.db_name)
+            self.ledger = UploadLedger(self.db_name)
+            self._credentials = (supabase_url, supabase_key)
+            self.supabase = client  # Published last: is_client_initialized() implies the rest is set up
         except Exception as e:
             self.supabase = None
+            self.uploader = None
+            self.ledger = None
             print(f"Failed to initialize Supabase client: {e}")
+        # Results cached from a previous project/key must not be served
+        self.cache.invalidate()
 
     def is_client_initialized(self) -> bool:
         """Checks if the Supabase client is initialized and ready for use."""
         return self.supabase is not None
 
+    def create_realtime_feed(self, tables: tuple[str, ...], on_change, on_status=None) -> RealtimeFeed | None:
+        """
+        Builds a Realtime change feed for *tables* with the current credentials.
+        :return: The feed (not yet running), or None if the client is not initialized.
+        """
+        if not self.is_client_initialized() or self._credentials is None:
+            print("Supabase client not initialized. Cannot subscribe to realtime changes.")
+            return None
+        supabase_url, supabase_key = self._credentials
+        return RealtimeFeed(supabase_url, supabase_key, tables, on_change, on_status)
+
+    def is_reachable(self, timeout: float = PROBE_TIMEOUT_SECONDS) -> bool:
+        """
+        Probes the configured project host with a TCP connect. Blocking; call from a worker thread.
+        :return: True if the host accepted a connection, False if it did not or no project is configured.
+        """
+        if self._credentials is None:
+            return False
+        url = urlsplit(self._credentials[0])
+        if not url.hostname:
+            return False
+        port = url.port or (80 if url.scheme == "http" else 443)
+        try:
+            with socket.create_connection((url.hostname, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+    def is_available(self) -> bool:
+        """True if the client is set up and the circuit breaker is not refusing calls."""
+        return self.is_client_initialized() and not self.breaker.is_open()
+
+    def _call(self, fn, idempotent: bool = True):
+        """
+        Runs one Supabase request through the circuit breaker. Idempotent requests are
+        retried with jittered backoff on transient errors; inserts are not, since a
+        retry after a lost response would write the row twice.
+        :raises CircuitOpenError: While Supabase is considered down.
+        """
+        return self.breaker.call(fn, retries=MAX_RETRIES if idempotent else 0)
+
+    def _execute(self, query, idempotent: bool = True):
+        """``query.execute()`` through ``_call``."""
+        return self._call(query.execute, idempotent)
+
     def upload_image(self, local_file_path: str, bucket_name: str = "rental-images", folder: str = "rentals") -> str | None:
         """
         Uploads an image to Supabase Storage and returns its public URL.
@@ -50,25 +237,202 @@ class SupabaseManager:
             print(f"Local file not found: {local_file_path}")
             return None
 
+        try:
+            return self._put_image(local_file_path, bucket_name, folder)
+        except Exception as e:
+            print(f"Error uploading image {local_file_path}: {e}")
+            return None
+
+    def _put_image(self, local_file_path: str, bucket_name: str, folder: str) -> str:
+        """
+        Uploads one file and returns its public URL. Raises on any failure.
+        Files larger than one TUS chunk are streamed through the resumable
+        uploader; smaller ones go up in a single request.
+
+        Content uploaded within the last STORAGE_GC_GRACE_SECONDS (per the local
+        upload ledger) is not sent again; the recorded public URL is returned
+        straight away. Older entries are not trusted: a Storage sweep, possibly
+        run on another machine whose ledger this one never sees, may have removed
+        the object. The file is uploaded again with upsert instead, which also
+        renews the object's timestamp so a sweep keeps it for another grace period.
+        """
         file_name = os.path.basename(local_file_path)
         storage_path = f"{folder}/{file_name}"
 
-        try:
-            with open(local_file_path, 'rb') as f:
+        # Content-addressed store blobs carry their hash in the name; hash anything else.
+        digest = ImageStore.digest_of(local_file_path) or hash_file(local_file_path)
+        if self.ledger is not None:
+            cached_url = self.ledger.lookup(digest, bucket_name, max_age_seconds=STORAGE_GC_GRACE_SECONDS)
+            if cached_url:
+                return cached_url
+
+        with open(local_file_path, 'rb') as f:
+            _ext, content_type = sniff_image_type(f.read(16))
+            if os.fstat(f.fileno()).st_size > CHUNK_SIZE and self.uploader is not None:
+                self.uploader.upload(local_file_path, bucket_name, storage_path, content_type, upsert=True)
+            else:
+                f.seek(0)
+                data = f.read()
                 # Set "upsert" to "true" (as a string) in file_options to overwrite if it exists.
-                self.supabase.storage.from_(bucket_name).upload(
+                self._call(lambda: self.supabase.storage.from_(bucket_name).upload(
                     path=storage_path, 
-                    file=f.read(), 
-                    file_options={"content-type": "image/jpeg", "upsert": "true"}
-                )
-                
-                # If we reach here, the upload was successful. Get the public URL.
-                public_url_response = self.supabase.storage.from_(bucket_name).get_public_url(storage_path)
-                return public_url_response
+                    file=data, 
+                    file_options={"content-type": content_type, "upsert": "true"}
+                ))
+
+        # If we reach here, the upload was successful. Get the public URL.
+        public_url = self.supabase.storage.from_(bucket_name).get_public_url(storage_path)
+        if self.ledger is not None:
+            self.ledger.record(digest, bucket_name, storage_path, public_url)
+        return public_url
+
+    def upload_images(self, local_file_paths: dict, bucket_name: str = "rental-images", folder: str = "rentals") -> tuple[dict, dict]:
+        """
+        Uploads several images concurrently over a bounded thread pool.
+        The total time is roughly that of the slowest single upload rather than the sum.
+        :param local_file_paths: Mapping of caller-chosen key -> local file path.
+        :param bucket_name: The name of the Supabase Storage bucket.
+        :param folder: The folder within the bucket to store the images.
+        :return: ``(urls, errors)``: key -> public URL for each successful upload and
+                 key -> error message for each failed one.
+        """
+        urls: dict = {}
+        errors: dict = {}
+        if not self.is_client_initialized():
+            return urls, {key: "Supabase client not initialized." for key in local_file_paths}
+
+        # The same file may back several keys (e.g. one scan reused); upload it once.
+        keys_by_path: dict[str, list] = {}
+        for key, path in local_file_paths.items():
+            if not path or not os.path.exists(path):
+                errors[key] = f"Local file not found: {path}"
+                continue
+            keys_by_path.setdefault(path, []).append(key)
+
+        if not keys_by_path:
+            return urls, errors
+
+        with ThreadPoolExecutor(max_workers=min(MAX_UPLOAD_WORKERS, len(keys_by_path))) as pool:
+            futures = {
+                pool.submit(self._put_image, path, bucket_name, folder): path
+                for path in keys_by_path
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    url = future.result()
+                    for key in keys_by_path[path]:
+                        urls[key] = url
+                except Exception as e:
+                    print(f"Error uploading image {path}: {e}")
+                    for key in keys_by_path[path]:
+                        errors[key] = str(e)
+        return urls, errors
+
+    def collect_storage_garbage(
+        self,
+        bucket_name: str = "rental-images",
+        folder: str = "rentals",
+        dry_run: bool = False,
+        keep_urls: set[str] | None = None,
+        grace_seconds: int = STORAGE_GC_GRACE_SECONDS,
+    ) -> list[str] | None:
+        """
+        Removes images under *folder* that no rental record or room calculation
+        points at any more: those left behind by deleted records and by room rows
+        replaced on save. Objects written within *grace_seconds* are kept; that
+        covers uploads _put_image skipped through the ledger, since it only skips
+        them within the same period.
+        :param bucket_name: The name of the Supabase Storage bucket.
+        :param folder: The folder within the bucket to sweep.
+        :param dry_run: Only report what would be removed.
+        :param keep_urls: Further public URLs to treat as referenced (e.g. queued saves).
+        :return: Storage paths that were (or would be) removed, or None if the sweep failed.
+        """
+        if not self.is_client_initialized():
+            print("Supabase client not initialized. Cannot collect storage garbage.")
+            return None
+        try:
+            # Read the references first: an object uploaded after this point is inside the grace period.
+            referenced = self._referenced_storage_paths(bucket_name)
+            referenced.update(
+                path for path in (self._storage_path_from_url(url, bucket_name) for url in keep_urls or ()) if path
+            )
+            cutoff = (datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)).strftime("%Y-%m-%dT%H:%M:%S")
+            orphans = [
+                path for path, stamp in self._list_storage_objects(bucket_name, folder)
+                if path not in referenced and (stamp or "")[:19] < cutoff
+            ]
+
+            if not dry_run:
+                bucket = self.supabase.storage.from_(bucket_name)
+                for start in range(0, len(orphans), STORAGE_REMOVE_BATCH_SIZE):
+                    batch = orphans[start:start + STORAGE_REMOVE_BATCH_SIZE]
+                    self._call(lambda: bucket.remove(batch))
+                    # Forget the uploads, or saving the same content again would reuse a dead URL
+                    if self.ledger is not None:
+                        self.ledger.forget(bucket_name, batch)
+            print(f"Storage GC: {len(orphans)} orphaned image(s) in {bucket_name}/{folder}{' (dry run)' if dry_run else ' removed'}.")
+            return orphans
+        except (APIError, AuthApiError) as e:
+            print(f"Supabase API error collecting storage garbage: {e}")
+            return None
         except Exception as e:
-            print(f"Error uploading image {local_file_path}: {e}")
+            print(f"An unexpected error occurred collecting storage garbage: {e}")
+            return None
+
+    def _list_storage_objects(self, bucket_name: str, folder: str):
+        """Yields ``(storage_path, updated_at)`` for every file directly under *folder*."""
+        bucket = self.supabase.storage.from_(bucket_name)
+        offset = 0
+        while True:
+            page = self._call(lambda: bucket.list(folder, {
+                "limit": STORAGE_LIST_PAGE_SIZE,
+                "offset": offset,
+                "sortBy": {"column": "name", "order": "asc"},
+            }))
+            for entry in page:
+                if entry.get("id") is None:
+                    continue  # A sub-folder, not a file
+                # updated_at moves on when an upsert rewrites the object; created_at does not
+                yield f"{folder}/{entry['name']}", entry.get("updated_at") or entry.get("created_at")
+            if len(page) < STORAGE_LIST_PAGE_SIZE:
+                return
+            offset += len(page)
+
+    def _referenced_storage_paths(self, bucket_name: str) -> set[str]:
+        """
+        Storage paths of every image URL stored in IMAGE_URL_TABLES, read uncached in
+        id order. Raises on any failure, since a partial set would mark live images as orphans.
+        """
+        columns = ", ".join(f"{key}_url" for key in ROOM_IMAGE_KEYS)
+        paths = set()
+        for table in IMAGE_URL_TABLES:
+            last_id = None
+            while True:
+                query = self.supabase.table(table).select(f"id, {columns}").order("id").limit(PAGE_SIZE)
+                if last_id is not None:
+                    query = query.gt("id", last_id)
+                rows = self._execute(query).data or []
+                for row in rows:
+                    for key in ROOM_IMAGE_KEYS:
+                        path = self._storage_path_from_url(row.get(f"{key}_url"), bucket_name)
+                        if path:
+                            paths.add(path)
+                if len(rows) < PAGE_SIZE:
+                    break
+                last_id = rows[-1]["id"]
+        return paths
+
+    @staticmethod
+    def _storage_path_from_url(url: str | None, bucket_name: str) -> str | None:
+        """Return the object path of a public Storage URL in *bucket_name*, or None for anything else."""
+        marker = f"/object/public/{bucket_name}/"
+        if not url or marker not in url:
             return None
+        return unquote(url.split(marker, 1)[1].split("?", 1)[0])
 
+    @_invalidates("main_calculations", "room_calculations")
     def save_main_calculation(self, main_calc_data: dict) -> int | None:
         """
         Saves or updates main calculation data to Supabase.
@@ -96,14 +460,14 @@ class SupabaseManager:
 
         try:
             # Check for existing record
-            response = self.supabase.table("main_calculations").select("id").eq("month", month).eq("year", year).execute()
+            response = self._execute(self.supabase.table("main_calculations").select("id").eq("month", month).eq("year", year))
             main_calc_id = None
             if response.data:
                 main_calc_id = response.data[0]['id']
 
             if main_calc_id:
                 # Update existing record
-                update_response = self.supabase.table("main_calculations").update(data_to_save).eq("id", main_calc_id).execute()
+                update_response = self._execute(self.supabase.table("main_calculations").update(data_to_save).eq("id", main_calc_id))
                 if update_response.data:
                     print(f"Main calculation data updated for {month} {year}")
                     return main_calc_id
@@ -112,7 +476,7 @@ class SupabaseManager:
                     return None
             else:
                 # Insert new record
-                insert_response = self.supabase.table("main_calculations").insert(data_to_save).execute()
+                insert_response = self._execute(self.supabase.table("main_calculations").insert(data_to_save), idempotent=False)
                 if insert_response.data:
                     new_id = insert_response.data[0]['id']
                     print(f"Main calculation data inserted for {month} {year} with ID: {new_id}")
@@ -127,12 +491,146 @@ class SupabaseManager:
             print(f"An unexpected error occurred saving main calculation: {e}")
             return None
 
+    @_invalidates("main_calculations", "room_calculations")
+    def save_calculation(self, main_calc_data: dict, room_data_list: list[dict] | None = None) -> int | None:
+        """
+        Saves a month's main calculation and, if given, its rooms in a single
+        transaction on the server (see supabase/migrations/).
+
+        The server pairs the given rooms with the month's stored rows (by ``id``,
+        or by a room name unique on both sides) and writes only the rows that
+        changed, so a save is one round trip however many rooms it touches.
+
+        Falls back to save_main_calculation + save_room_calculations when the
+        RPC has not been deployed to the project yet.
+        :param main_calc_data: Main calculation dict; must include 'month' and 'year'.
+        :param room_data_list: Room dicts as accepted by save_room_calculations, or
+                               None to leave the stored rooms untouched.
+        :return: The ID of the main calculation record, or None on failure.
+        """
+        if not self.is_client_initialized():
+            print("Supabase client not initialized. Cannot save calculation.")
+            return None
+
+        month = main_calc_data.get("month")
+        year = main_calc_data.get("year")
+        if not (month and year):
+            print("Month and year are required for main calculation.")
+            return None
+
+        try:
+            params = {"p_month": month, "p_year": int(year), "p_main_data": main_calc_data, "p_rooms": None}
+            summary = "rooms unchanged"
+            if room_data_list is not None:
+                image_urls = self._upload_room_images(room_data_list)
+                records = self._build_room_records(room_data_list, image_urls)
+                params["p_rooms"] = [
+                    {"id": source.get("id"), **record} for source, record in zip(room_data_list, records)
+                ]
+                summary = f"{len(records)} room(s) sent"
+
+            response = self._execute(self.supabase.rpc("save_calculation", params))
+            main_calc_id = response.data
+            if isinstance(main_calc_id, list):  # Older PostgREST versions wrap scalars
+                main_calc_id = main_calc_id[0] if main_calc_id else None
+            if main_calc_id:
+                print(f"Calculation saved for {month} {year} (ID: {main_calc_id}, {summary})")
+            return main_calc_id
+        except (APIError, AuthApiError) as e:
+            if getattr(e, "code", None) == "PGRST202":  # Function not found in the schema cache
+                print("save_calculation RPC not deployed; falling back to separate requests.")
+                main_calc_id = self.save_main_calculation(main_calc_data)
+                # An empty list still clears the month's rooms, as the RPC does; None leaves them alone
+                if main_calc_id and room_data_list is not None:
+                    if not self.save_room_calculations(main_calc_id, room_data_list):
+                        return None
+                return main_calc_id
+            print(f"Supabase API error saving calculation: {e}")
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred saving calculation: {e}")
+            return None
+
+    @staticmethod
+    def _diff_room_records(stored_rooms: list[dict], room_data_list: list[dict], records: list[dict]) -> tuple[list[dict], list[int]]:
+        """
+        Compares new room rows against the stored ones of the same month.
+
+        A new row is matched to a stored one by its ``id`` (as EditRecordDialog
+        passes it) or, failing that, by ``room_data.room_name`` when exactly one
+        stored row and exactly one new row carry that name; rooms sharing a name
+        are never paired by it. Matched rows whose payload and image URLs are
+        unchanged are dropped.
+        :param stored_rooms: Stored rows with ``id``, ``room_data`` and the ``*_url`` columns.
+        :param room_data_list: The caller's room dicts (may carry ``id``).
+        :param records: The rows built from room_data_list by _build_room_records.
+        :return: ``(upserts, delete_ids)``: changed or new rows (``id`` is None for new
+                 ones) and the ids of stored rooms that are no longer present.
+        """
+        def name_of(row):
+            return (row.get("room_data") or {}).get("room_name")
+
+        by_id = {row["id"]: row for row in stored_rooms if row.get("id") is not None}
+        stored_names = Counter(name_of(row) for row in by_id.values())
+        new_names = Counter(name_of(record) for record in records)
+        by_name = {name_of(row): row for row in by_id.values() if stored_names[name_of(row)] == 1}
+
+        # Ids first, so a room matched by name can never take a row another room names by id
+        matches = [by_id.get(source.get("id")) for source in room_data_list]
+        matched_ids = {match["id"] for match in matches if match is not None}
+        for position, record in enumerate(records):
+            name = name_of(record)
+            if matches[position] is not None or name is None or new_names[name] != 1:
+                continue
+            candidate = by_name.get(name)
+            if candidate is not None and candidate["id"] not in matched_ids:
+                matches[position] = candidate
+                matched_ids.add(candidate["id"])
+
+        upserts = []
+        for match, record in zip(matches, records):
+            if match is None:
+                upserts.append({"id": None, **record})
+                continue
+            unchanged = (match.get("room_data") or {}) == record["room_data"] and all(
+                match.get(column) == value for column, value in record.items() if column != "room_data"
+            )
+            if not unchanged:
+                upserts.append({"id": match["id"], **record})
+
+        delete_ids = [row_id for row_id in by_id if row_id not in matched_ids]
+        return upserts, delete_ids
+
+    @staticmethod
+    def _build_room_records(room_data_list: list[dict], image_urls: dict) -> list[dict]:
+        """
+        Builds room_calculations rows (without main_calculation_id) from room dicts
+        and the ``(room_index, image_key) -> url`` mapping of _upload_room_images.
+        """
+        records = []
+        for idx, room_data in enumerate(room_data_list):
+            # Determine the JSONB payload for room_data
+            if "room_data" in room_data and isinstance(room_data["room_data"], dict):
+                room_jsonb = room_data["room_data"]
+            else:
+                # Build JSONB from all keys that are not image path references
+                room_jsonb = {k: v for k, v in room_data.items() if not k.endswith("_path") and k not in ("room_data", "id")}
+
+            record = {"room_data": room_jsonb}
+            for key in ROOM_IMAGE_KEYS:
+                record[f"{key}_url"] = image_urls.get((idx, key))
+            records.append(record)
+        return records
+
+    @_invalidates("main_calculations", "room_calculations")
     def save_room_calculations(self, main_calc_id: int, room_data_list: list[dict]) -> bool:
         """
-        Saves room calculation data to Supabase, handling image uploads.
-        Existing room calculations are **replaced** in a two-step process that mimics a
-        transaction: we first insert the new records and only if that succeeds do we
-        delete the previous ones. This prevents data loss if the insert fails.
+        Saves room calculation data to Supabase, handling image uploads. save_calculation
+        uses this when its RPC is not deployed; the RPC does the same diff on the server.
+        The new room list is diffed against the stored rows (see _diff_room_records)
+        and only the needed changes are sent, batched: one upsert for changed and
+        new rooms, then one delete for removed rooms. Deleting last means a failed
+        write never loses existing rooms.
         :param main_calc_id: The ID of the associated main calculation.
         :param room_data_list: A list of dictionaries, each containing room data and local image paths.
         :return: True if successful, False otherwise.
@@ -146,78 +644,41 @@ class SupabaseManager:
             return False
 
         try:
-            # Fetch the IDs of any existing records FIRST so we can remove them **after** a successful insert.
-            # This mimics a simple transaction-like behaviour to avoid permanent data loss if the insert fails.
-            old_records_resp = (
+            stored_resp = self._execute(
                 self.supabase.table("room_calculations")
-                .select("id")
+                .select("id, room_data, photo_url, nid_front_url, nid_back_url, police_form_url")
                 .eq("main_calculation_id", main_calc_id)
-                .execute()
             )
+            stored_rooms = stored_resp.data if stored_resp and stored_resp.data else []
 
-            old_record_ids: list[int] = []
-            if old_records_resp and old_records_resp.data:
-                old_record_ids = [rec["id"] for rec in old_records_resp.data if "id" in rec]
-                print(f"Found {len(old_record_ids)} existing room calculations that will be deleted after a successful insert.")
-
-            records_to_insert = []
-            for room_data in room_data_list:
-                # Upload images and get URLs
-                photo_url = self.upload_image(room_data.get("photo_path")) if room_data.get("photo_path") else None
-                nid_front_url = self.upload_image(room_data.get("nid_front_path")) if room_data.get("nid_front_path") else None
-                nid_back_url = self.upload_image(room_data.get("nid_back_path")) if room_data.get("nid_back_path") else None
-                police_form_url = self.upload_image(room_data.get("police_form_path")) if room_data.get("police_form_path") else None
-
-                # Determine the JSONB payload for room_data
-                if "room_data" in room_data and isinstance(room_data["room_data"], dict):
-                    room_jsonb = room_data["room_data"]
-                else:
-                    # Build JSONB from all keys that are not image path references
-                    room_jsonb = {k: v for k, v in room_data.items() if not k.endswith("_path") and k != "room_data"}
-
-                # Prepare data for JSONB column and URL columns
-                record = {
-                    "main_calculation_id": main_calc_id,
-                    "room_data": room_jsonb,
-                    "photo_url": photo_url,
-                    "nid_front_url": nid_front_url,
-                    "nid_back_url": nid_back_url,
-                    "police_form_url": police_form_url
-                }
-                records_to_insert.append(record)
-            
-            if records_to_insert:
-                insert_response = self.supabase.table("room_calculations").insert(records_to_insert).execute()
-                if insert_response.data:
-                    print(
-                        f"Inserted {len(insert_response.data)} room calculation records."
-                    )
+            # Upload every room's documents in one parallel batch
+            image_urls = self._upload_room_images(room_data_list)
+            records = self._build_room_records(room_data_list, image_urls)
+            upserts, delete_ids = self._diff_room_records(stored_rooms, room_data_list, records)
 
-                    # Only delete the old records **after** we know the insert succeeded.
-                    if old_record_ids:
-                        try:
-                            del_resp = (
-                                self.supabase.table("room_calculations")
-                                .delete()
-                                .in_("id", old_record_ids)
-                                .execute()
-                            )
-                            print(
-                                f"Deleted {len(old_record_ids)} old room calculation records after successful insert."
-                            )
-                        except Exception as delete_exc:
-                            # Log the failure but do not report overall failure; duplicates are easier to handle
-                            print(
-                                f"Warning: Insert succeeded but deleting old room calculation records failed: {delete_exc}"
-                            )
-
-                    return True
-                else:
-                    print(f"Failed to insert room calculation data: {insert_response.json()}")
-                    return False
-            else:
-                print("No room calculation records to insert.")
-                return True # No rooms to insert, still considered successful
+            if upserts:
+                # Updates and inserts go up together; PostgREST fills new ids from the default
+                rows = [
+                    {**{k: v for k, v in row.items() if not (k == "id" and v is None)}, "main_calculation_id": main_calc_id}
+                    for row in upserts
+                ]
+                updates = [row for row in rows if "id" in row]
+                inserts = [row for row in rows if "id" not in row]
+                if updates:
+                    self._execute(self.supabase.table("room_calculations").upsert(updates))
+                if inserts:
+                    self._execute(self.supabase.table("room_calculations").insert(inserts), idempotent=False)
+
+            if delete_ids:
+                try:
+                    self._execute(self.supabase.table("room_calculations").delete().in_("id", delete_ids))
+                except Exception as delete_exc:
+                    # Log the failure but do not report overall failure; duplicates are easier to handle
+                    print(f"Warning: Room changes saved but deleting removed rooms failed: {delete_exc}")
+
+            print(f"Room calculations for {main_calc_id}: {len(upserts)} written, {len(delete_ids)} deleted, "
+                  f"{len(records) - len(upserts)} unchanged.")
+            return True
 
         except (APIError, AuthApiError) as e:
             print(f"Supabase API error saving room calculations: {e}")
@@ -246,7 +707,7 @@ class SupabaseManager:
             
             # If both are None, it's effectively get_all_main_calculations, but with limit 1
             # If only one is None, it filters by the other.
-            response = query.limit(1).execute()
+            response = self._execute(query.limit(1))
             if response.data:
                 return response.data[0] # Return the full record
             return None
@@ -257,27 +718,33 @@ class SupabaseManager:
             print(f"An unexpected error occurred retrieving main calculation: {e}")
             return None
 
-    def get_main_calculations(self, month: str | None = None, year: int | None = None) -> list[dict]:
+    def get_main_calculations(self, month: str | None = None, year: int | None = None, summary: bool = False) -> list[dict]:
         """
         Retrieves main calculation records from Supabase, optionally filtered by month and year.
         If both month and year are None, it retrieves all records.
         :param month: The month of the calculation (optional).
         :param year: The year of the calculation (optional).
+        :param summary: Select only the main_data fields the history table shows (see ``_fold_history_summary``).
         :return: A list of main calculation records.
         """
         if not self.is_client_initialized():
             print("Supabase client not initialized. Cannot retrieve main calculations.")
             return []
         try:
-            query = self.supabase.table("main_calculations").select("id, month, year, main_data")
+            columns = HISTORY_SUMMARY_SELECT if summary else "id, month, year, main_data"
+            query = self.supabase.table("main_calculations").select(columns)
             
             if month is not None:
                 query = query.eq("month", month)
             if year is not None:
                 query = query.eq("year", year)
             
-            response = query.order("year", desc=True).order("created_at", desc=True).execute()
-            return response.data if response.data else []
+            query = query.order("year", desc=True).order("created_at", desc=True)
+            if summary:
+                fetch = lambda: [self._fold_history_summary(row) for row in self._execute(query).data or []]
+            else:
+                fetch = lambda: self._execute(query).data or []
+            return self.cache.get_or_fetch(("main_calculations", columns, month, year), fetch)
         except (APIError, AuthApiError) as e:
             print(f"Supabase API error retrieving main calculations: {e}")
             return []
@@ -295,20 +762,24 @@ class SupabaseManager:
             print("Supabase client not initialized. Cannot retrieve room calculations.")
             return []
         try:
-            response = self.supabase.table("room_calculations").select("room_data, photo_url, nid_front_url, nid_back_url, police_form_url").eq("main_calculation_id", main_calculation_id).execute()
-            if response.data:
+            projection = "id, room_data, photo_url, nid_front_url, nid_back_url, police_form_url"
+
+            def fetch():
+                response = self._execute(self.supabase.table("room_calculations").select(projection).eq("main_calculation_id", main_calculation_id))
                 # Keep room_data nested so that UI code can access it consistently
                 return [
                     {
+                        "id": record.get("id"),
                         "room_data": record.get("room_data", {}),
                         "photo_url": record.get("photo_url"),
                         "nid_front_url": record.get("nid_front_url"),
                         "nid_back_url": record.get("nid_back_url"),
                         "police_form_url": record.get("police_form_url")
                     }
-                    for record in response.data
+                    for record in (response.data or [])
                 ]
-            return []
+
+            return self.cache.get_or_fetch(("room_calculations", projection, main_calculation_id), fetch)
         except (APIError, AuthApiError) as e:
             print(f"Supabase API error retrieving room calculations: {e}")
             return []
@@ -316,9 +787,192 @@ class SupabaseManager:
             print(f"An unexpected error occurred retrieving room calculations: {e}")
             return []
 
+    def iter_history_bundle_pages(
+        self, month: str | None = None, year: int | None = None, page_size: int = PAGE_SIZE, summary: bool = False
+    ):
+        """
+        Yields main calculations one page of months at a time, latest year first.
+
+        Each page is one request: PostgREST resource embedding over the
+        ``room_calculations.main_calculation_id`` foreign key brings every month's rooms
+        along, as a ``room_calculations`` list shaped like the output of ``get_room_calculations``.
+        :param month: The month of the calculation (optional).
+        :param year: The year of the calculation (optional).
+        :param page_size: Months per request.
+        :param summary: Select only what the history tables and totals show: the summary fields
+                        of main_data, and room_data without the rooms' image URLs.
+        :raises APIError: On a failed request; pages already yielded remain valid.
+        """
+        if not self.is_client_initialized():
+            print("Supabase client not initialized. Cannot retrieve calculation history.")
+            return
+
+        if summary:
+            columns = f"{HISTORY_SUMMARY_SELECT}, room_calculations(id, room_data)"
+        else:
+            columns = (
+                "id, month, year, main_data, created_at, "
+                "room_calculations(id, room_data, photo_url, nid_front_url, nid_back_url, police_form_url)"
+            )
+
+        def build_query():
+            query = self.supabase.table("main_calculations").select(columns)
+            if month is not None:
+                query = query.eq("month", month)
+            if year is not None:
+                query = query.eq("year", year)
+            return query
+
+        for page in self._iter_keyset_pages(
+            "main_calculations", build_query, ("year", "created_at", "id"), page_size,
+            cache_key=("history_bundle", summary, month, year),
+        ):
+            if summary:
+                page = [self._fold_history_summary(row) for row in page]
+            yield self._normalise_bundle(page)
+
+    def get_monthly_totals(self, month: str | None = None, year: int | None = None) -> list[dict] | None:
+        """
+        Retrieves the rooms' house rent, water, gas and unit bill totals per month, summed by
+        the ``history_monthly_totals`` function (see the migration) instead of from every room row.
+        :param month: The month to total (optional).
+        :param year: The year to total (optional).
+        :return: One dict per month with ``month``, ``year``, ``house_rent``, ``water_bill``,
+                 ``gas_bill`` and ``unit_bill``; None if the function is not deployed or the
+                 request failed, so callers can sum the rows they have instead.
+        """
+        if not self.is_client_initialized():
+            print("Supabase client not initialized. Cannot retrieve monthly totals.")
+            return None
+        try:
+            # Keyed under main_calculations; every room write invalidates that table as well
+            return self.cache.get_or_fetch(
+                ("main_calculations", "monthly_totals", month, year),
+                lambda: self._execute(
+                    self.supabase.rpc("history_monthly_totals", {"p_month": month, "p_year": year})
+                ).data or [],
+            )
+        except (APIError, AuthApiError) as e:
+            if getattr(e, "code", None) == "PGRST202":  # Function not found in the schema cache
+                print("history_monthly_totals RPC not deployed; totals are summed locally.")
+            else:
+                print(f"Supabase API error retrieving monthly totals: {e}")
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred retrieving monthly totals: {e}")
+            return None
+
+    def _iter_keyset_pages(self, table: str, build_query, order_columns: tuple[str, ...], page_size: int, cache_key: tuple):
+        """
+        Pages through ``build_query()`` in descending *order_columns* order.
+
+        Each request asks for ``.range(0, page_size - 1)`` of the rows that sort after the
+        last row already returned, rather than for an ever larger offset: the server never
+        skips over earlier rows, and rows inserted meanwhile cannot shift a page boundary.
+        *order_columns* must end in a unique column so the order is total.
+        """
+        last_row = None
+        while True:
+            query = build_query()
+            if last_row is not None:
+                query = query.or_(self._keyset_after(order_columns, last_row))
+            for column in order_columns:
+                query = query.order(column, desc=True)
+            query = query.range(0, page_size - 1)
+
+            after = tuple(last_row[column] for column in order_columns) if last_row is not None else None
+            page = self.cache.get_or_fetch(
+                (table, "page", *cache_key, after, page_size),
+                lambda query=query: self._execute(query).data or [],
+            )
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            last_row = page[-1]
+
+    @staticmethod
+    def _keyset_after(order_columns: tuple[str, ...], last_row: dict) -> str:
+        """
+        Builds the PostgREST ``or`` filter for rows sorting after *last_row* in descending
+        order, e.g. ``year.lt."2025",and(year.eq."2025",id.lt."7")`` for ``("year", "id")``.
+
+        Descending order puts nulls first, so after a null value come all non-null
+        ones (``created_at.not.is.null``), and a null is matched with ``is.null``.
+        """
+        def same(column):
+            return f"{column}.is.null" if last_row[column] is None else f'{column}.eq."{last_row[column]}"'
+
+        def after(column):
+            return f"{column}.not.is.null" if last_row[column] is None else f'{column}.lt."{last_row[column]}"'
+
+        clauses = []
+        for i, column in enumerate(order_columns):
+            terms = [same(prior) for prior in order_columns[:i]]
+            terms.append(after(column))
+            clauses.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+        return ",".join(clauses)
+
+    @staticmethod
+    def _fold_history_summary(row: dict) -> dict:
+        """
+        Regroups the ``main_data->field`` columns of a summary row under ``main_data`` and
+        rebuilds the meter_N/diff_N keys the history table reads from the reading arrays.
+        """
+        # Paths missing from a row's main_data come back as null; drop them so .get() defaults still apply
+        projected = {field: row.pop(field, None) for field in HISTORY_SUMMARY_FIELDS}
+        main_data = {field: value for field, value in projected.items() if value is not None}
+        for prefix, values in (("meter", main_data.get("meter_readings")), ("diff", main_data.get("diff_readings"))):
+            for idx, value in enumerate(values or []):
+                main_data[f"{prefix}_{idx+1}"] = value
+        row["main_data"] = main_data
+        return row
+
+    @staticmethod
+    def _normalise_bundle(bundle: list[dict]) -> list[dict]:
+        """Shapes each embedded room_calculations list like the output of get_room_calculations."""
+        for main_calc in bundle:
+            main_calc["room_calculations"] = [
+                {
+                    "id": record.get("id"),
+                    "room_data": record.get("room_data", {}),
+                    "photo_url": record.get("photo_url"),
+                    "nid_front_url": record.get("nid_front_url"),
+                    "nid_back_url": record.get("nid_back_url"),
+                    "police_form_url": record.get("police_form_url")
+                }
+                for record in (main_calc.get("room_calculations") or [])
+            ]
+        return bundle
+
+    def _upload_room_images(self, room_data_list: list[dict]) -> dict:
+        """
+        Uploads the documents of all rooms concurrently.
+        :return: Mapping ``(room_index, image_key) -> url``. Paths that are already
+                 http URLs are passed through; failed uploads are left out and logged.
+        """
+        image_urls = {}
+        to_upload = {}
+        for idx, room_data in enumerate(room_data_list):
+            for key in ROOM_IMAGE_KEYS:
+                path = room_data.get(f"{key}_path")
+                if not path:
+                    continue
+                if str(path).lower().startswith("http"):
+                    image_urls[(idx, key)] = path
+                else:
+                    to_upload[(idx, key)] = path
+
+        uploaded, errors = self.upload_images(to_upload)
+        image_urls.update(uploaded)
+        for (idx, key), message in errors.items():
+            print(f"Failed to upload {key} for room {idx + 1}: {message}")
+        return image_urls
+
     def _upload_rental_images(self, image_paths: dict) -> dict:
-        """Upload local images and return mapping key->url. Existing URLs are passed through."""
+        """Upload local images in parallel and return mapping key->url. Existing URLs are passed through."""
         image_urls = {}
+        to_upload = {}
         for key, path in image_paths.items():
             if not path:
                 continue
@@ -328,15 +982,22 @@ class SupabaseManager:
                 continue
             # Otherwise upload only if the file exists locally
             if os.path.exists(path):
-                url = self.upload_image(path)
-                if url:
-                    image_urls[key] = url
+                to_upload[key] = path
+
+        uploaded, errors = self.upload_images(to_upload)
+        image_urls.update(uploaded)
+        for key, message in errors.items():
+            print(f"Failed to upload {key}: {message}")
         return image_urls
 
-    def save_rental_record(self, record_data: dict, image_paths: dict) -> str:
+    @_invalidates("rental_records")
+    def save_rental_record(self, record_data: dict, image_paths: dict, create_missing: bool = False) -> str:
         """
         Saves a rental record to Supabase, including uploading images.
         Uses separate columns for each piece of data.
+        :param create_missing: If the record has a supabase_id that no cloud row has yet
+                               (assigned locally while offline), insert it under that id.
+                               Makes replays from the outbox idempotent.
         """
         if not self.is_client_initialized():
             return "Error: Supabase client not initialized."
@@ -363,29 +1024,41 @@ class SupabaseManager:
                 "nid_back_url": image_urls.get("nid_back"),
                 "police_form_url": image_urls.get("police_form"),
                 "is_archived": is_archived_val,
-                "updated_at": datetime.now().isoformat()
+                # The edit's time, not the upload's: sync resolves conflicts by when each side was edited
+                "updated_at": _aware_timestamp(record_data.get("updated_at")),
             }
 
             # For inserts, also populate created_at so ordering works even if the DB column lacks a default.
             if not record_data.get("id"):
-                record_to_save["created_at"] = datetime.now().isoformat()
+                record_to_save["created_at"] = datetime.now().astimezone().isoformat()
 
             # Step 3: Insert or Update the record
             if record_data.get("supabase_id"):
                 # Update existing record using its UUID supabase_id (more stable across environments)
-                response = (
+                response = self._execute(
                     self.supabase
                         .table("rental_records")
                         .update(record_to_save, returning="representation")
-                        .eq("supabase_id", record_data["supabase_id"]).execute()
+                        .eq("supabase_id", record_data["supabase_id"])
                 )
+                if not response.data and create_missing:
+                    response = self._execute(
+                        self.supabase
+                            .table("rental_records")
+                            .insert({
+                                **record_to_save,
+                                "supabase_id": record_data["supabase_id"],
+                                "created_at": record_data.get("created_at") or datetime.now().astimezone().isoformat(),
+                            }, returning="representation"),
+                        idempotent=False,
+                    )
             else:
                 # Insert new record
-                response = (
+                response = self._execute(
                     self.supabase
                         .table("rental_records")
-                        .insert(record_to_save, returning="representation")
-                        .execute()
+                        .insert(record_to_save, returning="representation"),
+                    idempotent=False,
                 )
 
             if response.data and isinstance(response.data, list) and len(response.data) > 0:
@@ -396,33 +1069,126 @@ class SupabaseManager:
         except Exception as e:
             return f"Error saving rental record: {e}"
 
-    def get_rental_records(self, is_archived: bool | None = None) -> list[dict]:
+    def get_rental_records(self, is_archived: bool | None = None, summary: bool = False) -> list[dict]:
         """
         Retrieves rental records from Supabase, optionally filtering by archive status.
+        :param summary: Leave out the image URL columns; ``get_rental_record`` fetches them on demand.
         """
         if not self.is_client_initialized():
             print("Supabase client not initialized. Cannot retrieve rental records.")
             return []
         try:
             # Select individual columns
-            query = self.supabase.table("rental_records").select(
-                "id, supabase_id, tenant_name, room_number, advanced_paid, photo_url, nid_front_url, nid_back_url, police_form_url, is_archived, created_at, updated_at"
+            columns = RENTAL_SUMMARY_COLUMNS if summary else RENTAL_RECORD_COLUMNS
+            query = self.supabase.table("rental_records").select(columns)
+
+            if is_archived is not None:
+                query = query.eq("is_archived", is_archived)
+
+            query = query.order("created_at", desc=True)
+            return self.cache.get_or_fetch(
+                ("rental_records", columns, is_archived),
+                lambda: self._execute(query).data or [],
             )
 
+        except Exception as e:
+            print(f"Supabase API error retrieving rental records: {e}")
+            return []
+
+    def iter_rental_record_pages(self, is_archived: bool | None = None, page_size: int = PAGE_SIZE, summary: bool = False):
+        """
+        Yields rental records one page at a time, newest first, so the first rows can be
+        shown before the rest have arrived. Same ordering and filter as ``get_rental_records``.
+        :param is_archived: Archive status to filter on (optional).
+        :param page_size: Rows per request.
+        :param summary: Leave out the image URL columns; ``get_rental_record`` fetches them on demand.
+        :raises APIError: On a failed request; pages already yielded remain valid.
+        """
+        if not self.is_client_initialized():
+            print("Supabase client not initialized. Cannot retrieve rental records.")
+            return
+
+        columns = RENTAL_SUMMARY_COLUMNS if summary else RENTAL_RECORD_COLUMNS
+
+        def build_query():
+            query = self.supabase.table("rental_records").select(columns)
             if is_archived is not None:
                 query = query.eq("is_archived", is_archived)
+            return query
+
+        yield from self._iter_keyset_pages(
+            "rental_records", build_query, ("created_at", "id"), page_size, cache_key=(summary, is_archived)
+        )
 
-            response = query.order("created_at", desc=True).execute()
+    def get_rental_record(self, record_id: int | str) -> dict | None:
+        """Retrieve a single rental record, image URLs included, by primary-key id."""
+        if not self.is_client_initialized():
+            print("Supabase client not initialized. Cannot retrieve rental record.")
+            return None
+        try:
+            rows = self.cache.get_or_fetch(
+                ("rental_records", "by_id", str(record_id)),
+                lambda: self._execute(
+                    self.supabase.table("rental_records").select(RENTAL_RECORD_COLUMNS).eq("id", record_id).limit(1)
+                ).data or [],
+            )
+            return rows[0] if rows else None
+        except (APIError, AuthApiError) as e:
+            print(f"Supabase API error retrieving rental record: {e}")
+            return None
+        except Exception as e:
+            print(f"Unexpected error retrieving rental record: {e}")
+            return None
 
-            return response.data if response.data else []
+    def get_rental_records_changed_since(
+        self, changed_after: str | None, after_supabase_id: str | None = None, limit: int = 500
+    ) -> list[dict]:
+        """
+        Retrieves one page of rental records changed after a sync watermark.
 
+        Rows are ordered by ``(changed_at, supabase_id)`` and the watermark is the last
+        pair seen, so rows sharing a timestamp across a page boundary are not skipped.
+        ``changed_at`` is stamped by the database on every write (see the
+        ``rental_records_changed_at`` migration); on a project without it ``updated_at``
+        stands in, and each returned row's ``changed_at`` holds that instead.
+        :param changed_after: ``changed_at`` of the last row already pulled, or None for all rows.
+        :param after_supabase_id: ``supabase_id`` of that row.
+        :param limit: Page size.
+        :return: A list of rental records (empty when up to date or on error).
+        """
+        if not self.is_client_initialized():
+            print("Supabase client not initialized. Cannot retrieve changed rental records.")
+            return []
+        column = self._rentals_change_column
+        try:
+            columns = f"{RENTAL_RECORD_COLUMNS}, changed_at" if column == "changed_at" else RENTAL_RECORD_COLUMNS
+            query = self.supabase.table("rental_records").select(columns)
+            if changed_after and after_supabase_id:
+                query = query.or_(
+                    f'{column}.gt."{changed_after}",'
+                    f'and({column}.eq."{changed_after}",supabase_id.gt.{after_supabase_id})'
+                )
+            elif changed_after:
+                query = query.gt(column, changed_after)
+
+            response = self._execute(query.order(column).order("supabase_id").limit(limit))
+            return [{**row, "changed_at": row.get(column)} for row in response.data or []]
+        except (APIError, AuthApiError) as e:
+            if column == "changed_at" and getattr(e, "code", None) == "42703":  # Undefined column
+                print("rental_records.changed_at is missing; pulling by updated_at. Apply supabase/migrations to fix.")
+                self._rentals_change_column = "updated_at"
+                return self.get_rental_records_changed_since(changed_after, after_supabase_id, limit)
+            print(f"Supabase API error retrieving changed rental records: {e}")
+            return []
         except Exception as e:
-            print(f"Supabase API error retrieving rental records: {e}")
+            print(f"An unexpected error occurred retrieving changed rental records: {e}")
             return []
 
+    @_invalidates("rental_records")
     def update_rental_record_archive_status(self, supabase_id: str, is_archived: bool) -> bool:
         """
-        Updates the is_archived status of a rental record in Supabase.
+        Updates the is_archived status of a rental record in Supabase. updated_at is
+        set too, so the change passes the incremental pull's watermark on other machines.
         :param supabase_id: The supabase_id of the rental record to update.
         :param is_archived: The new archive status (True for archived, False for active).
         :return: True if successful, False otherwise.
@@ -431,7 +1197,8 @@ class SupabaseManager:
             print("Supabase client not initialized. Cannot update archive status.")
             return False
         try:
-            response = self.supabase.table("rental_records").update({"is_archived": is_archived}).eq("supabase_id", supabase_id).execute()
+            values = {"is_archived": is_archived, "updated_at": datetime.now().astimezone().isoformat()}
+            response = self._execute(self.supabase.table("rental_records").update(values).eq("supabase_id", supabase_id))
             if response.data:
                 print(f"Rental record supabase_id {supabase_id} archive status updated to {is_archived}.")
                 return True
@@ -445,13 +1212,71 @@ class SupabaseManager:
             print(f"An unexpected error occurred updating archive status: {e}")
             return False
 
-    def delete_rental_record(self, record_identifier) -> bool:
+    @_invalidates("rental_records")
+    def update_rental_records_archive_status(self, supabase_ids: list[str], is_archived: bool) -> bool:
+        """
+        Updates the is_archived status (and updated_at, as update_rental_record_archive_status
+        does) of many rental records with one request per 100 ids. Records that no longer exist are skipped.
+        :param supabase_ids: The supabase_ids of the rental records to update.
+        :param is_archived: The new archive status (True for archived, False for active).
+        :return: True if every request succeeded, False otherwise.
+        """
+        if not self.is_client_initialized():
+            print("Supabase client not initialized. Cannot update archive status.")
+            return False
+        try:
+            values = {"is_archived": is_archived, "updated_at": datetime.now().astimezone().isoformat()}
+            for start in range(0, len(supabase_ids), BULK_CHUNK_SIZE):
+                chunk = supabase_ids[start:start + BULK_CHUNK_SIZE]
+                self._execute(
+                    self.supabase.table("rental_records")
+                    .update(values, returning="minimal")
+                    .in_("supabase_id", chunk)
+                )
+            print(f"Archive status of {len(supabase_ids)} rental record(s) updated to {is_archived}.")
+            return True
+        except (APIError, AuthApiError) as e:
+            print(f"Supabase API error updating archive status: {e}")
+            return False
+        except Exception as e:
+            print(f"An unexpected error occurred updating archive status: {e}")
+            return False
+
+    @_invalidates("rental_records")
+    def delete_rental_records(self, supabase_ids: list[str]) -> bool:
+        """
+        Deletes many rental records from Supabase with one request per 100 ids.
+        Records that are already gone count as deleted. Images are left in Storage
+        for ``collect_storage_garbage``, as in ``delete_rental_record``.
+        :param supabase_ids: The supabase_ids of the rental records to delete.
+        :return: True if every request succeeded, False otherwise.
+        """
+        if not self.is_client_initialized():
+            print("Supabase client not initialized. Cannot delete rental records.")
+            return False
+        try:
+            for start in range(0, len(supabase_ids), BULK_CHUNK_SIZE):
+                chunk = supabase_ids[start:start + BULK_CHUNK_SIZE]
+                self._execute(
+                    self.supabase.table("rental_records").delete(returning="minimal").in_("supabase_id", chunk)
+                )
+            print(f"{len(supabase_ids)} rental record(s) deleted.")
+            return True
+        except (APIError, AuthApiError) as e:
+            print(f"Supabase API error deleting rental records: {e}")
+            return False
+        except Exception as e:
+            print(f"An unexpected error occurred deleting rental records: {e}")
+            return False
+
+    @_invalidates("rental_records")
+    def delete_rental_record(self, record_identifier, missing_ok: bool = False) -> bool:
         """
         Deletes a rental record from Supabase.
-        Note: This does NOT delete associated images from Supabase Storage.
-        Image deletion would require tracking image URLs and calling storage.remove().
-        For simplicity, we're only deleting the record here.
+        Note: This does NOT delete associated images from Supabase Storage; images
+        may be shared with other records, so ``collect_storage_garbage`` sweeps them later.
         :param record_identifier: Either numeric primary-key id or uuid supabase_id.
+        :param missing_ok: Treat a record that is already gone as deleted.
         :return: True if successful, False otherwise.
         """
         if not self.is_client_initialized():
@@ -459,8 +1284,8 @@ class SupabaseManager:
             return False
         try:
             col = "id" if isinstance(record_identifier, int) or str(record_identifier).isdigit() else "supabase_id"
-            response = self.supabase.table("rental_records").delete().eq(col, record_identifier).execute()
-            if response.data:
+            response = self._execute(self.supabase.table("rental_records").delete().eq(col, record_identifier))
+            if response.data or missing_ok:
                 print(f"Rental record {record_identifier} deleted.")
                 return True
             else:
@@ -483,7 +1308,7 @@ class SupabaseManager:
             print("Supabase client not initialized. Cannot retrieve main calculation by id.")
             return None
         try:
-            response = self.supabase.table("main_calculations").select("*").eq("id", record_id).limit(1).execute()
+            response = self._execute(self.supabase.table("main_calculations").select("*").eq("id", record_id).limit(1))
             return response.data[0] if response.data else None
         except (APIError, AuthApiError) as e:
             print(f"Supabase API error retrieving main calculation by id: {e}")
@@ -492,6 +1317,7 @@ class SupabaseManager:
             print(f"Unexpected error retrieving main calculation by id: {e}")
             return None
 
+    @_invalidates("main_calculations", "room_calculations")
     def delete_calculation_record(self, record_id: int | str) -> bool:
         """Delete a main_calculations record and all associated room_calculations rows."""
         if not self.is_client_initialized():
@@ -499,9 +1325,9 @@ class SupabaseManager:
             return False
         try:
             # First remove room_calculations rows
-            self.supabase.table("room_calculations").delete().eq("main_calculation_id", record_id).execute()
+            self._execute(self.supabase.table("room_calculations").delete().eq("main_calculation_id", record_id))
             # Then remove the main_calculations row
-            main_del_resp = self.supabase.table("main_calculations").delete().eq("id", record_id).execute()
+            main_del_resp = self._execute(self.supabase.table("main_calculations").delete().eq("id", record_id))
             return bool(main_del_resp.data)
         except (APIError, AuthApiError) as e:
             print(f"Supabase API error deleting calculation record: {e}")
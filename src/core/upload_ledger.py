@@ -0,0 +1,79 @@
+"""Local ledger of images already present in Supabase Storage.
+
+Maps a file's SHA-256 to the bucket path and public URL it was uploaded to, so
+saving a record whose document scans have not changed costs a hash and a
+SQLite lookup instead of a network upload.
+
+Every call opens its own short-lived plain connection because uploads run on
+thread-pool workers and SQLite connections are bound to their creating thread.
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+from src.core.db_manager import plain_connection
+
+
+class UploadLedger:
+    def __init__(self, db_name: str = "app_config.db"):
+        self.db_name = db_name
+        self._create_table()
+
+    def _create_table(self):
+        """Creates the uploaded_images table if it doesn't exist."""
+        try:
+            with plain_connection(self.db_name) as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS uploaded_images (
+                        sha256 TEXT NOT NULL,
+                        bucket TEXT NOT NULL,
+                        storage_path TEXT NOT NULL,
+                        public_url TEXT NOT NULL,
+                        uploaded_at TEXT,
+                        PRIMARY KEY (sha256, bucket)
+                    )
+                """)
+        except sqlite3.Error as e:
+            print(f"Error creating uploaded_images table: {e}")
+            raise
+
+    def lookup(self, sha256: str, bucket: str, max_age_seconds: float | None = None) -> str | None:
+        """
+        Return the public URL of content already uploaded to *bucket*, if any.
+        :param max_age_seconds: Ignore entries recorded longer ago than this.
+        """
+        with plain_connection(self.db_name) as conn:
+            row = conn.execute(
+                "SELECT public_url, uploaded_at FROM uploaded_images WHERE sha256 = ? AND bucket = ?",
+                (sha256, bucket),
+            ).fetchone()
+        if not row:
+            return None
+        if max_age_seconds is not None:
+            cutoff = (datetime.now() - timedelta(seconds=max_age_seconds)).isoformat()
+            if (row["uploaded_at"] or "") < cutoff:
+                return None
+        return row["public_url"]
+
+    def record(self, sha256: str, bucket: str, storage_path: str, public_url: str):
+        """
+        Remembers an upload. Any older entry for the same bucket path is dropped,
+        since an upsert to that path has just replaced its content.
+        """
+        with plain_connection(self.db_name) as conn:
+            conn.execute(
+                "DELETE FROM uploaded_images WHERE bucket = ? AND storage_path = ? AND sha256 != ?",
+                (bucket, storage_path, sha256),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO uploaded_images (sha256, bucket, storage_path, public_url, uploaded_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sha256, bucket, storage_path, public_url, datetime.now().isoformat()),
+            )
+
+    def forget(self, bucket: str, storage_paths: list[str]) -> int:
+        """Drops entries for objects that were deleted from *bucket*."""
+        with plain_connection(self.db_name) as conn:
+            return conn.executemany(
+                "DELETE FROM uploaded_images WHERE bucket = ? AND storage_path = ?",
+                [(bucket, path) for path in storage_paths],
+            ).rowcount
@@ -3,6 +3,7 @@ from PyQt5.QtCore import QThread, pyqtSignal
 class FetchSupabaseRentalRecordsWorker(QThread):
     """Background worker that retrieves rental records from Supabase without blocking the UI."""
 
+    page_fetched = pyqtSignal(list)     # Emitted with each page of summary records (no image URLs) as it arrives
     records_fetched = pyqtSignal(list)  # Emitted with the list of records on success
     error_occurred = pyqtSignal(str)    # Emitted with an error message if something goes wrong
 
@@ -14,9 +15,357 @@ class FetchSupabaseRentalRecordsWorker(QThread):
     def run(self):
         """Executes in a separate thread."""
         try:
-            records = self._supabase_manager.get_rental_records(is_archived=self._is_archived)
+            records = []
+            for page in self._supabase_manager.iter_rental_record_pages(is_archived=self._is_archived, summary=True):
+                if self.isInterruptionRequested():
+                    return
+                records.extend(page)
+                self.page_fetched.emit(page)
             # Ensure a list is always emitted (even if empty) to signal completion.
-            self.records_fetched.emit(records or [])
+            self.records_fetched.emit(records)
         except Exception as exc:
             # Emit the string representation of the error so the UI thread can handle it.
-            self.error_occurred.emit(str(exc)) 
\ No newline at end of file
+            self.error_occurred.emit(str(exc)) 
+
+class FetchSupabaseHistoryWorker(QThread):
+    """Background worker that streams calculation history (with embedded rooms) from Supabase."""
+
+    page_fetched = pyqtSignal(list)     # Emitted with each page of main calculations as it arrives
+    history_fetched = pyqtSignal(list)  # Emitted with every main calculation once the last page is in
+    error_occurred = pyqtSignal(str)    # Emitted with an error message if something goes wrong
+
+    def __init__(self, supabase_manager, month=None, year=None, parent=None):
+        super().__init__(parent)
+        self._supabase_manager = supabase_manager
+        self._month = month
+        self._year = year
+
+    def run(self):
+        """Executes in a separate thread."""
+        try:
+            calculations = []
+            for page in self._supabase_manager.iter_history_bundle_pages(
+                month=self._month, year=self._year, summary=True
+            ):
+                if self.isInterruptionRequested():
+                    return
+                calculations.extend(page)
+                self.page_fetched.emit(page)
+            self.history_fetched.emit(calculations)
+        except Exception as exc:
+            self.error_occurred.emit(str(exc))
+
+class FetchMonthlyTotalsWorker(QThread):
+    """Background worker that retrieves the per-month room totals aggregated by Supabase."""
+
+    totals_fetched = pyqtSignal(object)  # Emitted with a list of monthly totals, or None if unavailable
+
+    def __init__(self, supabase_manager, month=None, year=None, parent=None):
+        super().__init__(parent)
+        self._supabase_manager = supabase_manager
+        self._month = month
+        self._year = year
+
+    def run(self):
+        """Executes in a separate thread."""
+        totals = self._supabase_manager.get_monthly_totals(month=self._month, year=self._year)
+        if not self.isInterruptionRequested():
+            self.totals_fetched.emit(totals)
+
+class RentalTransferWorker(QThread):
+    """Background worker that streams the local rentals table to or from a JSONL/CSV file."""
+
+    progress = pyqtSignal(int, int)      # Emitted as (done, total); units are rows for export, bytes for import
+    transfer_done = pyqtSignal(int, list)  # Emitted with (record_count, skipped_row_errors)
+    error_occurred = pyqtSignal(str)     # Emitted with an error message if something goes wrong
+
+    def __init__(self, db_name, file_path, mode="export", fmt=None, image_dir=None, parent=None):
+        super().__init__(parent)
+        self._db_name = db_name
+        self._file_path = file_path
+        self._mode = mode
+        self._fmt = fmt
+        self._image_dir = image_dir  # Image store root that imported image files are added to
+
+    def run(self):
+        """Executes in a separate thread."""
+        # SQLite connections are bound to the thread that created them, so open a private one here.
+        from src.core.db_manager import DBManager
+        from src.core.image_store import ImageStore
+        from src.core.rental_transfer import export_rentals, import_rentals
+
+        try:
+            with DBManager(self._db_name) as db_manager:
+                db_manager.bootstrap_rentals_table()
+                if self._mode == "import":
+                    image_store = ImageStore(self._image_dir, db_manager) if self._image_dir else None
+                    count, errors = import_rentals(
+                        db_manager, self._file_path, fmt=self._fmt, progress_callback=self.progress.emit,
+                        image_store=image_store,
+                    )
+                else:
+                    count = export_rentals(
+                        db_manager, self._file_path, fmt=self._fmt, progress_callback=self.progress.emit
+                    )
+                    errors = []
+            self.transfer_done.emit(count, errors)
+        except Exception as exc:
+            self.error_occurred.emit(str(exc))
+
+
+class ThumbnailWorker(QThread):
+    """Background worker that generates missing preview thumbnails for a record's documents."""
+
+    thumbnail_ready = pyqtSignal(str, str)  # Emitted as (image_type, thumbnail_path)
+    thumbnail_failed = pyqtSignal(str)      # Emitted with the image_type that could not be decoded
+
+    def __init__(self, thumbnail_cache, sources: dict, width: int, height: int, parent=None):
+        super().__init__(parent)
+        self._cache = thumbnail_cache
+        self._sources = dict(sources)  # image_type -> local path or URL
+        self._width = width
+        self._height = height
+
+    def run(self):
+        """Executes in a separate thread."""
+        for image_type, source in self._sources.items():
+            if self.isInterruptionRequested():
+                return
+            try:
+                thumb_path = self._cache.generate(source, self._width, self._height)
+            except Exception as exc:
+                print(f"Thumbnail generation failed for {source}: {exc}")
+                thumb_path = None
+            if thumb_path:
+                self.thumbnail_ready.emit(image_type, thumb_path)
+            else:
+                self.thumbnail_failed.emit(image_type)
+
+
+class ImageIngestWorker(QThread):
+    """Background worker that downscales and re-encodes a picked document image into the image store."""
+
+    image_ingested = pyqtSignal(str, str)  # Emitted as (image_type, stored_path)
+    error_occurred = pyqtSignal(str, str)  # Emitted as (image_type, error message)
+
+    def __init__(self, image_ingest, image_type: str, source_path: str, parent=None):
+        super().__init__(parent)
+        self._ingest = image_ingest
+        self._image_type = image_type
+        self._source_path = source_path
+
+    def run(self):
+        """Executes in a separate thread."""
+        try:
+            stored = self._ingest.ingest(self._source_path)
+            self.image_ingested.emit(self._image_type, str(stored))
+        except Exception as exc:
+            self.error_occurred.emit(self._image_type, str(exc))
+
+
+class OutboxSyncWorker(QThread):
+    """Background worker that replays queued cloud writes from the local outbox, oldest first."""
+
+    entry_synced = pyqtSignal(str)         # Emitted with the op name of each replayed entry
+    sync_finished = pyqtSignal(int, int)   # Emitted as (replayed_count, newly_failed_count)
+    error_occurred = pyqtSignal(str)       # Emitted with an error message if something goes wrong
+
+    def __init__(self, supabase_manager, db_name, connectivity_check=None, batch_size=50, parent=None):
+        super().__init__(parent)
+        self._supabase_manager = supabase_manager
+        self._db_name = db_name
+        self._connectivity_check = connectivity_check
+        self._batch_size = batch_size
+
+    def run(self):
+        """Executes in a separate thread."""
+        from src.core.outbox import Outbox, group_entries, replay_entry, replay_group
+        from src.core.rental_sync import mark_pushed
+
+        replayed = failed = 0
+        try:
+            if not self._supabase_manager.is_client_initialized():
+                return
+            if self._connectivity_check is not None and not self._connectivity_check():
+                return  # Still offline; the queue is retried later
+
+            outbox = Outbox(self._db_name)
+            while not self.isInterruptionRequested():
+                batch = outbox.pending(limit=self._batch_size)
+                if not batch:
+                    break
+                done = []
+                blocked = False
+                for group in group_entries(batch):
+                    if not self._supabase_manager.is_available():
+                        blocked = True  # Circuit breaker open; don't burn the entries' attempts
+                        break
+                    # Runs of archive toggles or deletes go up as one request
+                    if len(group) > 1 and replay_group(self._supabase_manager, group) is None:
+                        done.extend(group)
+                        for entry in group:
+                            self.entry_synced.emit(entry["op"])
+                        continue
+                    # A single entry, or a run whose bulk request failed: one at a time, so a bad entry is isolated
+                    for entry in group:
+                        if not self._supabase_manager.is_available():
+                            blocked = True
+                            break
+                        error = replay_entry(self._supabase_manager, entry)
+                        if error is None:
+                            done.append(entry)
+                            self.entry_synced.emit(entry["op"])
+                            continue
+                        print(f"Outbox replay of {entry['op']} #{entry['id']} failed: {error}")
+                        if not self._supabase_manager.is_available():
+                            blocked = True  # The service failed, not this entry
+                            break
+                        if outbox.mark_failed(entry["id"], error):
+                            failed += 1  # Parked; later entries may proceed
+                            continue
+                        blocked = True  # Keep order: retry this entry before anything queued after it
+                        break
+                    if blocked:
+                        break
+                outbox.mark_done(done)
+                mark_pushed(self._db_name, done)
+                replayed += len(done)
+                if blocked:
+                    break
+        except Exception as exc:
+            self.error_occurred.emit(str(exc))
+        finally:
+            self.sync_finished.emit(replayed, failed)
+
+
+class StorageGCWorker(QThread):
+    """Background worker that sweeps Supabase Storage for images no record references."""
+
+    gc_done = pyqtSignal(list)           # Emitted with the storage paths removed (or, on a dry run, that would be)
+    error_occurred = pyqtSignal(str)     # Emitted with an error message if something goes wrong
+
+    def __init__(self, supabase_manager, db_name, dry_run=False, parent=None):
+        super().__init__(parent)
+        self._supabase_manager = supabase_manager
+        self._db_name = db_name
+        self._dry_run = dry_run
+
+    def run(self):
+        """Executes in a separate thread."""
+        from src.core.outbox import Outbox
+
+        try:
+            orphans = self._supabase_manager.collect_storage_garbage(
+                dry_run=self._dry_run, keep_urls=Outbox(self._db_name).referenced_urls()
+            )
+            if orphans is None:
+                self.error_occurred.emit("Could not list the images in Supabase Storage.")
+            else:
+                self.gc_done.emit(orphans)
+        except Exception as exc:
+            self.error_occurred.emit(str(exc))
+
+
+class RentalSyncWorker(QThread):
+    """Background worker that runs one incremental local <-> cloud rentals sync."""
+
+    sync_done = pyqtSignal(int, int)     # Emitted as (rows_pulled, rows_pushed)
+    error_occurred = pyqtSignal(str)     # Emitted with an error message if something goes wrong
+
+    def __init__(self, supabase_manager, db_name, connectivity_check=None, parent=None):
+        super().__init__(parent)
+        self._supabase_manager = supabase_manager
+        self._db_name = db_name
+        self._connectivity_check = connectivity_check
+
+    def run(self):
+        """Executes in a separate thread."""
+        # SQLite connections are bound to the thread that created them, so open a private one here.
+        from src.core.db_manager import DBManager
+        from src.core.outbox import Outbox
+        from src.core.rental_sync import RentalSync
+
+        try:
+            with DBManager(self._db_name) as db_manager:
+                engine = RentalSync(db_manager, self._supabase_manager, Outbox(self._db_name))
+                if self._connectivity_check is not None and not self._connectivity_check():
+                    # Offline: still queue local edits so the outbox uploads them later
+                    self.sync_done.emit(0, engine.push())
+                    return
+                pulled, pushed = engine.sync()
+            self.sync_done.emit(pulled, pushed)
+        except Exception as exc:
+            self.error_occurred.emit(str(exc))
+
+
+class SupabaseConnectWorker(QThread):
+    """Background worker that creates the Supabase client (keyring, decryption, client setup) off the GUI thread."""
+
+    client_ready = pyqtSignal(bool)  # Emitted with True once the client is usable, False if it is not configured or failed
+
+    def __init__(self, supabase_manager, parent=None):
+        super().__init__(parent)
+        self._supabase_manager = supabase_manager
+
+    def run(self):
+        """Executes in a separate thread."""
+        try:
+            ready = self._supabase_manager.connect()
+        except Exception as exc:
+            print(f"Supabase client initialisation failed: {exc}")
+            ready = False
+        self.client_ready.emit(ready)
+
+
+class ConnectivityProbeWorker(QThread):
+    """Background worker that checks once whether the Supabase host can be reached."""
+
+    probe_done = pyqtSignal(bool)  # Emitted with True if the host accepted a connection
+
+    def __init__(self, supabase_manager, parent=None):
+        super().__init__(parent)
+        self._supabase_manager = supabase_manager
+
+    def run(self):
+        """Executes in a separate thread."""
+        try:
+            reachable = self._supabase_manager.is_reachable()
+        except Exception as exc:
+            print(f"Connectivity probe failed: {exc}")
+            reachable = False
+        self.probe_done.emit(reachable)
+
+
+class RealtimeWorker(QThread):
+    """Background worker that keeps a Supabase Realtime subscription open and relays row changes."""
+
+    change_received = pyqtSignal(str, str, object, object)  # Emitted as (table, INSERT/UPDATE/DELETE, record, old_record)
+    status_changed = pyqtSignal(bool)                      # Emitted with True when subscribed, False when disconnected
+
+    def __init__(self, supabase_manager, tables, parent=None):
+        super().__init__(parent)
+        self._supabase_manager = supabase_manager
+        self._tables = tuple(tables)
+        self._feed = None
+
+    def run(self):
+        """Executes in a separate thread; returns once stop() is called."""
+        import asyncio
+
+        self._feed = self._supabase_manager.create_realtime_feed(
+            self._tables, self.change_received.emit, self.status_changed.emit
+        )
+        if self._feed is None:
+            return
+        if self.isInterruptionRequested():
+            self._feed.stop()
+        try:
+            asyncio.run(self._feed.run())
+        except Exception as exc:
+            print(f"Realtime feed stopped: {exc}")
+
+    def stop(self):
+        """Asks the feed to disconnect; wait() for the thread afterwards."""
+        self.requestInterruption()
+        if self._feed is not None:
+            self._feed.stop()
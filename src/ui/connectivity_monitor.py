@@ -0,0 +1,62 @@
+"""Cached view of whether Supabase can be reached, kept fresh in the background.
+
+Cloud actions used to open a socket on the GUI thread before every save, load,
+edit and delete. :class:`ConnectivityMonitor` instead probes the configured
+project host from a ``ConnectivityProbeWorker`` on a timer and keeps the
+result, so :meth:`ConnectivityMonitor.is_online` answers instantly from any
+thread. Probes run every ``ONLINE_INTERVAL_MS`` while online and every
+``OFFLINE_INTERVAL_MS`` while offline, so a returning connection is noticed
+quickly. ``status_changed`` is emitted only when the status flips.
+"""
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from src.ui.background_workers import ConnectivityProbeWorker
+
+ONLINE_INTERVAL_MS = 30_000
+OFFLINE_INTERVAL_MS = 5_000
+
+
+class ConnectivityMonitor(QObject):
+    status_changed = pyqtSignal(bool)  # Emitted with the new status whenever it flips
+
+    def __init__(self, supabase_manager, parent=None):
+        super().__init__(parent)
+        self._online: bool | None = None  # None until the first probe has finished
+        # One probe thread, restarted for each probe
+        self._worker = ConnectivityProbeWorker(supabase_manager, parent=self)
+        self._worker.probe_done.connect(self._on_probe_done)
+        self._stopped = True
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.probe_now)
+
+    def is_online(self) -> bool:
+        """Last probe result; optimistic until the first probe is in. Safe to call from any thread."""
+        return self._online is not False
+
+    def start(self):
+        """Probes now and then on the timer."""
+        self._stopped = False
+        self.probe_now()
+        self._timer.start(ONLINE_INTERVAL_MS if self.is_online() else OFFLINE_INTERVAL_MS)
+
+    def stop(self):
+        """Stops probing and forgets the status (e.g. when Supabase is no longer configured)."""
+        self._stopped = True
+        self._timer.stop()
+        self._online = None
+        self._worker.wait(5000)
+
+    def probe_now(self):
+        """Starts a probe unless one is still running."""
+        if not self._worker.isRunning():
+            self._worker.start()
+
+    def _on_probe_done(self, reachable):
+        if self._stopped:
+            return  # Finished after stop(); the result is for a configuration no longer in use
+        changed = reachable != self._online
+        self._online = reachable
+        if self._timer.isActive():
+            self._timer.setInterval(ONLINE_INTERVAL_MS if reachable else OFFLINE_INTERVAL_MS)
+        if changed:
+            self.status_changed.emit(reachable)
@@ -4,7 +4,7 @@ import os
 from datetime import datetime
 from collections import namedtuple
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QCoreApplication
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QLabel, QGroupBox, QFormLayout, QMessageBox, QDialog,
@@ -15,6 +15,9 @@ from src.ui.styles import (
     get_room_selection_style, get_button_style
 )
 from src.ui.custom_widgets import CustomNavButton
+from src.ui.thumbnail_cache import ThumbnailCache
+from src.ui.background_workers import ThumbnailWorker
+from src.core.outbox import OP_DELETE_RENTAL, OP_SET_RENTAL_ARCHIVED, rental_key, rental_archive_key
 
 # Suppress SSL certificate warnings when verify=False is used in requests
 try:
@@ -69,6 +72,7 @@ class RentalRecordDialog(QDialog):
         self.main_window = main_window_ref # Store reference to main window
         self.current_source = current_source # New: To know if record came from Local DB or Supabase
         self.supabase_id = supabase_id or record_data.get("supabase_id")
+        self._thumbnail_worker = None
 
         self.init_ui()
         if self.record_data:
@@ -211,31 +215,31 @@ class RentalRecordDialog(QDialog):
                 "police_form": self.record_data.police_form_url
             }
 
+        # Previews come from the thumbnail cache; anything not cached yet is generated
+        # once on a worker thread so the dialog never decodes full-size scans itself.
+        self._image_labels = image_labels
+        thumbnail_cache = ThumbnailCache()
+        preview_size = self.photo_preview_label.size()
+        pending = {}
         for img_type, label in image_labels.items():
             path = image_paths[img_type]
-            if path and path.startswith("http"):
-                try:
-                    import requests
-                    # Disable TLS certificate verification to avoid failures in bundled executables
-                    resp = requests.get(path, timeout=5, verify=False)
-                    if resp.status_code == 200:
-                        pixmap = QPixmap()
-                        pixmap.loadFromData(resp.content)
-                        label.setPixmap(pixmap.scaled(label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                        label.setText("")
-                    else:
-                        label.setText(f"No {img_type.replace('_', ' ').title()}")
-                except Exception as e:
-                    label.setText(f"No {img_type.replace('_', ' ').title()}")
-            elif path and self._is_safe_path(path) and os.path.exists(path):
-                pixmap = QPixmap(path)
-                if not pixmap.isNull():
-                    label.setPixmap(pixmap.scaled(label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                    label.setText("")
-                else:
-                    label.setText(f"Invalid {img_type.replace('_', ' ').title()}")
-            else:
+            if not path or not (path.startswith("http") or (self._is_safe_path(path) and os.path.exists(path))):
                 label.setText(f"No {img_type.replace('_', ' ').title()}")
+                continue
+            cached = thumbnail_cache.get(path, preview_size.width(), preview_size.height())
+            if cached:
+                self._on_thumbnail_ready(img_type, cached)
+            else:
+                label.setText("Loading…")
+                pending[img_type] = path
+
+        if pending:
+            self._thumbnail_worker = ThumbnailWorker(
+                thumbnail_cache, pending, preview_size.width(), preview_size.height(), parent=self
+            )
+            self._thumbnail_worker.thumbnail_ready.connect(self._on_thumbnail_ready)
+            self._thumbnail_worker.thumbnail_failed.connect(self._on_thumbnail_failed)
+            self._thumbnail_worker.start()
 
         # Set PDF link (assuming PDF is generated and path is stored somewhere, or will be generated on demand)
         # For now, we'll set it to a placeholder or clear it if no PDF is associated
@@ -243,6 +247,33 @@ class RentalRecordDialog(QDialog):
         self.pdf_path_label.setText("No PDF generated yet for this record.")
         self.pdf_path_label.setToolTip("Click 'Save PDF' to generate and and view.")
 
+    def _on_thumbnail_ready(self, img_type: str, thumb_path: str):
+        label = self._image_labels[img_type]
+        pixmap = QPixmap(thumb_path)
+        if pixmap.isNull():
+            self._on_thumbnail_failed(img_type)
+            return
+        label.setPixmap(pixmap)
+        label.setText("")
+
+    def _on_thumbnail_failed(self, img_type: str):
+        self._image_labels[img_type].setText(f"Invalid {img_type.replace('_', ' ').title()}")
+
+    def done(self, result):
+        # A running thumbnail worker may be mid-download; let it finish on its own instead of
+        # blocking the GUI. Reparented so it outlives the dialog, and deleted once it ends.
+        worker = self._thumbnail_worker
+        if worker is not None and worker.isRunning():
+            worker.requestInterruption()
+            worker.thumbnail_ready.disconnect()
+            worker.thumbnail_failed.disconnect()
+            worker.setParent(QCoreApplication.instance())
+            worker.finished.connect(worker.deleteLater)
+            if not worker.isRunning():
+                worker.deleteLater()  # Finished before the connection was made
+            self._thumbnail_worker = None
+        super().done(result)
+
     def _is_safe_path(self, file_path):
         """Validate that the file path is safe to access"""
         if not file_path:
@@ -333,26 +364,23 @@ class RentalRecordDialog(QDialog):
                     QMessageBox.information(self, "Success", "Record deleted from local database.")
 
                     # Attempt to delete associated local files after successful database deletion
-                    files_to_delete = [photo_path, nid_front_path, nid_back_path, police_form_path]
-                    for f_path in files_to_delete:
-                        if f_path and os.path.exists(f_path) and self._is_safe_path(f_path):
-                            try:
-                                os.remove(f_path)
-                                print(f"Deleted associated local file: {f_path}")
-                            except Exception as file_e:
-                                print(f"Warning: Failed to delete associated local file {f_path}: {file_e}")
+                    self._release_local_images([photo_path, nid_front_path, nid_back_path, police_form_path])
                 elif self.current_source == "Cloud (Supabase)":
                     if self.supabase_manager and self.record_data.supabase_id:
-                        success = self.supabase_manager.delete_rental_record(self.record_data.supabase_id)
-                        if success:
-                            QMessageBox.information(self, "Success", "Record deleted from Supabase.")
-                            # Optionally, delete the corresponding local record if it exists
-                            if self.record_data.id:
-                                self.db_manager.execute_query("DELETE FROM rentals WHERE id = ?", (self.record_data.id,))
-                                print(f"Also deleted corresponding local record ID: {self.record_data.id}")
-                        else:
-                            QMessageBox.critical(self, "Cloud Error", "Failed to delete record from Supabase.")
-                            return # Do not proceed to refresh if Supabase deletion failed
+                        # Queued in the outbox; also drops any not-yet-uploaded edits of this record
+                        supabase_id = self.record_data.supabase_id
+                        self.main_window.queue_cloud_write(
+                            OP_DELETE_RENTAL, {},
+                            coalesce_key=rental_key(supabase_id),
+                            idempotency_key=supabase_id,
+                            supersedes=(rental_archive_key(supabase_id),),
+                        )
+                        QMessageBox.information(self, "Success", "Record deletion queued for Supabase.")
+                        # Also delete the local copy. It is found by supabase_id: a cloud record's id is the cloud row's
+                        deleted = self.db_manager.delete_rentals([supabase_id], key_column="supabase_id")
+                        if deleted:
+                            print(f"Also deleted the local copy of Supabase record {supabase_id}")
+                        self._release_local_images([row[column] for row in deleted for column in row.keys()])
                     else:
                         QMessageBox.warning(self, "Supabase Error", "Supabase manager not available or record has no Supabase ID.")
                         return # Do not proceed to refresh if Supabase deletion cannot be attempted
@@ -390,20 +418,41 @@ class RentalRecordDialog(QDialog):
                 traceback.print_exc()
 
 
+    def _release_local_images(self, paths):
+        """Delete local image files that no remaining rentals row references.
+
+        Images in the shared content-addressed store may back several records, so
+        they are only removed once their reference count drops to zero.
+        """
+        image_store = getattr(getattr(self.main_window, "rental_info_tab_instance", None), "image_store", None)
+        if image_store is not None:
+            for f_path in image_store.release(paths):
+                print(f"Deleted associated local file: {f_path}")
+            paths = [p for p in paths if not image_store.contains(p)]
+
+        for f_path in paths:
+            if f_path and os.path.exists(f_path) and self._is_safe_path(f_path):
+                try:
+                    os.remove(f_path)
+                    print(f"Deleted associated local file: {f_path}")
+                except Exception as file_e:
+                    print(f"Warning: Failed to delete associated local file {f_path}: {file_e}")
+
     def toggle_archive_status(self):
         print(f"Toggling archive status for Supabase record ID: {self.supabase_id}")
         if self.supabase_manager.is_client_initialized():
-            success = self.supabase_manager.update_rental_record_archive_status(self.supabase_id, not self.is_archived_record)
-            if success:
-                QMessageBox.information(self, "Success", f"Record has been {'archived' if not self.is_archived_record else 'unarchived'} in the cloud.")
-                self.is_archived_record = not self.is_archived_record
-                
-                # Refresh the main window's tabs
-                if self.main_window:
-                    self.main_window.refresh_all_rental_tabs()
-                
-                self.accept() # Close the dialog
-            else:
-                QMessageBox.critical(self, "Supabase Error", "Failed to update record in Supabase.")
+            # Queued in the outbox; toggling again before it syncs replaces the queued change
+            self.main_window.queue_cloud_write(
+                OP_SET_RENTAL_ARCHIVED, {"is_archived": not self.is_archived_record},
+                coalesce_key=rental_archive_key(self.supabase_id),
+                idempotency_key=self.supabase_id,
+            )
+            # The local copy follows right away; it stays marked as synced so push doesn't upload it again
+            self.db_manager.set_rentals_archived(
+                [self.supabase_id], not self.is_archived_record, key_column="supabase_id", keep_clean=True
+            )
+            QMessageBox.information(self, "Success", f"Record will be {'archived' if not self.is_archived_record else 'unarchived'} in the cloud.")
+            self.is_archived_record = not self.is_archived_record
+            self.accept() # Close the dialog; tabs refresh once the change has synced
         else:
             QMessageBox.warning(self, "Supabase Error", "Supabase client not configured.")
\ No newline at end of file
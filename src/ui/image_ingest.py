@@ -0,0 +1,171 @@
+"""Downscales and re-encodes document images before they enter the image store.
+
+Camera scans are often 4-12 MB, yet they are only ever shown in a preview
+label or a PDF cell. :meth:`ImageIngest.ingest` decodes the picked file once
+at reduced size via :class:`QImageReader` (applying EXIF rotation), fits it
+into ``max_dimension`` x ``max_dimension`` and writes it as JPEG or WebP. The
+smaller file is what gets stored, uploaded to Supabase and downloaded again by
+dialogs and PDF exports.
+
+If the re-encoded file would not be smaller than the source (small or already
+compressed images), or the source cannot be decoded, the source is stored
+unchanged. Animated GIFs are never re-encoded.
+
+Optionally the untouched source is kept in ``originals_dir`` under the digest
+of the stored blob, so :meth:`ImageIngest.original_for` can find it from a
+record's image path.
+
+:meth:`ImageIngest.ingest` does blocking I/O and must be called off the GUI
+thread (see ``ImageIngestWorker``). Like :mod:`src.ui.thumbnail_cache` it uses
+:class:`QImage`, never :class:`QPixmap`.
+"""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtGui import QImage, QImageReader, QImageWriter, QPainter
+
+from src.core.image_store import ImageStore, sniff_image_type
+
+# Longest side, in pixels, of a stored document; enough to read an NID card or a form in print.
+MAX_DIMENSION = 2000
+
+# Encoder quality (0-100) per output format. WebP reaches JPEG's visual quality at a lower setting.
+DEFAULT_FORMAT = "JPEG"
+DEFAULT_QUALITY = {"JPEG": 82, "WEBP": 75}
+
+# Source types worth re-encoding; GIFs may be animated and PDFs are not decoded by Qt.
+_REENCODABLE_EXTENSIONS = {".jpg", ".png", ".bmp", ".webp"}
+
+
+class ImageIngest:
+    ORIGINALS_DIR = Path.cwd() / "data" / "originals"
+
+    def __init__(
+        self,
+        image_store: ImageStore,
+        max_dimension: int = MAX_DIMENSION,
+        fmt: str = DEFAULT_FORMAT,
+        quality: int | None = None,
+        keep_originals: bool = False,
+        originals_dir: str | os.PathLike | None = None,
+    ):
+        self.image_store = image_store
+        self.max_dimension = max_dimension
+        self.fmt = fmt.upper()
+        if self.fmt.lower().encode() not in {bytes(f).lower() for f in QImageWriter.supportedImageFormats()}:
+            print(f"No {self.fmt} image writer available; re-encoding as JPEG instead.")
+            self.fmt = "JPEG"
+        self.quality = quality if quality is not None else DEFAULT_QUALITY.get(self.fmt, 80)
+        self.keep_originals = keep_originals
+        self.originals_dir = Path(originals_dir) if originals_dir else self.ORIGINALS_DIR
+
+    def ingest(self, source_path: str | os.PathLike) -> Path:
+        """
+        Adds *source_path* to the image store, downscaled and re-encoded where
+        that makes it smaller. Blocking; call from a worker thread.
+        :return: The blob path of the stored image.
+        """
+        source_path = str(source_path)
+        if self.image_store.contains(source_path):
+            return Path(source_path)
+
+        with open(source_path, "rb") as f:
+            source_ext, _mime = sniff_image_type(f.read(16))
+        encoded = self._encode(source_path) if source_ext in _REENCODABLE_EXTENSIONS else None
+        if encoded is None:
+            return self.image_store.add_file(source_path)
+
+        try:
+            if os.path.getsize(encoded) >= os.path.getsize(source_path):
+                return self.image_store.add_file(source_path)
+            blob = self.image_store.add_file(encoded)
+        finally:
+            os.remove(encoded)
+
+        if self.keep_originals:
+            self._keep_original(source_path, source_ext, blob)
+        print(f"Re-encoded {os.path.basename(source_path)} for storage: "
+              f"{os.path.getsize(source_path) // 1024} KB -> {blob.stat().st_size // 1024} KB")
+        return blob
+
+    def _encode(self, source_path: str) -> str | None:
+        """Writes the fitted, re-encoded image to a temp file in the store and returns its path, or None if it can't be decoded."""
+        reader = QImageReader(source_path)
+        reader.setAutoTransform(True)
+        original = reader.size()
+        bound = QSize(self.max_dimension, self.max_dimension)
+        if original.isValid() and (original.width() > bound.width() or original.height() > bound.height()):
+            # Let the decoder scale (JPEG decodes directly at a fraction of full size)
+            reader.setScaledSize(original.scaled(bound, Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            print(f"Could not decode image {source_path}: {reader.errorString()}; storing it unchanged.")
+            return None
+        if image.width() > bound.width() or image.height() > bound.height():
+            image = image.scaled(bound, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        if self.fmt == "JPEG" and image.hasAlphaChannel():
+            image = self._flatten(image)
+
+        # A .part name, so an interrupted write is swept by ImageStore.collect_garbage
+        fd, tmp_path = tempfile.mkstemp(dir=self.image_store.root, suffix=".part")
+        os.close(fd)
+        writer = QImageWriter(tmp_path, self.fmt.encode())
+        writer.setQuality(self.quality)
+        if self.fmt == "JPEG":
+            writer.setOptimizedWrite(True)
+            writer.setProgressiveScanWrite(True)
+        if not writer.write(image):
+            print(f"Could not re-encode image {source_path}: {writer.errorString()}; storing it unchanged.")
+            os.remove(tmp_path)
+            return None
+        return tmp_path
+
+    @staticmethod
+    def _flatten(image: QImage) -> QImage:
+        """Composites a transparent image onto white; JPEG has no alpha channel."""
+        canvas = QImage(image.size(), QImage.Format_RGB32)
+        canvas.fill(Qt.white)
+        painter = QPainter(canvas)
+        painter.drawImage(0, 0, image)
+        painter.end()
+        return canvas
+
+    # ------------------------------------------------------------------
+    # Originals
+    # ------------------------------------------------------------------
+
+    def _keep_original(self, source_path: str, source_ext: str, blob: Path):
+        digest = ImageStore.digest_of(blob.name)
+        if not digest:
+            return
+        self.originals_dir.mkdir(parents=True, exist_ok=True)
+        dest = self.originals_dir / f"{digest}{source_ext}"
+        if not dest.exists():
+            tmp = dest.with_suffix(".part")
+            shutil.copyfile(source_path, tmp)
+            os.replace(tmp, dest)
+
+    def original_for(self, path: str | None) -> Path | None:
+        """Return the kept full-size original of a stored image, if there is one."""
+        digest = ImageStore.digest_of(path)
+        if not digest or not self.originals_dir.is_dir():
+            return None
+        return next(self.originals_dir.glob(f"{digest}.*"), None)
+
+    def prune_originals(self) -> list[str]:
+        """Removes kept originals whose re-encoded blob is no longer in the store."""
+        if not self.originals_dir.is_dir():
+            return []
+        removed = []
+        for entry in self.originals_dir.iterdir():
+            digest = ImageStore.digest_of(entry.name)
+            if entry.is_file() and (not digest or self.image_store.find_blob(digest) is None):
+                try:
+                    os.remove(entry)
+                    removed.append(str(entry))
+                except OSError as e:
+                    print(f"Warning: Failed to delete original image {entry}: {e}")
+        return removed
@@ -0,0 +1,240 @@
+"""Column-oriented table models for large read-only views.
+
+:class:`ColumnTableModel` keeps a table as one sequence per column and holds
+the caller's values as they are, so filling it creates no per-cell objects;
+display text is produced only for the cells a view actually paints. Rows are
+handed to the view in batches through ``canFetchMore``/``fetchMore``, so a view
+of 50k rows lays out only the rows scrolled into reach.
+
+Sorting reorders a row permutation inside the model instead of comparing
+cells through ``data()``; :class:`ColumnFilterProxyModel` forwards header
+clicks to it and filters rows on a case-insensitive substring of any column.
+Rows streamed in pages are added with ``append_columns`` without resetting the
+view.
+"""
+from array import array
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+
+# Rows handed to the view per fetchMore() call.
+FETCH_BATCH_SIZE = 500
+
+
+def _numeric_sort_key(value):
+    """Numbers sort by value and before text; blanks sort last."""
+    if value is None or value == "":
+        return (2, "")
+    try:
+        return (0, float(value))
+    except (TypeError, ValueError):
+        return (1, str(value).lower())
+
+
+class ColumnTableModel(QAbstractTableModel):
+    def __init__(self, headers: list[str], float_format: str | None = None, base_sort_column: int = -1, parent=None):
+        """
+        :param headers: Column titles.
+        :param float_format: Format spec for float cells (e.g. ``".2f"``); others show ``str(value)``.
+        :param base_sort_column: Column whose ascending order the rows keep while no header is
+                                 sorted, however they were appended; -1 keeps them as given.
+        """
+        super().__init__(parent)
+        self._headers = list(headers)
+        self._float_format = float_format
+        self._base_sort_column = base_sort_column
+        self._columns: list = [[] for _ in self._headers]
+        self._row_data = None        # Per-row value returned for Qt.UserRole (e.g. a record id)
+        self._sort_keys: dict = {}   # column -> sequence of precomputed sort keys
+        self._total = 0
+        self._loaded = 0
+        self._order = None           # array of source row numbers while sorted, else None
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+
+    # ------------------------------------------------------------------
+    # Content
+    # ------------------------------------------------------------------
+
+    def set_headers(self, headers: list[str]):
+        """Replaces the column titles (and empties the model)."""
+        self.beginResetModel()
+        self._headers = list(headers)
+        self._reset_content([[] for _ in self._headers], None, None)
+        self.endResetModel()
+
+    def set_columns(self, columns: list, row_data=None, sort_keys: dict | None = None):
+        """
+        Replaces the content.
+        :param columns: One sequence of cell values per column, all the same length.
+        :param row_data: Optional sequence with one Qt.UserRole value per row.
+        :param sort_keys: Optional ``{column: sequence}`` used instead of the cell values when sorting.
+        """
+        self.beginResetModel()
+        self._reset_content(columns, row_data, sort_keys)
+        self._order = self._current_order()
+        self.endResetModel()
+
+    def append_columns(self, columns: list, row_data=None, sort_keys: dict | None = None):
+        """
+        Adds rows after the current ones without resetting the view: its fetched rows,
+        selection and sort stay. Arguments as for :meth:`set_columns`; *row_data* and
+        *sort_keys* must be given exactly when the current content has them.
+        """
+        count = len(columns[0]) if columns else 0
+        if not count:
+            return
+        if not self._total:
+            self.set_columns(columns, row_data, sort_keys)
+            return
+        for existing, new in zip(self._columns, columns):
+            existing.extend(new)
+        if self._row_data is not None:
+            self._row_data.extend(row_data)
+        for column, keys in self._sort_keys.items():
+            keys.extend(sort_keys[column])
+        self._total += count
+        if self._order is not None:
+            self._reorder()  # The new rows take their places among the sorted ones
+        loaded = min(self._total, max(self._loaded, FETCH_BATCH_SIZE))
+        if loaded > self._loaded:
+            self.beginInsertRows(QModelIndex(), self._loaded, loaded - 1)
+            self._loaded = loaded
+            self.endInsertRows()
+
+    def clear(self):
+        self.set_columns([[] for _ in self._headers])
+
+    def _reset_content(self, columns, row_data, sort_keys):
+        # Shallow copies (no per-cell objects), so append_columns can extend them
+        self._columns = [list(column) for column in columns]
+        self._row_data = list(row_data) if row_data is not None else None
+        self._sort_keys = {column: list(keys) for column, keys in (sort_keys or {}).items()}
+        self._total = len(self._columns[0]) if self._columns else 0
+        self._loaded = min(self._total, FETCH_BATCH_SIZE)
+        self._order = None
+
+    def total_rows(self) -> int:
+        """Rows in the model, including those not yet fetched by the view."""
+        return self._total
+
+    def source_row(self, row: int) -> int:
+        """Position in the caller's columns of the model's *row* (they differ while sorted)."""
+        return self._order[row] if self._order is not None else row
+
+    def value(self, row: int, column: int):
+        return self._columns[column][self.source_row(row)]
+
+    def row_data(self, row: int):
+        return self._row_data[self.source_row(row)] if self._row_data is not None else None
+
+    def row_matches(self, row: int, needle: str) -> bool:
+        """True if any cell of *row* contains *needle* (already lower-cased)."""
+        source = self.source_row(row)
+        return any(needle in self._display(column[source]).lower() for column in self._columns)
+
+    # ------------------------------------------------------------------
+    # QAbstractTableModel
+    # ------------------------------------------------------------------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < self._total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(FETCH_BATCH_SIZE, self._total - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self._display(self.value(index.row(), index.column()))
+        if role == Qt.UserRole:
+            return self.row_data(index.row())
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self._headers[section] if section < len(self._headers) else None
+        return str(section + 1)
+
+    def flags(self, index):
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled if index.isValid() else Qt.NoItemFlags
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Sorts all rows (fetched or not) by *column*; a negative column restores the original order."""
+        self._sort_column, self._sort_order = column, order
+        self._reorder()
+
+    def _current_order(self) -> array | None:
+        if self._sort_column >= 0:
+            return self._sorted_order(self._sort_column, self._sort_order)
+        if self._base_sort_column >= 0:
+            return self._sorted_order(self._base_sort_column, Qt.AscendingOrder)
+        return None
+
+    def _reorder(self):
+        """Recomputes the row order after a sort or an append."""
+        self.layoutAboutToBeChanged.emit()
+        old_order = self._order
+        self._order = self._current_order()
+        # Keep the selection and current index on the same rows after they move
+        persistent = self.persistentIndexList()
+        if persistent:
+            new_position = {source: row for row, source in enumerate(self._order or range(self._total))}
+            moved = []
+            for index in persistent:
+                row = new_position[old_order[index.row()] if old_order is not None else index.row()]
+                # A row sorted past the fetched range is dropped from the selection
+                moved.append(self.index(row, index.column()) if row < self._loaded else QModelIndex())
+            self.changePersistentIndexList(persistent, moved)
+        self.layoutChanged.emit()
+
+    def _sorted_order(self, column: int, order) -> array | None:
+        if column >= len(self._columns):
+            return None
+        keys = self._sort_keys.get(column)
+        if keys is None:
+            values = self._columns[column]
+            keys = [_numeric_sort_key(v) for v in values]
+        rows = sorted(range(self._total), key=keys.__getitem__, reverse=order == Qt.DescendingOrder)
+        return array("l", rows)
+
+    def _display(self, value) -> str:
+        if value is None:
+            return ""
+        if self._float_format and isinstance(value, float):
+            return format(value, self._float_format)
+        return value if isinstance(value, str) else str(value)
+
+
+class ColumnFilterProxyModel(QSortFilterProxyModel):
+    """Filters a :class:`ColumnTableModel` by substring and lets it sort itself."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._needle = ""
+
+    def set_filter_text(self, text: str):
+        self._needle = text.strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return not self._needle or self.sourceModel().row_matches(source_row, self._needle)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # The source sorts its row permutation in one pass; the proxy keeps source order
+        self.sourceModel().sort(column, order)
@@ -7,7 +7,7 @@ import logging
 from PyQt5.QtCore import Qt, QRegExp
 from PyQt5.QtGui import QIcon, QRegExpValidator, QPixmap
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
     QGridLayout, QGroupBox, QFormLayout, QMessageBox, QSizePolicy, QDialog,
     QFileDialog, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QComboBox, QProgressDialog
 )
@@ -71,10 +71,25 @@ class ArchivedInfoTab(QWidget):
         self.archived_records_table.setHorizontalHeaderLabels(["ID", "Tenant Name", "Room Number", "Advanced Paid", "Created At", "Updated At"])
         self.archived_records_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.archived_records_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # Ctrl/Shift-click selects several records for the bulk actions below
+        self.archived_records_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.archived_records_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.archived_records_table.setStyleSheet(get_table_style())
         self.archived_records_table.clicked.connect(self.show_record_details_dialog)
         table_layout.addWidget(self.archived_records_table)
+
+        # Bulk actions on the selected rows
+        bulk_buttons_layout = QHBoxLayout()
+        self.archive_selected_btn = QPushButton("Unarchive Selected")
+        self.archive_selected_btn.setStyleSheet(get_button_style())
+        self.archive_selected_btn.clicked.connect(self.archive_selected_records)
+        bulk_buttons_layout.addWidget(self.archive_selected_btn)
+
+        self.delete_selected_btn = QPushButton("Delete Selected")
+        self.delete_selected_btn.setStyleSheet(get_button_style().replace("#059669", "#dc3545").replace("#047857", "#c82333")) # Red color
+        self.delete_selected_btn.clicked.connect(self.delete_selected_records)
+        bulk_buttons_layout.addWidget(self.delete_selected_btn)
+        table_layout.addLayout(bulk_buttons_layout)
         
         main_layout.addWidget(table_group)
         self.setLayout(main_layout)
@@ -129,11 +144,19 @@ class ArchivedInfoTab(QWidget):
 
         self.load_source_combo.setEnabled(False)
 
+        # A refresh while an earlier fetch is still streaming must not append its pages or finish this one's progress bar
+        previous_worker = getattr(self, "_fetch_worker", None)
+        if previous_worker is not None and previous_worker.isRunning():
+            previous_worker.requestInterruption()
+            previous_worker.disconnect()
+
+        # Pages are appended as they arrive, so the first rows show while the rest load
+        self.archived_records_table.setRowCount(0)
         self._fetch_worker = FetchSupabaseRentalRecordsWorker(
             self.main_window.supabase_manager, is_archived=True, parent=self
         )
-        self._fetch_worker.records_fetched.connect(
-            lambda recs: self._on_archived_cloud_ready(recs, selected_source)
+        self._fetch_worker.page_fetched.connect(
+            lambda page: self._on_archived_cloud_ready(page, selected_source)
         )
         self._fetch_worker.error_occurred.connect(self._on_archived_cloud_error)
         self._fetch_worker.finished.connect(self._on_archived_cloud_finished)
@@ -141,11 +164,9 @@ class ArchivedInfoTab(QWidget):
 
     # ---------------- Worker callbacks and helpers ----------------
 
-    def _on_archived_cloud_ready(self, records, source):
-        if not records:
-            # Message already displayed by caller (load_archived_records or worker callback)
-            return
-        self._populate_archived_table(source, records)
+    def _on_archived_cloud_ready(self, page, source):
+        """Append one page of cloud records to the table."""
+        self._populate_archived_table(source, page, append=True)
 
     def _on_archived_cloud_error(self, message: str):
         QMessageBox.critical(self, "Cloud DB Error", f"Failed to load archived rental records from Supabase: {message}")
@@ -168,40 +189,123 @@ class ArchivedInfoTab(QWidget):
             self._inline_progress_bar = None
         # <<< MODIFY
 
-    def _populate_archived_table(self, source_label: str, records: list):
+    def _populate_archived_table(self, source_label: str, records: list, append: bool = False):
         if not records:
             # Message already displayed by caller (load_archived_records or worker callback)
             return
 
-        self.archived_records_table.setRowCount(len(records))
+        first_row = self.archived_records_table.rowCount() if append else 0
+        self.archived_records_table.setRowCount(first_row + len(records))
 
-        for row_idx, record in enumerate(records):
-            if source_label == "Local DB":
-                display_id, tenant_name, room_number, advanced_paid, created_at, updated_at = (
-                    record[0], record[1], record[2], record[3], record[4], record[5]
-                )
-                full_record_data = record
-            else:
-                display_id = record.get("id")
-                tenant_name = record.get("tenant_name")
-                room_number = record.get("room_number")
-                advanced_paid = record.get("advanced_paid")
-                created_at = record.get("created_at")
-                updated_at = record.get("updated_at")
-                full_record_data = record
-
-            self.archived_records_table.setItem(row_idx, 0, QTableWidgetItem(str(display_id)))
-            self.archived_records_table.setItem(row_idx, 1, QTableWidgetItem(str(tenant_name)))
-            self.archived_records_table.setItem(row_idx, 2, QTableWidgetItem(str(room_number)))
-            self.archived_records_table.setItem(row_idx, 3, QTableWidgetItem(str(advanced_paid)))
-            self.archived_records_table.setItem(row_idx, 4, QTableWidgetItem(str(created_at)))
-            self.archived_records_table.setItem(row_idx, 5, QTableWidgetItem(str(updated_at)))
-
-            self.archived_records_table.item(row_idx, 0).setData(Qt.UserRole, full_record_data)
+        for row_idx, record in enumerate(records, start=first_row):
+            self._set_archived_row(row_idx, source_label, record)
+
+    def _set_archived_row(self, row_idx: int, source_label: str, record):
+        if source_label == "Local DB":
+            display_id, tenant_name, room_number, advanced_paid, created_at, updated_at = (
+                record[0], record[1], record[2], record[3], record[4], record[5]
+            )
+            full_record_data = record
+        else:
+            display_id = record.get("id")
+            tenant_name = record.get("tenant_name")
+            room_number = record.get("room_number")
+            advanced_paid = record.get("advanced_paid")
+            created_at = record.get("created_at")
+            updated_at = record.get("updated_at")
+            full_record_data = record
+
+        self.archived_records_table.setItem(row_idx, 0, QTableWidgetItem(str(display_id)))
+        self.archived_records_table.setItem(row_idx, 1, QTableWidgetItem(str(tenant_name)))
+        self.archived_records_table.setItem(row_idx, 2, QTableWidgetItem(str(room_number)))
+        self.archived_records_table.setItem(row_idx, 3, QTableWidgetItem(str(advanced_paid)))
+        self.archived_records_table.setItem(row_idx, 4, QTableWidgetItem(str(created_at)))
+        self.archived_records_table.setItem(row_idx, 5, QTableWidgetItem(str(updated_at)))
+
+        self.archived_records_table.item(row_idx, 0).setData(Qt.UserRole, full_record_data)
+
+    def apply_cloud_change(self, event: str, record: dict, old_record: dict):
+        """
+        Applies one Realtime change of a rental_records row in place while the table shows
+        cloud records, instead of reloading it. Rows whose archive flag changed move between
+        this tab and the rental tab.
+        """
+        if self.load_source_combo.currentText() != "Cloud (Supabase)":
+            return
+        record_id = str((record or old_record).get("id"))
+        row = next(
+            (r for r in range(self.archived_records_table.rowCount())
+             if self.archived_records_table.item(r, 0) and self.archived_records_table.item(r, 0).text() == record_id),
+            None,
+        )
+        belongs_here = event != "DELETE" and record.get("is_archived")
+        if not belongs_here:
+            if row is not None:
+                self.archived_records_table.removeRow(row)
+            return
+        if row is None:
+            # Keep the newest-first order of the cloud query
+            created_at = str(record.get("created_at"))
+            row = next(
+                (r for r in range(self.archived_records_table.rowCount())
+                 if self.archived_records_table.item(r, 4) and self.archived_records_table.item(r, 4).text() < created_at),
+                self.archived_records_table.rowCount(),
+            )
+            self.archived_records_table.insertRow(row)
+        self._set_archived_row(row, "Cloud (Supabase)", record)
+
+    def _selected_records(self) -> list[dict]:
+        """Records of the selected rows as dicts (local rows are stored as sqlite rows)."""
+        records = []
+        for index in self.archived_records_table.selectionModel().selectedRows():
+            item = self.archived_records_table.item(index.row(), 0)
+            record_data = item.data(Qt.UserRole) if item else None
+            if not record_data:
+                continue
+            records.append(dict(record_data) if isinstance(record_data, dict) else {key: record_data[key] for key in record_data.keys()})
+        return records
+
+    def archive_selected_records(self):
+        records = self._selected_records()
+        if not records:
+            QMessageBox.information(self, "No Selection", "Select one or more records first (Ctrl/Shift-click to select several).")
+            return
+        source = self.load_source_combo.currentText()
+        reply = QMessageBox.question(self, "Confirm Unarchive",
+                                     f"Unarchive {len(records)} selected record(s) in {source}?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            changed = self.main_window.archive_rental_records(records, False, source)
+            QMessageBox.information(self, "Success", f"{changed} record(s) unarchived" + (" (queued for Supabase)." if source != "Local DB" else "."))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to unarchive records: {e}")
+            traceback.print_exc()
+
+    def delete_selected_records(self):
+        records = self._selected_records()
+        if not records:
+            QMessageBox.information(self, "No Selection", "Select one or more records first (Ctrl/Shift-click to select several).")
+            return
+        source = self.load_source_combo.currentText()
+        reply = QMessageBox.question(self, "Confirm Delete",
+                                     f"Are you sure you want to delete {len(records)} selected record(s) from {source}?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            deleted = self.main_window.delete_rental_records(records, source)
+            QMessageBox.information(self, "Success", f"{deleted} record(s) deleted" + (" (queued for Supabase)." if source != "Local DB" else "."))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to delete records: {e}")
+            traceback.print_exc()
 
     def show_record_details_dialog(self, index):
         if not index.isValid():
             return
+        if QApplication.keyboardModifiers() & (Qt.ControlModifier | Qt.ShiftModifier):
+            return  # Extending the selection, not opening a record
             
         selected_row = index.row()
         if selected_row < 0 or selected_row >= self.archived_records_table.rowCount():
@@ -239,6 +343,13 @@ class ArchivedInfoTab(QWidget):
             }
         else: # Cloud (Supabase) - already a flattened dict
             record_dict = record_data
+            if "photo_url" not in record_dict:
+                # List rows are summaries; fetch the image URLs only now that the record is opened
+                full_record = self.main_window.supabase_manager.get_rental_record(record_dict.get("id"))
+                if not full_record:
+                    QMessageBox.warning(self, "Error", "Unable to load the full record from Supabase. Please try again.")
+                    return
+                record_dict.update(full_record)
             # Ensure local paths are empty strings if not present, as dialog expects paths
             record_dict["photo_path"] = record_dict.get("photo_url", "")
             record_dict["nid_front_path"] = record_dict.get("nid_front_url", "")
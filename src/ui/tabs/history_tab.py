@@ -6,13 +6,13 @@ import csv
 import traceback
 from datetime import datetime
 
-from PyQt5.QtCore import Qt, QRegExp
+from PyQt5.QtCore import Qt, QRegExp, QTimer, QModelIndex
 from PyQt5.QtGui import QRegExpValidator, QIcon
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QGroupBox, QFormLayout, QMessageBox, QSpinBox, QScrollArea,
     QTableWidget, QTableWidgetItem, QHeaderView, QComboBox, QSizePolicy,
-    QDialog, QAbstractItemView
+    QDialog, QAbstractItemView, QTableView, QLineEdit
 )
 from postgrest.exceptions import APIError
 
@@ -21,7 +21,9 @@ from src.ui.styles import (
     get_room_group_style, get_month_info_style, get_table_style, get_label_style
 )
 from src.core.utils import resource_path # For icons
+from src.ui.background_workers import FetchMonthlyTotalsWorker, FetchSupabaseHistoryWorker
 from src.ui.custom_widgets import CustomLineEdit, AutoScrollArea, CustomSpinBox, CustomNavButton
+from src.ui.table_models import ColumnFilterProxyModel, ColumnTableModel
 
 
 # Dialog for Editing Records (Moved from HomeUnitCalculator.py)
@@ -334,21 +336,14 @@ class EditRecordDialog(QDialog):
                 
                 updated_room_records_for_supabase.append(room_record_to_save)
 
-            # Update main_calculations using SupabaseManager
-            main_update_success = self.supabase_manager.save_main_calculation(updated_main_data_jsonb)
-            
-            if not main_update_success:
-                QMessageBox.critical(self, "Supabase Error", "Failed to update main calculation data.")
-                return
+            # Update main_calculations and its rooms in one atomic request
+            update_success = self.supabase_manager.save_calculation(
+                updated_main_data_jsonb, updated_room_records_for_supabase or None
+            )
 
-            # Save room calculations using SupabaseManager
-            if updated_room_records_for_supabase:
-                rooms_update_success = self.supabase_manager.save_room_calculations(
-                    self.record_id, updated_room_records_for_supabase
-                )
-                if not rooms_update_success:
-                    QMessageBox.critical(self, "Supabase Error", "Failed to update room calculation data.")
-                    return
+            if not update_success:
+                QMessageBox.critical(self, "Supabase Error", "Failed to update calculation data.")
+                return
 
             QMessageBox.information(self, "Success", "Record updated successfully.")
             self.accept() # Close dialog on success
@@ -361,6 +356,18 @@ class HistoryTab(QWidget):
         "January": 1, "February": 2, "March": 3, "April": 4, "May": 5, "June": 6,
         "July": 7, "August": 8, "September": 9, "October": 10, "November": 11, "December": 12
     }
+    ROOM_COLUMNS = [
+        "Month", "Room Number", "Present Unit", "Previous Unit", "Real Unit",
+        "Unit Bill", "Gas Bill", "Water Bill", "House Rent", "Grand Total"
+    ]
+    # room_data keys shown in ROOM_COLUMNS[1:]
+    ROOM_DATA_KEYS = (
+        "room_name", "present_unit", "previous_unit", "real_unit",
+        "unit_bill", "gas_bill", "water_bill", "house_rent", "grand_total"
+    )
+    TOTALS_COLUMNS = ["Month", "Total House Rent", "Total Water Bill", "Total Gas Bill", "Total Room Unit Bill"]
+    # The room table scrolls by itself past this many rows, so only the visible rows are laid out
+    ROOM_TABLE_VISIBLE_ROWS = 20
 
     def __init__(self, main_window_ref):
         super().__init__()
@@ -371,10 +378,30 @@ class HistoryTab(QWidget):
         self.history_year_spinbox = None
         self.main_history_table = None
         self.room_history_table = None
+        self.totals_table = None
+        self.room_filter_input = None
+        # Table contents live in column-array models; the views see them through filter/sort proxies.
+        # Months stay in calendar order while no header is sorted, as pages of them stream in.
+        self.main_history_model = ColumnTableModel([], base_sort_column=0)
+        self.room_history_model = ColumnTableModel(self.ROOM_COLUMNS, base_sort_column=0)
+        self.totals_model = ColumnTableModel(self.TOTALS_COLUMNS, float_format=".2f")
         self.edit_selected_record_button = None
         self.delete_selected_record_button = None
         # load_history_source_combo is accessed via self.main_window
 
+        # Months shown from Supabase and the (month, year) filter they were loaded with;
+        # Realtime changes are applied to this list
+        self._cloud_history = None
+        self._cloud_history_filters = (None, None)
+        self._history_render_pending = False
+        self._history_load_silent = False
+        self._history_first_page = False
+        # Meter/diff column pairs in the main table, and per-month sums of the rooms loaded
+        self._history_meters = 3
+        self._room_totals = {}
+        # Per-month totals summed by Supabase; None until they arrive (rows are summed meanwhile)
+        self._cloud_totals = None
+
         self.init_ui()
 
     def init_ui(self):
@@ -459,20 +486,15 @@ class HistoryTab(QWidget):
         main_calc_group = QGroupBox("Main Calculation Info")
         main_calc_group.setStyleSheet(get_group_box_style())
         main_calc_layout = QVBoxLayout(main_calc_group)
-        self.main_history_table = QTableWidget()
+        self.main_history_table = self._create_table_view(self.main_history_model)
         # Enable horizontal scrollbar for main table if content exceeds width
         self.main_history_table.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         self.main_history_table.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff) # Vertical scrolling handled by main scroll area
-        self.main_history_table.setSelectionBehavior(QAbstractItemView.SelectRows)
-        self.main_history_table.setSelectionMode(QAbstractItemView.SingleSelection)
-        self.main_history_table.setAlternatingRowColors(True)
-        self.main_history_table.setStyleSheet(get_table_style())
         # Initially set columns to minimum required, will update dynamically on data load
         self.set_main_history_table_columns(3)  # default 3 meters/diffs
         # Remove all height restrictions and let table grow naturally
         self.main_history_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
         # Resize table to content height and adjust table height to show all rows
-        self.main_history_table.resizeRowsToContents()
         self.resize_table_to_content(self.main_history_table)
         main_calc_layout.addWidget(self.main_history_table)
         layout.addWidget(main_calc_group)  # No stretch factor - let it size naturally
@@ -480,26 +502,21 @@ class HistoryTab(QWidget):
         room_calc_group = QGroupBox("Room Calculation Info")
         room_calc_group.setStyleSheet(get_group_box_style())
         room_calc_layout = QVBoxLayout(room_calc_group)
-        self.room_history_table = QTableWidget()
-        self.room_history_table.setColumnCount(10)
-        self.room_history_table.setHorizontalHeaderLabels([
-            "Month", "Room Number", "Present Unit", "Previous Unit", "Real Unit", 
-            "Unit Bill", "Gas Bill", "Water Bill", "House Rent", "Grand Total"
-        ])
+        self.room_filter_input = QLineEdit()
+        self.room_filter_input.setPlaceholderText("Filter rooms by month, room number or amount")
+        self.room_filter_input.setStyleSheet(get_line_edit_style())
+        self.room_filter_input.textChanged.connect(self._on_room_filter_changed)
+        room_calc_layout.addWidget(self.room_filter_input)
+        self.room_history_table = self._create_table_view(self.room_history_model)
         # Allow interactive resizing and horizontal scrolling for room table
         self.room_history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive) 
-        self.room_history_table.setAlternatingRowColors(True)
-        self.room_history_table.setStyleSheet(get_table_style())
         # Enable horizontal scrollbar for room table if content exceeds width
         self.room_history_table.setHorizontalScrollBarPolicy(Qt.ScrollBarAsNeeded)
-        self.room_history_table.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff) # Vertical scrolling handled by main scroll area
-        self.room_history_table.setSelectionBehavior(QAbstractItemView.SelectRows)
-        self.room_history_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        # Long histories scroll inside the table; rows are fetched from the model as they come into view
+        self.room_history_table.setVerticalScrollBarPolicy(Qt.ScrollBarAsNeeded)
         # Remove all height restrictions and let table grow naturally
         self.room_history_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
-        # Resize table to content height and adjust table height to show all rows
-        self.room_history_table.resizeRowsToContents()
-        self.resize_table_to_content(self.room_history_table)
+        self.resize_table_to_content(self.room_history_table, max_rows=self.ROOM_TABLE_VISIBLE_ROWS)
         room_calc_layout.addWidget(self.room_history_table)
         layout.addWidget(room_calc_group)  # No stretch factor - let it size naturally
 
@@ -507,21 +524,14 @@ class HistoryTab(QWidget):
         totals_group = QGroupBox("Total Summary")
         totals_group.setStyleSheet(get_group_box_style())
         totals_layout = QVBoxLayout(totals_group)
-        self.totals_table = QTableWidget()
-        self.totals_table.setColumnCount(5)
-        self.totals_table.setHorizontalHeaderLabels([
-            "Month", "Total House Rent", "Total Water Bill", "Total Gas Bill", "Total Room Unit Bill"
-        ])
+        self.totals_table = self._create_table_view(self.totals_model)
         self.totals_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.totals_table.setAlternatingRowColors(True)
-        self.totals_table.setStyleSheet(get_table_style())
         # Remove all height restrictions and let table grow naturally
         self.totals_table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
         # Disable scrollbars for totals table since we're using full page scrolling
         self.totals_table.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         self.totals_table.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
         # Resize table to content height and adjust table height to show all rows
-        self.totals_table.resizeRowsToContents()
         self.resize_table_to_content(self.totals_table)
         totals_layout.addWidget(self.totals_table)
         layout.addWidget(totals_group)  # No stretch factor - let it size naturally
@@ -531,27 +541,53 @@ class HistoryTab(QWidget):
         main_layout.addWidget(scroll_area)
         self.setLayout(main_layout)
 
-    def resize_table_to_content(self, table):
-        """Resize table height to fit all rows without scrolling"""
-        if table.rowCount() == 0:
-            table.setFixedHeight(table.horizontalHeader().height() + 10)
-            return
-        
-        # Calculate total height needed
+    def _create_table_view(self, model):
+        """A read-only row-selecting view of *model* through a filter/sort proxy."""
+        proxy = ColumnFilterProxyModel(self)
+        proxy.setSourceModel(model)
+        view = QTableView()
+        view.setModel(proxy)
+        view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        view.setSelectionMode(QAbstractItemView.SingleSelection)
+        view.setAlternatingRowColors(True)
+        view.setStyleSheet(get_table_style())
+        view.setWordWrap(False)
+        # Uniform row heights: nothing is measured per row, whatever the row count
+        view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        # Rows keep their loaded order until a header is clicked
+        view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        view.setSortingEnabled(True)
+        return view
+
+    def _on_room_filter_changed(self, text):
+        self.room_history_table.model().set_filter_text(text)
+        self.resize_table_to_content(self.room_history_table, max_rows=self.ROOM_TABLE_VISIBLE_ROWS)
+
+    def resize_table_to_content(self, table, max_rows=None):
+        """
+        Resize table height to fit its rows without scrolling, or to *max_rows*
+        rows with the table scrolling the rest.
+        """
+        model = table.model()
+        if max_rows is None:
+            # Shown in full, so every row has to be there
+            while model.canFetchMore(QModelIndex()):
+                model.fetchMore(QModelIndex())
+        row_count = model.rowCount()
+        if max_rows is not None:
+            row_count = min(row_count, max_rows)
         header_height = table.horizontalHeader().height()
-        row_height = 0
-        
-        # Get the height of all rows
-        for row in range(table.rowCount()):
-            row_height += table.rowHeight(row)
-        
-        # Add some padding for borders and margins
-        total_height = header_height + row_height + 10
-        
+        if row_count == 0:
+            table.setFixedHeight(header_height + 10)
+            return
+
+        # All rows share the default height (see _create_table_view); add some padding for borders
+        total_height = header_height + row_count * table.verticalHeader().defaultSectionSize() + 10
+        if max_rows is not None and model.rowCount() > max_rows and table.horizontalScrollBar().isVisible():
+            total_height += table.horizontalScrollBar().height()
+
         # Set the table to this exact height
         table.setFixedHeight(total_height)
-        table.setMaximumHeight(total_height)
-        table.setMinimumHeight(total_height)
 
     def set_main_history_table_columns(self, num_meters):
         # num_meters: number of meter/diff pairs to show, max 10
@@ -564,8 +600,7 @@ class HistoryTab(QWidget):
         # Fixed columns after meters/diffs
         fixed_after_columns = ["Total Unit Cost", "Total Diff Units", "Per Unit Cost", "Added Amount", "Grand Total"]
         all_columns = fixed_columns + meter_columns + diff_columns + fixed_after_columns
-        self.main_history_table.setColumnCount(len(all_columns))
-        self.main_history_table.setHorizontalHeaderLabels(all_columns)
+        self.main_history_model.set_headers(all_columns)
         header = self.main_history_table.horizontalHeader()
         # Set resize mode: stretch for fixed columns, resize to contents for meters/diffs
         for i in range(len(all_columns)):
@@ -574,7 +609,12 @@ class HistoryTab(QWidget):
             else:
                 header.setSectionResizeMode(i, QHeaderView.ResizeToContents)
 
-    def load_history(self):
+    def load_history(self, silent: bool = False):
+        """
+        Loads the history tables from the selected source.
+        :param silent: A background reload of cloud history (e.g. its cache was revalidated):
+                       the tables are redrawn without message boxes; problems are only printed.
+        """
         try:
             selected_month = self.history_month_combo.currentText()
             selected_year_val = None if self.history_year_spinbox.specialValueText() and self.history_year_spinbox.value() == self.history_year_spinbox.minimum() else self.history_year_spinbox.value()
@@ -586,7 +626,9 @@ class HistoryTab(QWidget):
                 if self.main_window.supabase_manager and self.main_window.check_internet_connectivity():
                     month_filter = None if selected_month == "All" else selected_month
                     year_filter  = selected_year_val        # already None if "All"
-                    self.load_history_tables_from_supabase(month_filter, year_filter)
+                    self.load_history_tables_from_supabase(month_filter, year_filter, silent=silent)
+                elif silent:
+                    print("History not reloaded: Supabase is not configured or there is no internet connection.")
                 elif not self.main_window.supabase_manager:
                     QMessageBox.warning(self, "Supabase Not Configured", "Supabase is not configured.")
                 else:
@@ -594,7 +636,10 @@ class HistoryTab(QWidget):
             else:
                 QMessageBox.warning(self, "Unknown Source", "Select a valid source.")
         except Exception as e:
-            QMessageBox.critical(self, "Load History Error", f"Error: {e}\n{traceback.format_exc()}")
+            if silent:
+                print(f"Error reloading history: {e}\n{traceback.format_exc()}")
+            else:
+                QMessageBox.critical(self, "Load History Error", f"Error: {e}\n{traceback.format_exc()}")
 
 
     def load_history_tables_from_csv(self, selected_month, selected_year_val):
@@ -671,8 +716,8 @@ class HistoryTab(QWidget):
                 filtered_main_rows.sort(key=lambda x: (x['year'], self.MONTH_ORDER.get(x['month'], 0)), reverse=True)
 
                 # Clear existing data
-                self.main_history_table.setRowCount(0)
-                self.room_history_table.setRowCount(0)
+                self.main_history_model.clear()
+                self.room_history_model.clear()
 
                 # Prepare chronologically ordered room entries
                 all_room_rows_sorted_with_context = []
@@ -701,83 +746,56 @@ class HistoryTab(QWidget):
                     max_meters = min(max_meters, 10)  # Clamp to 10
 
                     self.set_main_history_table_columns(max_meters)
-                    self.main_history_table.setRowCount(len(filtered_main_rows))
-                    
-                    for row_idx, main_row_data in enumerate(filtered_main_rows):
+                    columns = [[] for _ in range(1 + max_meters * 2 + 5)]
+                    row_ids = []
+
+                    for main_row_data in filtered_main_rows:
                         row = main_row_data['csv_row']
                         
-                        # Set month column
-                        month_year_str = f"{main_row_data['month']} {main_row_data['year']}"
-                        month_item = QTableWidgetItem(month_year_str)
-                        row_calc_id = main_row_data['csv_row'].get('id')
-                        month_item.setData(Qt.UserRole, row_calc_id)  # Store the correct id for this row
-                        self.main_history_table.setItem(row_idx, 0, month_item)
+                        # Month column; the row's id is kept for edit/delete
+                        columns[0].append(f"{main_row_data['month']} {main_row_data['year']}")
+                        row_ids.append(row.get('id'))
                         
-                        # Set meter columns dynamically (skip zeros)
+                        # Meter and diff columns (zeros are left blank)
                         for i in range(max_meters):
                             meter_val = get_csv_value(row, f"Meter-{i+1}", "0")
-                            # Only show non-zero values
-                            display_val = meter_val if meter_val not in ["0", "", "0.0"] else ""
-                            self.main_history_table.setItem(row_idx, 1 + i, QTableWidgetItem(display_val))
-                        
-                        # Set diff columns dynamically (skip zeros)
-                        for i in range(max_meters):
                             diff_val = get_csv_value(row, f"Diff-{i+1}", "0")
-                            # Only show non-zero values
-                            display_val = diff_val if diff_val not in ["0", "", "0.0"] else ""
-                            self.main_history_table.setItem(row_idx, 1 + max_meters + i, QTableWidgetItem(display_val))
+                            columns[1 + i].append(meter_val if meter_val not in ["0", "", "0.0"] else "")
+                            columns[1 + max_meters + i].append(diff_val if diff_val not in ["0", "", "0.0"] else "")
                         
-                        # Set fixed columns after meters/diffs
+                        # Fixed columns after meters/diffs
                         base_col = 1 + max_meters * 2
                         # Handle column name variations between CSV and expected names
-                        total_unit_cost = get_csv_value(row, "Total Unit Cost", "") or get_csv_value(row, "Total Unit", "0")
-                        total_diff_units = get_csv_value(row, "Total Diff Units", "") or get_csv_value(row, "Total Diff", "0")
-                        per_unit_cost = get_csv_value(row, "Per Unit Cost", "0")
-                        added_amount = get_csv_value(row, "Added Amount", "0")
+                        columns[base_col + 0].append(get_csv_value(row, "Total Unit Cost", "") or get_csv_value(row, "Total Unit", "0"))
+                        columns[base_col + 1].append(get_csv_value(row, "Total Diff Units", "") or get_csv_value(row, "Total Diff", "0"))
+                        columns[base_col + 2].append(get_csv_value(row, "Per Unit Cost", "0"))
+                        columns[base_col + 3].append(get_csv_value(row, "Added Amount", "0"))
                         # Use "In Total" specifically for the main table's grand total
-                        grand_total = get_csv_value(row, "In Total", "0") 
-                        
-                        self.main_history_table.setItem(row_idx, base_col + 0, QTableWidgetItem(total_unit_cost))
-                        self.main_history_table.setItem(row_idx, base_col + 1, QTableWidgetItem(total_diff_units))
-                        self.main_history_table.setItem(row_idx, base_col + 2, QTableWidgetItem(per_unit_cost))
-                        self.main_history_table.setItem(row_idx, base_col + 3, QTableWidgetItem(added_amount))
-                        self.main_history_table.setItem(row_idx, base_col + 4, QTableWidgetItem(grand_total))
+                        columns[base_col + 4].append(get_csv_value(row, "In Total", "0"))
+
+                    self.main_history_model.set_columns(
+                        columns, row_data=row_ids,
+                        sort_keys={0: [self._month_sort_key(m['month'], m['year']) for m in filtered_main_rows]},
+                    )
 
                 # Load room history data using the chronologically prepared list
                 if all_room_rows_sorted_with_context:
-                    self.room_history_table.setRowCount(len(all_room_rows_sorted_with_context))
-                    
-                    for row_idx, room_entry in enumerate(all_room_rows_sorted_with_context):
-                        room_csv_data = room_entry['csv_row']
-                        month_year_str = f"{room_entry['month']} {room_entry['year']}"
-                        
-                        room_name = get_csv_value(room_csv_data, "Room Name", "")
-                        present_unit = get_csv_value(room_csv_data, "Present Unit", "0")
-                        previous_unit = get_csv_value(room_csv_data, "Previous Unit", "0")
-                        real_unit = get_csv_value(room_csv_data, "Real Unit", "0")
-                        unit_bill = get_csv_value(room_csv_data, "Unit Bill", "0")
-                        gas_bill = get_csv_value(room_csv_data, "Gas Bill", "0")
-                        water_bill = get_csv_value(room_csv_data, "Water Bill", "0")
-                        house_rent = get_csv_value(room_csv_data, "House Rent", "0")
-                        grand_total = get_csv_value(room_csv_data, "Grand Total", "0")
-                        
-                        self.room_history_table.setItem(row_idx, 0, QTableWidgetItem(month_year_str))
-                        self.room_history_table.setItem(row_idx, 1, QTableWidgetItem(room_name))
-                        self.room_history_table.setItem(row_idx, 2, QTableWidgetItem(present_unit))
-                        self.room_history_table.setItem(row_idx, 3, QTableWidgetItem(previous_unit))
-                        self.room_history_table.setItem(row_idx, 4, QTableWidgetItem(real_unit))
-                        self.room_history_table.setItem(row_idx, 5, QTableWidgetItem(unit_bill))
-                        self.room_history_table.setItem(row_idx, 6, QTableWidgetItem(gas_bill))
-                        self.room_history_table.setItem(row_idx, 7, QTableWidgetItem(water_bill))
-                        self.room_history_table.setItem(row_idx, 8, QTableWidgetItem(house_rent))
-                        self.room_history_table.setItem(row_idx, 9, QTableWidgetItem(grand_total))
+                    room_columns = [[f"{entry['month']} {entry['year']}" for entry in all_room_rows_sorted_with_context]]
+                    room_columns.append([get_csv_value(entry['csv_row'], "Room Name", "") for entry in all_room_rows_sorted_with_context])
+                    for header in ("Present Unit", "Previous Unit", "Real Unit", "Unit Bill", "Gas Bill",
+                                   "Water Bill", "House Rent", "Grand Total"):
+                        room_columns.append([get_csv_value(entry['csv_row'], header, "0") for entry in all_room_rows_sorted_with_context])
+                    self.room_history_model.set_columns(
+                        room_columns,
+                        sort_keys={0: [self._month_sort_key(e['month'], e['year']) for e in all_room_rows_sorted_with_context]},
+                    )
 
                 # Calculate and display totals using the filtered main rows instead of all room rows
                 self.calculate_and_display_totals_from_main_rows(filtered_main_rows, get_csv_value)
 
                 # Resize tables to fit content after loading data
                 self.resize_table_to_content(self.main_history_table)
-                self.resize_table_to_content(self.room_history_table)
+                self.resize_table_to_content(self.room_history_table, max_rows=self.ROOM_TABLE_VISIBLE_ROWS)
                 self.resize_table_to_content(self.totals_table)
 
                 if not filtered_main_rows:
@@ -788,149 +806,311 @@ class HistoryTab(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Load History Error", f"Failed to load history from CSV: {e}\n{traceback.format_exc()}")
 
-    def load_history_tables_from_supabase(self, month_filter: str | None, year_filter: int | None):
+    def load_history_tables_from_supabase(self, month_filter: str | None, year_filter: int | None, silent: bool = False):
+        """:param silent: See :meth:`load_history`."""
         if not self.main_window.supabase_manager.is_client_initialized() or not self.main_window.check_internet_connectivity():
-            QMessageBox.warning(self, "Error", "Supabase not configured or no internet.")
+            if silent:
+                print("History not reloaded: Supabase not configured or no internet.")
+            else:
+                QMessageBox.warning(self, "Error", "Supabase not configured or no internet.")
             return
 
+        # Pass None for month/year if "All" is selected or if it's the default 0 for year
+        actual_month_filter = None if month_filter == "All" else month_filter
+        actual_year_filter = None if year_filter == 0 else year_filter
+
+        # self.clear_history_tables()  # Clear tables before loading | this is the buggy line
+        # Directly clear the tables instead of calling a separate method.
+        # A silent reload keeps the current rows on screen until the first page replaces them.
+        if not silent:
+            self.main_history_model.clear()
+            self.room_history_model.clear()
+            self.totals_model.clear()
+
+        # Drop any load still streaming so its pages don't mix with this one
+        previous_worker = getattr(self, "_history_worker", None)
+        if previous_worker is not None and previous_worker.isRunning():
+            previous_worker.requestInterruption()
+            previous_worker.disconnect()
+
+        # Months arrive a page at a time (rooms embedded); the tables are redrawn as each lands
+        self._cloud_history = []
+        self._cloud_history_filters = (actual_month_filter, actual_year_filter)
+        self._history_load_silent = silent
+        self._history_first_page = True
+        self._history_worker = FetchSupabaseHistoryWorker(
+            self.main_window.supabase_manager, month=actual_month_filter, year=actual_year_filter, parent=self
+        )
+        self._history_worker.page_fetched.connect(self._on_history_page_fetched)
+        self._history_worker.history_fetched.connect(self._on_history_fetched)
+        self._history_worker.error_occurred.connect(self._on_history_fetch_error)
+        self._history_worker.start()
+        self._fetch_cloud_totals()
+
+    def _fetch_cloud_totals(self):
+        """Asks Supabase for the totals table's sums, so it need not wait for (or add up) every room row."""
+        self._cloud_totals = None
+        previous_worker = getattr(self, "_totals_worker", None)
+        if previous_worker is not None and previous_worker.isRunning():
+            previous_worker.requestInterruption()
+            previous_worker.disconnect()
+        month_filter, year_filter = self._cloud_history_filters
+        self._totals_worker = FetchMonthlyTotalsWorker(
+            self.main_window.supabase_manager, month=month_filter, year=year_filter, parent=self
+        )
+        self._totals_worker.totals_fetched.connect(self._on_cloud_totals_fetched)
+        self._totals_worker.start()
+
+    def _on_cloud_totals_fetched(self, totals):
+        if totals is None or self.main_window.load_history_source_combo.currentText() != "Load from Cloud":
+            return  # Not deployed or failed: the totals keep being summed from the loaded rooms
+        self._cloud_totals = totals
+        self._display_history_totals()
+        self.resize_table_to_content(self.totals_table)
+
+    def _on_history_page_fetched(self, page: list):
+        # A month Realtime inserted while the history was streaming is already here
+        loaded_ids = {calc.get("id") for calc in self._cloud_history}
+        page = [calc for calc in page if calc.get("id") not in loaded_ids]
+        self._cloud_history.extend(page)
         try:
-            # Use the unified get_main_calculations which can handle filters or return all
-            # Pass None for month/year if "All" is selected or if it's the default 0 for year
-            actual_month_filter = None if month_filter == "All" else month_filter
-            actual_year_filter = None if year_filter == 0 else year_filter
-
-            # self.clear_history_tables()  # Clear tables before loading | this is the buggy line
-            # Directly clear the tables instead of calling a separate method
-            self.main_history_table.setRowCount(0)
-            self.room_history_table.setRowCount(0)
-            self.totals_table.setRowCount(0)
-
-            main_calculations = self.main_window.supabase_manager.get_main_calculations(
-                month=actual_month_filter,
-                year=actual_year_filter
+            # The first page replaces what is on screen; later ones are added to it
+            if self._history_first_page:
+                self._history_first_page = False
+                self.display_supabase_history(self._cloud_history)
+            else:
+                self._append_supabase_history(page)
+        except Exception as e:
+            if self._history_load_silent:
+                print(f"Error reloading history from Supabase: {e}\n{traceback.format_exc()}")
+            else:
+                QMessageBox.critical(self, "Load History Error", f"An unexpected error occurred loading history from Supabase: {e}\n{traceback.format_exc()}")
+
+    def _on_history_fetched(self, main_calculations: list):
+        if self._history_load_silent:
+            if not main_calculations:
+                self.display_supabase_history(self._cloud_history)  # No page came to replace the rows on screen
+            return
+        room_count = sum(len(calc.get("room_calculations", [])) for calc in main_calculations)
+        QMessageBox.information(self, "Load Successful", f"Loaded {len(main_calculations)} main records and {room_count} room records from Supabase.")
+
+    def _on_history_fetch_error(self, message: str):
+        if self._history_load_silent:
+            print(f"Error reloading history from Supabase: {message}")
+        else:
+            QMessageBox.critical(self, "Load History Error", f"An unexpected error occurred loading history from Supabase: {message}")
+        # Clear tables on error to avoid displaying partial data
+        self.main_history_model.clear()
+        self.room_history_model.clear()
+        self._cloud_totals = None
+        self.calculate_and_display_totals_from_supabase_records([], []) # Clear totals
+
+    def apply_cloud_change(self, table: str, event: str, record: dict, old_record: dict):
+        """
+        Applies one Realtime change of a main_calculations or room_calculations row to the
+        months on screen, then redraws from memory; nothing is fetched again.
+        """
+        if self._cloud_history is None or self.main_window.load_history_source_combo.currentText() != "Load from Cloud":
+            return
+        row = record if event != "DELETE" else old_record
+
+        if table == "main_calculations":
+            existing = next((calc for calc in self._cloud_history if calc.get("id") == row.get("id")), None)
+            month_filter, year_filter = self._cloud_history_filters
+            in_view = (
+                event != "DELETE"
+                and (month_filter is None or record.get("month") == month_filter)
+                and (year_filter is None or record.get("year") == year_filter)
             )
+            if not in_view:
+                if existing is not None:
+                    self._cloud_history.remove(existing)
+            elif existing is not None:
+                existing.update(month=record.get("month"), year=record.get("year"), main_data=record.get("main_data") or {})
+            else:
+                self._cloud_history.append({
+                    "id": record.get("id"),
+                    "month": record.get("month"),
+                    "year": record.get("year"),
+                    "main_data": record.get("main_data") or {},
+                    "room_calculations": [],  # Its rooms arrive as room_calculations inserts
+                })
 
-            # NEW: Sort the results chronologically so that months appear in natural order
-            if main_calculations:
-                main_calculations.sort(
-                    key=lambda m: (
-                        m.get("year", 0),
-                        self.MONTH_ORDER.get(m.get("month", ""), 0)
-                    )
+        elif table == "room_calculations":
+            room = {
+                "id": row.get("id"),
+                "room_data": row.get("room_data", {}),
+                "photo_url": row.get("photo_url"),
+                "nid_front_url": row.get("nid_front_url"),
+                "nid_back_url": row.get("nid_back_url"),
+                "police_form_url": row.get("police_form_url"),
+            }
+            for calc in self._cloud_history:
+                rooms = calc.get("room_calculations", [])
+                index = next((i for i, r in enumerate(rooms) if r.get("id") == room["id"]), None)
+                if index is not None and (event == "DELETE" or calc.get("id") != row.get("main_calculation_id")):
+                    del rooms[index]
+                elif event != "DELETE" and calc.get("id") == row.get("main_calculation_id"):
+                    if index is None:
+                        rooms.append(room)
+                    else:
+                        rooms[index] = room
+        else:
+            return
+
+        # A saved month arrives as one main row plus a burst of room rows; redraw once for all of them
+        if not self._history_render_pending:
+            self._history_render_pending = True
+            QTimer.singleShot(100, self._render_cloud_history)
+
+    def _render_cloud_history(self):
+        self._history_render_pending = False
+        if self._cloud_history is not None and self.main_window.load_history_source_combo.currentText() == "Load from Cloud":
+            # The server totals are outdated now; sum the rows in memory until fresh ones arrive
+            self._fetch_cloud_totals()
+            self.display_supabase_history(self._cloud_history)
+
+    def display_supabase_history(self, main_calculations: list[dict]):
+        """Fill the main, room and totals tables from Supabase history records."""
+        # NEW: Sort the results chronologically so that months appear in natural order
+        if main_calculations:
+            main_calculations.sort(
+                key=lambda m: (
+                    m.get("year", 0),
+                    self.MONTH_ORDER.get(m.get("month", ""), 0)
                 )
+            )
 
-            # Build room rows AFTER sorting main_calculations so room data follows the same order
-            all_room_rows = []
-            for main_calc in main_calculations:
-                main_calc_id = main_calc.get("id")
-                if main_calc_id:
-                    room_records = self.main_window.supabase_manager.get_room_calculations(main_calc_id)
-                    
-                    # Add parent month/year context to each room record
-                    for room in room_records:
-                        room['month'] = main_calc.get('month')
-                        room['year'] = main_calc.get('year')
-                    
-                    all_room_rows.extend(room_records)
+        main_datas, max_meters, room_columns, room_month_keys, all_room_rows = self._history_rows(main_calculations)
+        self.set_main_history_table_columns(max_meters)
+        self._history_meters = max_meters
 
-            if main_calculations:
-                self.main_history_table.setRowCount(len(main_calculations))
-                
-                # Determine max_meters from the fetched data
-                max_meters = 3 # default
-                for calc in main_calculations:
-                    main_data = calc.get("main_data", {})
-                    if isinstance(main_data, str):
-                        try:
-                            main_data = json.loads(main_data)
-                        except json.JSONDecodeError:
-                            main_data = {}
-                    
-                    for i in range(10):
-                        meter_key = f"meter_{i+1}"
-                        diff_key = f"diff_{i+1}"
-                        if main_data.get(meter_key) or main_data.get(diff_key):
-                            max_meters = max(max_meters, i + 1)
-                
-                self.set_main_history_table_columns(max_meters)
+        if main_calculations:
+            self.main_history_model.set_columns(
+                self._main_history_columns(main_calculations, main_datas, max_meters),
+                row_data=[calc.get("id") for calc in main_calculations],  # The correct id for each row
+                sort_keys={0: [self._month_sort_key(c.get("month"), c.get("year")) for c in main_calculations]},
+            )
+        else:
+            self.main_history_model.clear()
 
-                for row_idx, calc in enumerate(main_calculations):
-                    main_data = calc.get("main_data", {})
-                    # Handle if main_data is a JSON string
-                    if isinstance(main_data, str):
-                        try:
-                            main_data = json.loads(main_data)
-                        except json.JSONDecodeError:
-                            main_data = {}
-
-                    month_year = f"{calc.get('month', 'N/A')} {calc.get('year', 'N/A')}"
-                    month_item = QTableWidgetItem(month_year)
-                    row_calc_id = calc.get("id")
-                    month_item.setData(Qt.UserRole, row_calc_id)  # Store the correct id for this row
-                    self.main_history_table.setItem(row_idx, 0, month_item)
-
-                    for i in range(max_meters):
-                        meter_val = str(main_data.get(f"meter_{i+1}", ""))
-                        diff_val = str(main_data.get(f"diff_{i+1}", ""))
-                        self.main_history_table.setItem(row_idx, 1 + i, QTableWidgetItem(meter_val))
-                        self.main_history_table.setItem(row_idx, 1 + max_meters + i, QTableWidgetItem(diff_val))
-
-                    base_col = 1 + max_meters * 2
-                    self.main_history_table.setItem(row_idx, base_col + 0, QTableWidgetItem(str(main_data.get("total_unit_cost", ""))))
-                    self.main_history_table.setItem(row_idx, base_col + 1, QTableWidgetItem(str(main_data.get("total_diff_units", ""))))
-                    self.main_history_table.setItem(row_idx, base_col + 2, QTableWidgetItem(str(main_data.get("per_unit_cost", ""))))
-                    self.main_history_table.setItem(row_idx, base_col + 3, QTableWidgetItem(str(main_data.get("added_amount", ""))))
-                    self.main_history_table.setItem(row_idx, base_col + 4, QTableWidgetItem(str(main_data.get("grand_total", ""))))
-
-            if all_room_rows:
-                # Ensure room rows follow the same chronological order
-                all_room_rows.sort(
-                    key=lambda r: (
-                        r.get("year", 0),
-                        self.MONTH_ORDER.get(r.get("month", ""), 0)
-                    )
-                )
+        self.room_history_model.set_columns(room_columns, sort_keys={0: room_month_keys})
 
-                self.room_history_table.setRowCount(len(all_room_rows))
-                
-                for row_idx, room in enumerate(all_room_rows):
+        self.calculate_and_display_totals_from_supabase_records(main_calculations, all_room_rows)
+        
+        # Resize tables to fit content
+        self.resize_table_to_content(self.main_history_table)
+        self.resize_table_to_content(self.room_history_table, max_rows=self.ROOM_TABLE_VISIBLE_ROWS)
+        self.resize_table_to_content(self.totals_table)
+
+    def _append_supabase_history(self, main_calculations: list[dict]):
+        """Adds one streamed page of months to the tables, which already show the earlier pages."""
+        main_datas, max_meters, room_columns, room_month_keys, room_rows = self._history_rows(main_calculations)
+        if max_meters > self._history_meters:
+            # The main table needs more meter columns: lay everything out again
+            self.display_supabase_history(self._cloud_history)
+            return
+
+        # The models keep the rows in month order (see init), wherever a page's months fall
+        self.main_history_model.append_columns(
+            self._main_history_columns(main_calculations, main_datas, self._history_meters),
+            row_data=[calc.get("id") for calc in main_calculations],
+            sort_keys={0: [self._month_sort_key(c.get("month"), c.get("year")) for c in main_calculations]},
+        )
+        self.room_history_model.append_columns(room_columns, sort_keys={0: room_month_keys})
+
+        self._add_room_totals(room_rows)
+        self._display_history_totals()
+
+        self.resize_table_to_content(self.main_history_table)
+        self.resize_table_to_content(self.room_history_table, max_rows=self.ROOM_TABLE_VISIBLE_ROWS)
+        self.resize_table_to_content(self.totals_table)
+
+    def _history_rows(self, main_calculations: list[dict]):
+        """
+        Parses Supabase history records for the tables. Cells reference the records' own
+        values; the models format only what is on screen.
+        :return: ``(main_datas, max_meters, room_columns, room_month_keys, room_rows)``.
+        """
+        all_room_rows = []
+        room_datas = []
+        room_months = []
+        room_month_keys = []
+        main_datas = []
+        for main_calc in main_calculations:
+            main_data = main_calc.get("main_data", {})
+            # Handle if main_data is a JSON string
+            if isinstance(main_data, str):
+                try:
+                    main_data = json.loads(main_data)
+                except json.JSONDecodeError:
+                    main_data = {}
+            main_datas.append(main_data)
+            if main_calc.get("id"):
+                room_records = main_calc.get("room_calculations", [])
+                month_label = f"{main_calc.get('month', 'N/A')} {main_calc.get('year', 'N/A')}"
+                month_key = self._month_sort_key(main_calc.get("month"), main_calc.get("year"))
+
+                # Add parent month/year context to each room record
+                for room in room_records:
+                    room['month'] = main_calc.get('month')
+                    room['year'] = main_calc.get('year')
                     room_data = room.get("room_data", {})
                     if isinstance(room_data, str):
                         try:
                             room_data = json.loads(room_data)
                         except json.JSONDecodeError:
                             room_data = {}
-                    
-                    month_year = f"{room.get('month', 'N/A')} {room.get('year', 'N/A')}"
-
-                    self.room_history_table.setItem(row_idx, 0, QTableWidgetItem(month_year))
-                    self.room_history_table.setItem(row_idx, 1, QTableWidgetItem(str(room_data.get("room_name", ""))))
-                    self.room_history_table.setItem(row_idx, 2, QTableWidgetItem(str(room_data.get("present_unit", ""))))
-                    self.room_history_table.setItem(row_idx, 3, QTableWidgetItem(str(room_data.get("previous_unit", ""))))
-                    self.room_history_table.setItem(row_idx, 4, QTableWidgetItem(str(room_data.get("real_unit", ""))))
-                    self.room_history_table.setItem(row_idx, 5, QTableWidgetItem(str(room_data.get("unit_bill", ""))))
-                    self.room_history_table.setItem(row_idx, 6, QTableWidgetItem(str(room_data.get("gas_bill", ""))))
-                    self.room_history_table.setItem(row_idx, 7, QTableWidgetItem(str(room_data.get("water_bill", ""))))
-                    self.room_history_table.setItem(row_idx, 8, QTableWidgetItem(str(room_data.get("house_rent", ""))))
-                    self.room_history_table.setItem(row_idx, 9, QTableWidgetItem(str(room_data.get("grand_total", ""))))
-
-            self.calculate_and_display_totals_from_supabase_records(main_calculations, all_room_rows)
-            
-            # Resize tables to fit content
-            self.resize_table_to_content(self.main_history_table)
-            self.resize_table_to_content(self.room_history_table)
-            self.resize_table_to_content(self.totals_table)
-
-            QMessageBox.information(self, "Load Successful", f"Loaded {len(main_calculations)} main records and {len(all_room_rows)} room records from Supabase.")
-
-        except Exception as e:
-            QMessageBox.critical(self, "Load History Error", f"An unexpected error occurred loading history from Supabase: {e}\n{traceback.format_exc()}")
-            # Clear tables on error to avoid displaying partial data
-            self.calculate_and_display_totals_from_supabase_records([], []) # Clear totals
+                    room_datas.append(room_data)
+                    room_months.append(month_label)  # One shared string per month
+                    room_month_keys.append(month_key)
+                
+                all_room_rows.extend(room_records)
+
+        # Determine max_meters from the fetched data
+        max_meters = 3 # default
+        for main_data in main_datas:
+            for i in range(10):
+                if main_data.get(f"meter_{i+1}") or main_data.get(f"diff_{i+1}"):
+                    max_meters = max(max_meters, i + 1)
+
+        room_columns = [room_months] + [[rd.get(key, "") for rd in room_datas] for key in self.ROOM_DATA_KEYS]
+        return main_datas, max_meters, room_columns, room_month_keys, all_room_rows
+
+    @staticmethod
+    def _main_history_columns(main_calculations: list[dict], main_datas: list[dict], max_meters: int) -> list[list]:
+        columns = [[f"{calc.get('month', 'N/A')} {calc.get('year', 'N/A')}" for calc in main_calculations]]
+        columns += [[md.get(f"meter_{i+1}", "") for md in main_datas] for i in range(max_meters)]
+        columns += [[md.get(f"diff_{i+1}", "") for md in main_datas] for i in range(max_meters)]
+        for key in ("total_unit_cost", "total_diff_units", "per_unit_cost", "added_amount", "grand_total"):
+            columns.append([md.get(key, "") for md in main_datas])
+        return columns
+
+    def _month_sort_key(self, month, year) -> int:
+        """Chronological sort key of a (month name, year) pair."""
+        try:
+            return int(year) * 100 + self.MONTH_ORDER.get(month, 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def _show_totals(self, totals: list[tuple]):
+        """Fills the totals table with ``(month_label, house, water, gas, unit)`` rows."""
+        def month_key(label):
+            parts = label.split()
+            return self._month_sort_key(parts[0], parts[1]) if len(parts) == 2 else 0
+        self.totals_model.set_columns(
+            [list(column) for column in zip(*totals)] if totals else [[] for _ in self.TOTALS_COLUMNS],
+            sort_keys={0: [month_key(row[0]) for row in totals]},
+        )
 
     def calculate_and_display_totals_from_supabase_records(self, main_calculations: list[dict], all_room_rows: list[dict]):
-        grouped = {}
-        for room in all_room_rows:
+        self._room_totals = {}
+        self._add_room_totals(all_room_rows)
+        self._display_history_totals()
+
+    def _add_room_totals(self, room_rows: list[dict]):
+        """Adds *room_rows* to the per-month sums of the loaded rooms."""
+        for room in room_rows:
             month = room.get("month")
             year = room.get("year")
             key = f"{month} {year}" if (month and year) else "Unknown"
@@ -943,13 +1123,32 @@ class HistoryTab(QWidget):
                     room_data = {}
 
             try:
-                grp = grouped.setdefault(key, {"house":0.0,"water":0.0,"gas":0.0,"unit":0.0})
-                grp["house"] += float(room_data.get("house_rent", 0) or 0)
-                grp["water"] += float(room_data.get("water_bill", 0) or 0)
-                grp["gas"]   += float(room_data.get("gas_bill", 0) or 0)
-                grp["unit"]  += float(room_data.get("unit_bill", 0) or 0)
+                house = float(room_data.get("house_rent", 0) or 0)
+                water = float(room_data.get("water_bill", 0) or 0)
+                gas = float(room_data.get("gas_bill", 0) or 0)
+                unit = float(room_data.get("unit_bill", 0) or 0)
             except (ValueError, TypeError):
                 continue
+            grp = self._room_totals.setdefault(key, {"house":0.0,"water":0.0,"gas":0.0,"unit":0.0})
+            grp["house"] += house
+            grp["water"] += water
+            grp["gas"]   += gas
+            grp["unit"]  += unit
+
+    def _display_history_totals(self):
+        """Shows the server's monthly totals if they have arrived, else the sums of the loaded rooms."""
+        grouped = self._room_totals
+        if self._cloud_totals is not None:
+            # Summed by the history_monthly_totals RPC over the whole filtered history
+            grouped = {}
+            for row in self._cloud_totals:
+                key = f"{row.get('month')} {row.get('year')}" if (row.get("month") and row.get("year")) else "Unknown"
+                grouped[key] = {
+                    "house": float(row.get("house_rent") or 0),
+                    "water": float(row.get("water_bill") or 0),
+                    "gas": float(row.get("gas_bill") or 0),
+                    "unit": float(row.get("unit_bill") or 0),
+                }
 
         # sort keys by year then month
         def month_key(m):
@@ -959,23 +1158,14 @@ class HistoryTab(QWidget):
             return (0,0)
         skeys=sorted(grouped.keys(), key=month_key)
 
-        self.totals_table.setRowCount(len(skeys))
-        for idx,k in enumerate(skeys):
-            self.totals_table.setItem(idx,0,QTableWidgetItem(k))
-            t=grouped[k]
-            self.totals_table.setItem(idx,1,QTableWidgetItem(f"{t['house']:.2f}"))
-            self.totals_table.setItem(idx,2,QTableWidgetItem(f"{t['water']:.2f}"))
-            self.totals_table.setItem(idx,3,QTableWidgetItem(f"{t['gas']:.2f}"))
-            self.totals_table.setItem(idx,4,QTableWidgetItem(f"{t['unit']:.2f}"))
+        self._show_totals([(k, grouped[k]["house"], grouped[k]["water"], grouped[k]["gas"], grouped[k]["unit"]) for k in skeys])
 
     def handle_edit_selected_record(self):
-        selected_items = self.main_history_table.selectedItems()
-        if not selected_items:
+        selected_rows = self.main_history_table.selectionModel().selectedRows()
+        if not selected_rows:
             QMessageBox.information(self, "No Selection", "Please select a record to edit.")
             return
-        selected_row = selected_items[0].row()
-        month_item = self.main_history_table.item(selected_row, 0)
-        record_id = month_item.data(Qt.UserRole) if month_item else None
+        record_id = selected_rows[0].data(Qt.UserRole)
         
         if record_id:
             if self.main_window.load_history_source_combo.currentText() == "Load from Cloud":
@@ -986,14 +1176,11 @@ class HistoryTab(QWidget):
             QMessageBox.warning(self, "No Record ID", "Record ID not found for selection.")
 
     def handle_delete_selected_record(self):
-        selected_items = self.main_history_table.selectedItems()
-        if not selected_items:
+        selected_rows = self.main_history_table.selectionModel().selectedRows()
+        if not selected_rows:
             QMessageBox.information(self, "No Selection", "Please select a record to delete.")
             return
-        selected_row = selected_items[0].row()
-        first_item_in_row = self.main_history_table.item(selected_row, 0)
-        if not first_item_in_row: return
-        record_id = first_item_in_row.data(Qt.UserRole)
+        record_id = selected_rows[0].data(Qt.UserRole)
         if record_id:
             if self.main_window.load_history_source_combo.currentText() == "Load from Cloud":
                 self.handle_delete_record(record_id)
@@ -1071,71 +1258,45 @@ class HistoryTab(QWidget):
                 return (0,0)
             skeys=sorted(grouped.keys(), key=month_key)
 
-            self.totals_table.setRowCount(len(skeys))
-            for idx,k in enumerate(skeys):
-                self.totals_table.setItem(idx,0,QTableWidgetItem(k))
-                t=grouped[k]
-                self.totals_table.setItem(idx,1,QTableWidgetItem(f"{t['house']:.2f}"))
-                self.totals_table.setItem(idx,2,QTableWidgetItem(f"{t['water']:.2f}"))
-                self.totals_table.setItem(idx,3,QTableWidgetItem(f"{t['gas']:.2f}"))
-                self.totals_table.setItem(idx,4,QTableWidgetItem(f"{t['unit']:.2f}"))
+            self._show_totals([(k, grouped[k]["house"], grouped[k]["water"], grouped[k]["gas"], grouped[k]["unit"]) for k in skeys])
             
         except Exception as e:
             # If there's an error calculating totals, just clear the table
-            self.totals_table.setRowCount(0)
+            self.totals_model.clear()
             print(f"Error calculating totals: {e}")
 
     def calculate_and_display_totals_from_main_rows(self, filtered_main_rows, get_csv_value):
         """Calculate and display totals from filtered main calculation rows"""
         try:
-            # Clear existing totals
-            self.totals_table.setRowCount(0)
-            
-            if not filtered_main_rows:
-                return
-            
-            # Set the number of rows to match the number of filtered main rows
-            self.totals_table.setRowCount(len(filtered_main_rows))
-            
+            totals = []
             # Add totals for each main calculation row
-            for row_idx, main_row_data in enumerate(filtered_main_rows):
+            for main_row_data in filtered_main_rows:
                 row = main_row_data['csv_row']
                 
-                # Set the month/year in the first column
+                # The month/year goes in the first column
                 month_year_str = f"{main_row_data['month']} {main_row_data['year']}"
-                self.totals_table.setItem(row_idx, 0, QTableWidgetItem(month_year_str))
                 
                 # Extract pre-calculated totals from the main calculation row
-                csv_total_house_rent = get_csv_value(row, "Total House Rent", "0")
-                csv_total_water_bill = get_csv_value(row, "Total Water Bill", "0")
-                csv_total_gas_bill = get_csv_value(row, "Total Gas Bill", "0")
-                csv_total_unit_bill = get_csv_value(row, "Total Room Unit Bill", "0")
-                
-                # Set the totals for this row (shifted by 1 column due to month column)
                 try:
-                    house_rent = float(csv_total_house_rent or "0")
-                    water_bill = float(csv_total_water_bill or "0")
-                    gas_bill = float(csv_total_gas_bill or "0")
-                    unit_bill = float(csv_total_unit_bill or "0")
-                    
-                    self.totals_table.setItem(row_idx, 1, QTableWidgetItem(f"{house_rent:.2f}"))
-                    self.totals_table.setItem(row_idx, 2, QTableWidgetItem(f"{water_bill:.2f}"))
-                    self.totals_table.setItem(row_idx, 3, QTableWidgetItem(f"{gas_bill:.2f}"))
-                    self.totals_table.setItem(row_idx, 4, QTableWidgetItem(f"{unit_bill:.2f}"))
+                    totals.append((
+                        month_year_str,
+                        float(get_csv_value(row, "Total House Rent", "0") or "0"),
+                        float(get_csv_value(row, "Total Water Bill", "0") or "0"),
+                        float(get_csv_value(row, "Total Gas Bill", "0") or "0"),
+                        float(get_csv_value(row, "Total Room Unit Bill", "0") or "0"),
+                    ))
                 except (ValueError, TypeError):
-                    # If conversion fails, set zeros for this row
-                    self.totals_table.setItem(row_idx, 1, QTableWidgetItem("0.00"))
-                    self.totals_table.setItem(row_idx, 2, QTableWidgetItem("0.00"))
-                    self.totals_table.setItem(row_idx, 3, QTableWidgetItem("0.00"))
-                    self.totals_table.setItem(row_idx, 4, QTableWidgetItem("0.00"))
+                    # If conversion fails, show zeros for this row
+                    totals.append((month_year_str, 0.0, 0.0, 0.0, 0.0))
+
+            self._show_totals(totals)
             
         except Exception as e:
             # If there's an error calculating totals, just clear the table
-            self.totals_table.setRowCount(0)
+            self.totals_model.clear()
             print(f"Error calculating totals from main rows: {e}")
 
 
-
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     class DummyMainWindow(QWidget): # Using QWidget for simplicity in dummy
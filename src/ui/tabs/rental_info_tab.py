@@ -4,11 +4,9 @@ import os
 import io # Import the io module for in-memory binary streams
 from datetime import datetime
 from pathlib import Path # Import Path from pathlib
-import shutil # Import shutil for file operations
-import uuid # Import uuid for generating unique filenames
 import urllib.parse
 import re
-import requests  # Used for downloading remote images
+import uuid
 
 # Suppress SSL certificate warnings when verify=False is used in requests
 try:
@@ -19,10 +17,10 @@ except ModuleNotFoundError:
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 from PyQt5.QtCore import Qt, QRegExp, QEvent
-from PyQt5.QtGui import QIcon, QRegExpValidator, QPixmap # Keep QPixmap for _validate_image_file
+from PyQt5.QtGui import QIcon, QRegExpValidator, QImageReader
 from reportlab.lib.utils import ImageReader # Added ImageReader
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
     QGridLayout, QGroupBox, QFormLayout, QMessageBox, QSizePolicy, QDialog,
     QFileDialog, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView,
     QComboBox, QCheckBox, QProgressDialog
@@ -41,9 +39,15 @@ from src.ui.styles import (
     get_checkbox_style
 )
 from src.core.utils import resource_path, _clear_layout
+from src.core.image_store import ImageStore, RENTAL_IMAGE_COLUMNS
+from src.core.http_cache import default_http_cache
+from src.core.outbox import OP_SAVE_RENTAL, rental_key
+from src.core.rental_transfer import images_dir_for
 from src.ui.custom_widgets import CustomLineEdit, AutoScrollArea, CustomNavButton, FluentProgressDialog
 from src.ui.dialogs import RentalRecordDialog
-from src.ui.background_workers import FetchSupabaseRentalRecordsWorker
+from src.ui.background_workers import FetchSupabaseRentalRecordsWorker, RentalTransferWorker, ImageIngestWorker
+from src.ui.image_ingest import ImageIngest
+from src.ui.thumbnail_cache import ThumbnailCache
 # >>> ADD
 # Fluent-widgets progress bar
 try:
@@ -76,9 +80,16 @@ class RentalInfoTab(QWidget):
             self.IMAGE_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
         except Exception as dir_e:
             print(f"Warning: could not create image storage dir: {dir_e}")
+        # Content-addressed store: identical images share one file under IMAGE_STORAGE_DIR
+        # Images named by queued cloud saves stay referenced until the outbox has uploaded them
+        self.image_store = ImageStore(self.IMAGE_STORAGE_DIR, self.db_manager, outbox=self.main_window.outbox)
+        # Picked documents are downscaled and re-encoded before they are stored or uploaded
+        self.image_ingest = ImageIngest(self.image_store)
+        self._ingest_workers = {}  # image_type -> ImageIngestWorker still processing a pick
         # Inline progress bar reference (for cloud fetch)
         self._inline_progress_bar = None
         # <<< ADD
+        self._transfer_progress = None  # QProgressDialog shown during bulk import/export
 
         self.tenant_name_input = None
         self.room_number_input = None
@@ -87,6 +98,7 @@ class RentalInfoTab(QWidget):
         self.nid_front_path_label = None
         self.nid_back_path_label = None
         self.police_form_path_label = None
+        self.keep_originals_checkbox = None
         self.rental_records_table = None
 
         self.current_rental_id = None  # Local DB primary key (if editing an existing record)
@@ -95,6 +107,13 @@ class RentalInfoTab(QWidget):
 
         self.init_ui()
         self.setup_db_table()
+        try:
+            # Drop stored images left behind by cleared forms or deleted records, with their thumbnails
+            removed = self.image_store.collect_garbage()
+            self.image_ingest.prune_originals()
+            ThumbnailCache().prune(removed_digests={ImageStore.digest_of(path) for path in removed} - {None})
+        except Exception as gc_e:
+            print(f"Warning: image store garbage collection failed: {gc_e}")
         self.load_rental_records() # Initial load will be from default source
 
     def init_ui(self):
@@ -200,6 +219,14 @@ class RentalInfoTab(QWidget):
         image_upload_layout.addWidget(self.police_form_path_label, 3, 0)
         image_upload_layout.addWidget(upload_police_form_btn, 3, 1)
 
+        self.keep_originals_checkbox = QCheckBox("Keep full-size originals")
+        self.keep_originals_checkbox.setStyleSheet(get_checkbox_style())
+        self.keep_originals_checkbox.setToolTip(
+            "Documents are stored and uploaded downscaled; also keep the untouched file in data/originals."
+        )
+        self.keep_originals_checkbox.toggled.connect(lambda checked: setattr(self.image_ingest, "keep_originals", checked))
+        image_upload_layout.addWidget(self.keep_originals_checkbox, 4, 0, 1, 2)
+
         left_column_layout.addWidget(image_upload_group)
 
         # Save Options Group
@@ -270,10 +297,38 @@ class RentalInfoTab(QWidget):
         self.rental_records_table.setHorizontalHeaderLabels(["ID", "Tenant Name", "Room Number", "Advanced Paid", "Created At", "Updated At"])
         self.rental_records_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.rental_records_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        # Ctrl/Shift-click selects several records for the bulk actions below
+        self.rental_records_table.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.rental_records_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.rental_records_table.setStyleSheet(get_table_style())
         self.rental_records_table.clicked.connect(self.show_record_details_dialog)
         table_layout.addWidget(self.rental_records_table)
+
+        # Bulk actions on the selected rows
+        bulk_buttons_layout = QHBoxLayout()
+        self.archive_selected_btn = QPushButton("Archive Selected")
+        self.archive_selected_btn.setStyleSheet(get_button_style())
+        self.archive_selected_btn.clicked.connect(self.archive_selected_records)
+        bulk_buttons_layout.addWidget(self.archive_selected_btn)
+
+        self.delete_selected_btn = QPushButton("Delete Selected")
+        self.delete_selected_btn.setStyleSheet(get_button_style().replace("#059669", "#dc3545").replace("#047857", "#c82333")) # Red color
+        self.delete_selected_btn.clicked.connect(self.delete_selected_records)
+        bulk_buttons_layout.addWidget(self.delete_selected_btn)
+        table_layout.addLayout(bulk_buttons_layout)
+
+        # Bulk import / export of the local rentals table (JSON Lines or CSV)
+        transfer_buttons_layout = QHBoxLayout()
+        self.import_records_btn = QPushButton("Import Records")
+        self.import_records_btn.setStyleSheet(get_button_style())
+        self.import_records_btn.clicked.connect(self.import_rental_records)
+        transfer_buttons_layout.addWidget(self.import_records_btn)
+
+        self.export_records_btn = QPushButton("Export Records")
+        self.export_records_btn.setStyleSheet(get_button_style())
+        self.export_records_btn.clicked.connect(self.export_rental_records)
+        transfer_buttons_layout.addWidget(self.export_records_btn)
+        table_layout.addLayout(transfer_buttons_layout)
         
         right_column_layout.addWidget(table_group)
         main_horizontal_layout.addLayout(right_column_layout)
@@ -301,42 +356,37 @@ class RentalInfoTab(QWidget):
                 QMessageBox.warning(self, "Invalid File", "The selected file is not a valid image.")
                 return
 
-            # Ensure the image storage directory exists
-            self.IMAGE_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
-
-            try:
-                # Generate a unique filename to avoid collisions
-                original_filename = Path(file_path).name
-                file_extension = Path(file_path).suffix
-                unique_filename = f"{uuid.uuid4()}{file_extension}"
-                destination_path = self.IMAGE_STORAGE_DIR / unique_filename
-
-                # Copy the file to the application's image storage directory
-                shutil.copy2(file_path, destination_path)
-                
-                # Update the label with the new internal path
-                if image_type == "photo":
-                    self.photo_path_label.setText(str(destination_path))
-                elif image_type == "nid_front":
-                    self.nid_front_path_label.setText(str(destination_path))
-                elif image_type == "nid_back":
-                    self.nid_back_path_label.setText(str(destination_path))
-                elif image_type == "police_form":
-                    self.police_form_path_label.setText(str(destination_path))
-                
-                QMessageBox.information(self, "Image Uploaded", f"Image copied to application data: {destination_path.name}")
-
-            except Exception as e:
-                QMessageBox.critical(self, "File Copy Error", f"Failed to copy image: {e}\n{traceback.format_exc()}")
-                # Reset label if copy fails
-                if image_type == "photo":
-                    self.photo_path_label.setText("No file selected")
-                elif image_type == "nid_front":
-                    self.nid_front_path_label.setText("No file selected")
-                elif image_type == "nid_back":
-                    self.nid_back_path_label.setText("No file selected")
-                elif image_type == "police_form":
-                    self.police_form_path_label.setText("No file selected")
+            # Downscale and store off the GUI thread; the label shows the stored copy once it is ready
+            self._path_label_for(image_type).setText("Processing image...")
+            worker = ImageIngestWorker(self.image_ingest, image_type, file_path, parent=self)
+            worker.image_ingested.connect(self._on_image_ingested)
+            worker.error_occurred.connect(self._on_image_ingest_error)
+            self._ingest_workers[image_type] = worker
+            worker.start()
+
+    def _path_label_for(self, image_type):
+        return {
+            "photo": self.photo_path_label,
+            "nid_front": self.nid_front_path_label,
+            "nid_back": self.nid_back_path_label,
+            "police_form": self.police_form_path_label,
+        }[image_type]
+
+    def _on_image_ingested(self, image_type, stored_path):
+        if self._ingest_workers.get(image_type) is not self.sender():
+            return  # Superseded by a newer pick, or the form was cleared meanwhile
+        del self._ingest_workers[image_type]
+        # Update the label with the new internal path
+        self._path_label_for(image_type).setText(stored_path)
+        QMessageBox.information(self, "Image Uploaded", f"Image copied to application data: {Path(stored_path).name}")
+
+    def _on_image_ingest_error(self, image_type, message):
+        if self._ingest_workers.get(image_type) is not self.sender():
+            return
+        del self._ingest_workers[image_type]
+        # Reset label if copy fails
+        self._path_label_for(image_type).setText("No file selected")
+        QMessageBox.critical(self, "File Copy Error", f"Failed to copy image: {message}")
 
     def save_rental_record(self):
         tenant_name = self.tenant_name_input.text().strip()
@@ -348,6 +398,10 @@ class RentalInfoTab(QWidget):
         nid_back_path = self.nid_back_path_label.text()
         police_form_path = self.police_form_path_label.text()
 
+        if self._ingest_workers:
+            QMessageBox.information(self, "Images Processing", "Please wait until the selected images have been processed.")
+            return
+
         save_to_pc = self.save_to_pc_checkbox.isChecked()
         save_to_cloud = self.save_to_cloud_checkbox.isChecked()
 
@@ -375,6 +429,11 @@ class RentalInfoTab(QWidget):
             "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "is_archived": 1 if self.current_is_archived else 0
         }
+
+        # New cloud records get their supabase_id up front: it links the local row to the
+        # cloud row before the queued upload has run and makes replaying the upload idempotent.
+        if save_to_cloud and not record_data["supabase_id"]:
+            record_data["supabase_id"] = str(uuid.uuid4())
         
         # >>> ADD
         # If saving to PC, make sure any remote URLs are cached locally so the
@@ -393,13 +452,18 @@ class RentalInfoTab(QWidget):
         if save_to_pc:
             try:
                 if self.current_rental_id:
+                    # Remember the images this row pointed at so blobs it no longer uses can be released
+                    old_row = self.db_manager.execute_query(
+                        f"SELECT {', '.join(RENTAL_IMAGE_COLUMNS)} FROM rentals WHERE id = ?",
+                        (self.current_rental_id,), fetch_one=True
+                    )
                     update_query = """
                         UPDATE rentals SET
                             tenant_name = :tenant_name, room_number = :room_number,
                             advanced_paid = :advanced_paid, photo_path = :photo_path,
                             nid_front_path = :nid_front_path, nid_back_path = :nid_back_path,
                             police_form_path = :police_form_path, updated_at = :updated_at,
-                            is_archived = :is_archived
+                            is_archived = :is_archived, supabase_id = COALESCE(:supabase_id, supabase_id)
                         WHERE id = :id
                     """
                     self.db_manager.execute_query(update_query, local_record_data)
@@ -410,6 +474,8 @@ class RentalInfoTab(QWidget):
                         except Exception as ins_e:
                             print(f"Local insert fallback failed: {ins_e}")
                             local_save_success = False
+                    if old_row:
+                        self.image_store.release(list(old_row))
                 else:
                     self.db_manager.insert_rental_record(local_record_data)
                 print("Record saved to local DB successfully.")
@@ -426,16 +492,19 @@ class RentalInfoTab(QWidget):
                         "nid_back": record_data.get("nid_back_path"),
                         "police_form": record_data.get("police_form_path"),
                     }
-                    result = self.main_window.supabase_manager.save_rental_record(record_data, image_paths)
-                    if isinstance(result, str) and "Successfully" in result:
-                        print("Record saved to Supabase successfully.")
-                    else:
-                        cloud_save_success = False
-                        QMessageBox.critical(self, "Supabase Error", f"Failed to save record to Supabase: {result}")
-
+                    # Queued in the outbox and uploaded in the background (now or once online);
+                    # further edits of this tenant before then replace the queued upload.
+                    supabase_id = record_data["supabase_id"]
+                    self.main_window.queue_cloud_write(
+                        OP_SAVE_RENTAL,
+                        {"record_data": record_data, "image_paths": image_paths},
+                        coalesce_key=rental_key(supabase_id),
+                        idempotency_key=supabase_id,
+                    )
+                    print("Record queued for upload to Supabase.")
                 except Exception as e:
                     cloud_save_success = False
-                    QMessageBox.critical(self, "Supabase Error", f"Failed to save record to Supabase: {e}\n{traceback.format_exc()}")
+                    QMessageBox.critical(self, "Supabase Error", f"Failed to queue record for Supabase: {e}\n{traceback.format_exc()}")
             else:
                 cloud_save_success = False
                 QMessageBox.warning(self, "Supabase Error", "Supabase client not initialized. Cannot save to cloud.")
@@ -498,12 +567,19 @@ class RentalInfoTab(QWidget):
         # Disable source combo to prevent re-entrancy
         self.load_source_combo.setEnabled(False)
 
-        # Start the background worker
+        # A refresh while an earlier fetch is still streaming must not append its pages or finish this one's progress bar
+        previous_worker = getattr(self, "_fetch_worker", None)
+        if previous_worker is not None and previous_worker.isRunning():
+            previous_worker.requestInterruption()
+            previous_worker.disconnect()
+
+        # Start the background worker; pages are appended as they arrive, so the first rows show while the rest load
+        self.rental_records_table.setRowCount(0)
         self._fetch_worker = FetchSupabaseRentalRecordsWorker(
             self.main_window.supabase_manager, is_archived=False, parent=self
         )
-        self._fetch_worker.records_fetched.connect(
-            lambda recs: self._on_cloud_records_ready(recs, selected_source)
+        self._fetch_worker.page_fetched.connect(
+            lambda page: self._on_cloud_records_ready(page, selected_source)
         )
         self._fetch_worker.error_occurred.connect(self._on_cloud_records_error)
         self._fetch_worker.finished.connect(self._on_cloud_records_finished)
@@ -513,12 +589,9 @@ class RentalInfoTab(QWidget):
     # Background-worker callbacks
     # ------------------------------------------------------------------
 
-    def _on_cloud_records_ready(self, records, source):
-        """Handle successful retrieval of records."""
-        if not records:
-            # Message already displayed by caller (load_rental_records or worker callback)
-            return
-        self._populate_rental_table(source, records)
+    def _on_cloud_records_ready(self, page, source):
+        """Append one page of cloud records to the table."""
+        self._populate_rental_table(source, page, append=True)
 
     def _on_cloud_records_error(self, message: str):
         QMessageBox.critical(self, "Cloud DB Error", f"Failed to load rental records from Supabase: {message}")
@@ -542,47 +615,200 @@ class RentalInfoTab(QWidget):
             self._inline_progress_bar = None
         # <<< MODIFY
 
+    # ------------------------------------------------------------------
+    # Bulk import / export (local DB)
+    # ------------------------------------------------------------------
+
+    def export_rental_records(self):
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Rental Records", "rental_records.jsonl",
+            "JSON Lines (*.jsonl);;CSV Files (*.csv)"
+        )
+        if file_path:
+            self._start_rental_transfer("export", file_path)
+
+    def import_rental_records(self):
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Import Rental Records", "",
+            "Rental Exports (*.jsonl *.ndjson *.csv);;All Files (*)"
+        )
+        if file_path:
+            self._start_rental_transfer("import", file_path)
+
+    def _start_rental_transfer(self, mode: str, file_path: str):
+        """Run an import/export on a worker thread and mirror its progress in a dialog."""
+        self.import_records_btn.setEnabled(False)
+        self.export_records_btn.setEnabled(False)
+
+        self._transfer_progress = QProgressDialog(
+            f"{'Importing' if mode == 'import' else 'Exporting'} rental records…", None, 0, 100, self
+        )
+        self._transfer_progress.setWindowTitle("Rental Records")
+        self._transfer_progress.setWindowModality(Qt.WindowModal)
+        self._transfer_progress.setMinimumDuration(0)
+        self._transfer_progress.setValue(0)
+
+        self._transfer_worker = RentalTransferWorker(
+            self.db_manager.db_name, file_path, mode=mode, image_dir=self.IMAGE_STORAGE_DIR, parent=self
+        )
+        self._transfer_worker.progress.connect(self._on_transfer_progress)
+        self._transfer_worker.transfer_done.connect(lambda count, errors: self._on_transfer_done(mode, file_path, count, errors))
+        self._transfer_worker.error_occurred.connect(self._on_transfer_error)
+        self._transfer_worker.finished.connect(self._on_transfer_finished)
+        self._transfer_worker.start()
+
+    def _on_transfer_progress(self, done: int, total: int):
+        if self._transfer_progress is not None and total > 0:
+            self._transfer_progress.setValue(min(int(done * 100 / total), 100))
+
+    def _on_transfer_done(self, mode: str, file_path: str, count: int, errors: list):
+        if mode == "import":
+            message = f"Imported {count} records from {os.path.basename(file_path)}."
+            if errors:
+                message += f" {len(errors)} rows were skipped (first: {errors[0]})."
+            QMessageBox.information(self, "Import Complete", message)
+            self.main_window.refresh_all_rental_tabs()
+        else:
+            message = f"Exported {count} records to {file_path}."
+            images_dir = images_dir_for(file_path)
+            if os.path.isdir(images_dir):
+                message += f" Their images are in {images_dir}; keep that folder next to the export."
+            QMessageBox.information(self, "Export Complete", message)
+
+    def _on_transfer_error(self, message: str):
+        QMessageBox.critical(self, "Transfer Error", f"Rental record transfer failed: {message}")
+
+    def _on_transfer_finished(self):
+        if self._transfer_progress is not None:
+            self._transfer_progress.close()
+            self._transfer_progress = None
+        self.import_records_btn.setEnabled(True)
+        self.export_records_btn.setEnabled(True)
+
     # ------------------------------------------------------------------
     # Helper to populate table (shared between local & cloud paths)  
     # ------------------------------------------------------------------
 
-    def _populate_rental_table(self, source_label: str, records: list):
+    def _populate_rental_table(self, source_label: str, records: list, append: bool = False):
         """Fill the QTableWidget with rental records."""
         if not records:
             # Message already displayed by caller (load_rental_records or worker callback)
             return
 
-        self.rental_records_table.setRowCount(len(records))
+        first_row = self.rental_records_table.rowCount() if append else 0
+        self.rental_records_table.setRowCount(first_row + len(records))
 
-        for row_idx, record in enumerate(records):
-            if source_label == "Local DB":
-                # SQLite tuple; keep same unpacking as before
-                display_id, tenant_name, room_number, advanced_paid, created_at, updated_at = (
-                    record[0], record[1], record[2], record[3], record[4], record[5]
-                )
-                full_record_data = record  # full tuple
-            else:  # Cloud (Supabase) -> dict
-                display_id = record.get("id")
-                tenant_name = record.get("tenant_name")
-                room_number = record.get("room_number")
-                advanced_paid = record.get("advanced_paid")
-                created_at = record.get("created_at")
-                updated_at = record.get("updated_at")
-                full_record_data = record
-
-            self.rental_records_table.setItem(row_idx, 0, QTableWidgetItem(str(display_id)))
-            self.rental_records_table.setItem(row_idx, 1, QTableWidgetItem(str(tenant_name)))
-            self.rental_records_table.setItem(row_idx, 2, QTableWidgetItem(str(room_number)))
-            self.rental_records_table.setItem(row_idx, 3, QTableWidgetItem(str(advanced_paid)))
-            self.rental_records_table.setItem(row_idx, 4, QTableWidgetItem(str(created_at)))
-            self.rental_records_table.setItem(row_idx, 5, QTableWidgetItem(str(updated_at)))
-
-            # Attach raw data for later dialog
-            self.rental_records_table.item(row_idx, 0).setData(Qt.UserRole, full_record_data)
+        for row_idx, record in enumerate(records, start=first_row):
+            self._set_rental_row(row_idx, source_label, record)
+
+    def _set_rental_row(self, row_idx: int, source_label: str, record):
+        if source_label == "Local DB":
+            # SQLite tuple; keep same unpacking as before
+            display_id, tenant_name, room_number, advanced_paid, created_at, updated_at = (
+                record[0], record[1], record[2], record[3], record[4], record[5]
+            )
+            full_record_data = record  # full tuple
+        else:  # Cloud (Supabase) -> dict
+            display_id = record.get("id")
+            tenant_name = record.get("tenant_name")
+            room_number = record.get("room_number")
+            advanced_paid = record.get("advanced_paid")
+            created_at = record.get("created_at")
+            updated_at = record.get("updated_at")
+            full_record_data = record
+
+        self.rental_records_table.setItem(row_idx, 0, QTableWidgetItem(str(display_id)))
+        self.rental_records_table.setItem(row_idx, 1, QTableWidgetItem(str(tenant_name)))
+        self.rental_records_table.setItem(row_idx, 2, QTableWidgetItem(str(room_number)))
+        self.rental_records_table.setItem(row_idx, 3, QTableWidgetItem(str(advanced_paid)))
+        self.rental_records_table.setItem(row_idx, 4, QTableWidgetItem(str(created_at)))
+        self.rental_records_table.setItem(row_idx, 5, QTableWidgetItem(str(updated_at)))
+
+        # Attach raw data for later dialog
+        self.rental_records_table.item(row_idx, 0).setData(Qt.UserRole, full_record_data)
+
+    def apply_cloud_change(self, event: str, record: dict, old_record: dict):
+        """
+        Applies one Realtime change of a rental_records row in place while the table shows
+        cloud records, instead of reloading it. Rows whose archive flag changed move between
+        this tab and the archived tab.
+        """
+        if self.load_source_combo.currentText() != "Cloud (Supabase)":
+            return
+        record_id = str((record or old_record).get("id"))
+        row = next(
+            (r for r in range(self.rental_records_table.rowCount())
+             if self.rental_records_table.item(r, 0) and self.rental_records_table.item(r, 0).text() == record_id),
+            None,
+        )
+        belongs_here = event != "DELETE" and not record.get("is_archived")
+        if not belongs_here:
+            if row is not None:
+                self.rental_records_table.removeRow(row)
+            return
+        if row is None:
+            # Keep the newest-first order of the cloud query
+            created_at = str(record.get("created_at"))
+            row = next(
+                (r for r in range(self.rental_records_table.rowCount())
+                 if self.rental_records_table.item(r, 4) and self.rental_records_table.item(r, 4).text() < created_at),
+                self.rental_records_table.rowCount(),
+            )
+            self.rental_records_table.insertRow(row)
+        self._set_rental_row(row, "Cloud (Supabase)", record)
+
+    def _selected_records(self) -> list[dict]:
+        """Records of the selected rows as dicts (local rows are stored as sqlite rows)."""
+        records = []
+        for index in self.rental_records_table.selectionModel().selectedRows():
+            item = self.rental_records_table.item(index.row(), 0)
+            record_data = item.data(Qt.UserRole) if item else None
+            if not record_data:
+                continue
+            records.append(dict(record_data) if isinstance(record_data, dict) else {key: record_data[key] for key in record_data.keys()})
+        return records
+
+    def archive_selected_records(self):
+        records = self._selected_records()
+        if not records:
+            QMessageBox.information(self, "No Selection", "Select one or more records first (Ctrl/Shift-click to select several).")
+            return
+        source = self.load_source_combo.currentText()
+        reply = QMessageBox.question(self, "Confirm Archive",
+                                     f"Archive {len(records)} selected record(s) in {source}?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            changed = self.main_window.archive_rental_records(records, True, source)
+            QMessageBox.information(self, "Success", f"{changed} record(s) archived" + (" (queued for Supabase)." if source != "Local DB" else "."))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to archive records: {e}")
+            traceback.print_exc()
+
+    def delete_selected_records(self):
+        records = self._selected_records()
+        if not records:
+            QMessageBox.information(self, "No Selection", "Select one or more records first (Ctrl/Shift-click to select several).")
+            return
+        source = self.load_source_combo.currentText()
+        reply = QMessageBox.question(self, "Confirm Delete",
+                                     f"Are you sure you want to delete {len(records)} selected record(s) from {source}?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        try:
+            deleted = self.main_window.delete_rental_records(records, source)
+            QMessageBox.information(self, "Success", f"{deleted} record(s) deleted" + (" (queued for Supabase)." if source != "Local DB" else "."))
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to delete records: {e}")
+            traceback.print_exc()
 
     def show_record_details_dialog(self, index):
         if not index.isValid():
             return
+        if QApplication.keyboardModifiers() & (Qt.ControlModifier | Qt.ShiftModifier):
+            return  # Extending the selection, not opening a record
             
         selected_row = index.row()
         if selected_row < 0 or selected_row >= self.rental_records_table.rowCount():
@@ -620,6 +846,13 @@ class RentalInfoTab(QWidget):
             }
         else: # Cloud (Supabase) - already a flattened dict
             record_dict = record_data
+            if "photo_url" not in record_dict:
+                # List rows are summaries; fetch the image URLs only now that the record is opened
+                full_record = self.main_window.supabase_manager.get_rental_record(record_dict.get("id"))
+                if not full_record:
+                    QMessageBox.warning(self, "Error", "Unable to load the full record from Supabase. Please try again.")
+                    return
+                record_dict.update(full_record)
             # Ensure local paths are empty strings if not present, as dialog expects paths
             record_dict["photo_path"] = record_dict.get("photo_url", "")
             record_dict["nid_front_path"] = record_dict.get("nid_front_url", "")
@@ -649,6 +882,7 @@ class RentalInfoTab(QWidget):
         self.current_supabase_id = record_data.get("supabase_id") # Supabase ID
         # Store archive status so we can retain it during save
         self.current_is_archived = bool(record_data.get("is_archived", False))
+        self._ingest_workers.clear()  # Images still processing belonged to the previous form
 
         self.tenant_name_input.setText(record_data.get("tenant_name", ""))
         self.room_number_input.setText(record_data.get("room_number", ""))
@@ -664,6 +898,7 @@ class RentalInfoTab(QWidget):
         self.tenant_name_input.setFocus() # Set focus back to the form
 
     def clear_form(self):
+        self._ingest_workers.clear()  # Results of picks still processing are dropped
         self.tenant_name_input.clear()
         self.room_number_input.clear()
         self.advanced_paid_input.clear()
@@ -769,38 +1004,19 @@ class RentalInfoTab(QWidget):
         return any(self._rel_to(resolved_path_norm, Path(os.path.normcase(str(sd)))) for sd in self.SAFE_DIRS)
 
     def _validate_image_file(self, file_path):
-        """Validate that the file is actually an image"""
+        """Validate that the file is actually an image (reads the header only; decoding happens in ImageIngestWorker)"""
         try:
-            pixmap = QPixmap(file_path)
-            return not pixmap.isNull()
+            return QImageReader(file_path).canRead()
         except Exception:
             return False
 
     def _scale_image(self, image_path, max_width_points, max_height_points):
-        # If the path is a URL, download to temp file first
+        # If the path is a URL, use the on-disk HTTP cache (downloads only when the copy is stale)
         if image_path and str(image_path).startswith("http"):
             try:
-                import requests, tempfile, urllib.parse, os as _os
-
-                # Parse the URL to safely extract the file extension (ignore query params)
-                parsed = urllib.parse.urlparse(image_path)
-                url_path = parsed.path  # e.g. "/storage/v1/object/public/..../image.jpg"
-                _root, ext = _os.path.splitext(url_path)
-                # Fallback to .jpg if extension missing or contains illegal chars (e.g. '.jpg?')
-                if not ext or any(c in ext for c in "?&#%"):
-                    ext = ".jpg"
-
-                # Disable TLS certificate verification to avoid failures in bundled executables
-                r = requests.get(image_path, timeout=10, verify=False)
-                if r.status_code == 200:
-                    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=ext)
-                    tmp.write(r.content)
-                    tmp.close()
-                    image_path = tmp.name
-                    # temp files are considered safe
-                    safe_bypass = True
-                else:
-                    return None, 0, 0
+                image_path = str(default_http_cache().fetch(image_path, timeout=10))
+                # cached downloads are considered safe
+                safe_bypass = True
             except Exception as url_exc:
                 print(f"Error downloading image {image_path}: {url_exc}")
                 return None, 0, 0
@@ -1030,28 +1246,15 @@ class RentalInfoTab(QWidget):
             return None
 
     def _ensure_local_copy(self, path_str: str | None) -> str | None:
-        """If *path_str* is an http/https URL, download it into IMAGE_STORAGE_DIR
-        and return the local file path. Otherwise return *path_str* unchanged.
+        """If *path_str* is an http/https URL, make sure its content is in the image
+        store and return the local blob path. Otherwise return *path_str* unchanged.
+        Content that is already stored is not downloaded again.
         """
         if not path_str or not path_str.lower().startswith("http"):
             return path_str  # Already local (or empty)
 
         try:
-            # Ensure storage dir exists
-            self.IMAGE_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
-
-            # Derive file extension from URL path or default to .img
-            parsed = urllib.parse.urlparse(path_str)
-            ext = Path(parsed.path).suffix or ".img"
-            local_name = f"{uuid.uuid4()}{ext}"
-            dest = self.IMAGE_STORAGE_DIR / local_name
-
-            if not dest.exists():
-                resp = requests.get(path_str, timeout=15, verify=False)
-                resp.raise_for_status()
-                dest.write_bytes(resp.content)
-                print(f"Downloaded remote image to {dest}")
-            return str(dest)
+            return str(self.image_store.add_url(path_str))
         except Exception as dl_exc:
             # If download fails keep original URL so record isn't lost
             print(f"Warning: could not cache remote image {path_str}: {dl_exc}")
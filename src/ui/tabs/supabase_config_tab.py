@@ -13,6 +13,7 @@ from src.ui.styles import (
     get_header_style, get_group_box_style, get_line_edit_style,
     get_button_style
 )
+from src.ui.background_workers import StorageGCWorker
 # Note: resource_path from utils might be needed if icons were used here, but they aren't in this tab.
 
 class SupabaseConfigTab(QWidget):
@@ -26,6 +27,8 @@ class SupabaseConfigTab(QWidget):
         self.toggle_url_visibility_button = None
         self.toggle_key_visibility_button = None
         self.save_supabase_config_button = None
+        self.storage_gc_button = None
+        self._storage_gc_worker = None
 
         self.init_ui()
 
@@ -87,6 +90,20 @@ class SupabaseConfigTab(QWidget):
         self.save_supabase_config_button.clicked.connect(self.save_supabase_config)
         layout.addWidget(self.save_supabase_config_button)
 
+        maintenance_group = QGroupBox("Storage Maintenance")
+        maintenance_group.setStyleSheet(get_group_box_style())
+        maintenance_layout = QVBoxLayout(maintenance_group)
+        self.storage_gc_button = QPushButton("Clean Up Unused Cloud Images")
+        self.storage_gc_button.setStyleSheet(get_button_style())
+        self.storage_gc_button.setFixedHeight(40)
+        self.storage_gc_button.setToolTip(
+            "Finds images in Supabase Storage that no rental record or room calculation uses any more, "
+            "and removes them after confirmation."
+        )
+        self.storage_gc_button.clicked.connect(lambda: self.collect_storage_garbage(dry_run=True))
+        maintenance_layout.addWidget(self.storage_gc_button)
+        layout.addWidget(maintenance_group)
+
         layout.addStretch(1) # Push content to the top
         self.setLayout(layout)
 
@@ -155,6 +172,47 @@ class SupabaseConfigTab(QWidget):
             logging.exception("An unexpected error occurred while saving Supabase config")
             QMessageBox.critical(self, "Save Error", f"An unexpected error occurred: {e}")
 
+    def collect_storage_garbage(self, dry_run=True):
+        """Sweeps Supabase Storage for orphaned images; a dry run first reports how many would go."""
+        if not self.main_window.supabase_manager.is_client_initialized():
+            QMessageBox.warning(self, "Supabase Not Configured", "Connect to Supabase before cleaning up cloud images.")
+            return
+        if self._storage_gc_worker is not None and self._storage_gc_worker.isRunning():
+            return
+        self.storage_gc_button.setEnabled(False)
+        self.storage_gc_button.setText("Scanning Cloud Images..." if dry_run else "Removing Cloud Images...")
+        self._storage_gc_worker = StorageGCWorker(
+            self.main_window.supabase_manager, self.main_window.db_manager.db_name, dry_run=dry_run, parent=self
+        )
+        self._storage_gc_worker.gc_done.connect(lambda orphans: self._on_storage_gc_done(orphans, dry_run))
+        self._storage_gc_worker.error_occurred.connect(self._on_storage_gc_error)
+        self._storage_gc_worker.start()
+
+    def _reset_storage_gc_button(self):
+        self.storage_gc_button.setEnabled(True)
+        self.storage_gc_button.setText("Clean Up Unused Cloud Images")
+
+    def _on_storage_gc_done(self, orphans, dry_run):
+        self._reset_storage_gc_button()
+        if not dry_run:
+            QMessageBox.information(self, "Cleanup Complete", f"Removed {len(orphans)} unused image(s) from Supabase Storage.")
+            return
+        if not orphans:
+            QMessageBox.information(self, "Nothing to Clean Up", "Every image in Supabase Storage is still in use.")
+            return
+        reply = QMessageBox.question(
+            self, "Remove Unused Images",
+            f"{len(orphans)} image(s) in Supabase Storage are not used by any rental record or room calculation.\n"
+            "Remove them? This cannot be undone.",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.collect_storage_garbage(dry_run=False)
+
+    def _on_storage_gc_error(self, message):
+        self._reset_storage_gc_button()
+        QMessageBox.critical(self, "Cleanup Error", f"Could not clean up cloud images:\n{message}")
+
 if __name__ == '__main__':
     # This part is for testing the SupabaseConfigTab independently if needed
     app = QApplication(sys.argv)
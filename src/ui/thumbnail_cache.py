@@ -0,0 +1,128 @@
+"""Persistent on-disk cache of document preview thumbnails.
+
+Thumbnails live in ``data/thumbnails/<key>_<w>x<h>.png``. The key is the
+image's SHA-256 when it can be read off the name (content-addressed store
+blobs and uploads); otherwise it is a hash of the source path plus its size and
+mtime, or of the URL. Generating a thumbnail decodes the source once at reduced
+size via :class:`QImageReader`; every later preview loads only the small PNG.
+
+Each preview touches its thumbnail's mtime. :meth:`ThumbnailCache.prune`, run
+with the image store's garbage collection, drops thumbnails of blobs the store
+deleted and those not shown for ``MAX_UNUSED_SECONDS``.
+
+:meth:`ThumbnailCache.generate` does blocking I/O and must be called off the
+GUI thread (see ``ThumbnailWorker``). It uses :class:`QImage`, which is safe to
+use outside the GUI thread, never :class:`QPixmap`.
+"""
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import requests
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtGui import QImageReader
+
+from src.core.http_cache import default_http_cache
+from src.core.image_store import ImageStore
+
+# Thumbnails not shown for this long are pruned; they are cheap to generate again.
+MAX_UNUSED_SECONDS = 30 * 24 * 3600
+_STALE_PART_SECONDS = 3600
+
+
+class ThumbnailCache:
+    CACHE_DIR = Path.cwd() / "data" / "thumbnails"
+
+    def __init__(self, cache_dir: str | os.PathLike | None = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else self.CACHE_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def key_for(self, source: str) -> str:
+        """Return the cache key for a local path or URL without reading its content."""
+        digest = ImageStore.digest_of(source)
+        if digest:
+            return digest
+        if str(source).lower().startswith("http"):
+            basis = f"url:{source}"
+        else:
+            stat = os.stat(source)
+            basis = f"file:{os.path.abspath(source)}:{stat.st_size}:{stat.st_mtime_ns}"
+        return hashlib.sha256(basis.encode("utf-8")).hexdigest()
+
+    def thumbnail_path(self, source: str, width: int, height: int) -> Path:
+        return self.cache_dir / f"{self.key_for(source)}_{width}x{height}.png"
+
+    def get(self, source: str, width: int, height: int) -> str | None:
+        """Return the cached thumbnail path, or None if it hasn't been generated yet."""
+        try:
+            path = self.thumbnail_path(source, width, height)
+            os.utime(path)  # Marks the thumbnail as recently shown for prune()
+        except OSError:
+            return None  # Source unreadable, or no thumbnail yet
+        return str(path)
+
+    def generate(self, source: str, width: int, height: int, timeout: int = 5) -> str | None:
+        """
+        Creates (or returns the existing) thumbnail for *source* fitted into
+        ``width`` x ``height``. Blocking; call from a worker thread.
+        :return: The thumbnail path, or None if the source could not be decoded.
+        """
+        cached = self.get(source, width, height)
+        if cached:
+            return cached
+
+        if str(source).lower().startswith("http"):
+            try:
+                reader = QImageReader(str(default_http_cache().fetch(source, timeout=timeout)))
+            except requests.RequestException as e:
+                print(f"Could not download image for thumbnail {source}: {e}")
+                return None
+        else:
+            reader = QImageReader(source)
+
+        reader.setAutoTransform(True)
+        original = reader.size()
+        if original.isValid():
+            # Let the decoder scale (JPEG decodes directly at a fraction of full size)
+            reader.setScaledSize(original.scaled(QSize(width, height), Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            print(f"Could not decode image for thumbnail {source}: {reader.errorString()}")
+            return None
+        if image.width() > width or image.height() > height:
+            image = image.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+        dest = self.thumbnail_path(source, width, height)
+        tmp = dest.with_suffix(".part")
+        if not image.save(str(tmp), "PNG"):
+            return None
+        os.replace(tmp, dest)
+        return str(dest)
+
+    def prune(self, removed_digests=(), max_unused_seconds: float = MAX_UNUSED_SECONDS) -> list[str]:
+        """
+        Deletes thumbnails of the given image digests (blobs the image store just
+        removed), thumbnails not shown for *max_unused_seconds* and stale ``.part``
+        files from interrupted writes.
+        :return: The deleted paths.
+        """
+        removed_digests = set(removed_digests)
+        now = time.time()
+        removed = []
+        for entry in self.cache_dir.iterdir():
+            try:
+                age = now - entry.stat().st_mtime
+            except OSError:
+                continue
+            if entry.suffix == ".part":
+                stale = age > _STALE_PART_SECONDS
+            else:
+                stale = entry.name.split("_", 1)[0] in removed_digests or age > max_unused_seconds
+            if stale and entry.is_file():
+                try:
+                    os.remove(entry)
+                    removed.append(str(entry))
+                except OSError as e:
+                    print(f"Warning: Failed to delete thumbnail {entry}: {e}")
+        return removed
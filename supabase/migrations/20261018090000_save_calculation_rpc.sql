@@ -0,0 +1,54 @@
+-- Saves a month's calculation in a single round trip and a single transaction.
+--
+-- The main row is upserted on (month, year) and, when p_rooms is given, the
+-- month's room rows are replaced by it. The upsert keeps the main row locked
+-- until commit, so two concurrent saves of the same month run one after the
+-- other and can never leave duplicate room rows behind.
+--
+-- Called from SupabaseManager.save_calculation via supabase.rpc("save_calculation", ...).
+
+-- The upsert needs a unique key on (month, year). If this fails, the table
+-- already holds duplicate months; delete the extra rows and re-run.
+create unique index if not exists main_calculations_month_year_key
+    on public.main_calculations (month, year);
+
+create or replace function public.save_calculation(
+    p_month text,
+    p_year integer,
+    p_main_data jsonb,
+    p_rooms jsonb default null
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_id bigint;
+begin
+    insert into public.main_calculations (month, year, main_data)
+    values (p_month, p_year, p_main_data)
+    on conflict (month, year) do update
+        set main_data = excluded.main_data
+    returning id into v_id;
+
+    -- A null room list means "main data only": leave the stored rooms alone.
+    if p_rooms is not null then
+        delete from public.room_calculations
+        where main_calculation_id = v_id;
+
+        insert into public.room_calculations
+            (main_calculation_id, room_data, photo_url, nid_front_url, nid_back_url, police_form_url)
+        select v_id, r.room_data, r.photo_url, r.nid_front_url, r.nid_back_url, r.police_form_url
+        from jsonb_to_recordset(p_rooms) as r(
+            room_data jsonb,
+            photo_url text,
+            nid_front_url text,
+            nid_back_url text,
+            police_form_url text
+        );
+    end if;
+
+    return v_id;
+end;
+$$;
+
+grant execute on function public.save_calculation(text, integer, jsonb, jsonb) to anon, authenticated;
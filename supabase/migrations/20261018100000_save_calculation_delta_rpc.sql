@@ -0,0 +1,71 @@
+-- Applies only the room rows that changed in a month, in one transaction.
+--
+-- SupabaseManager.save_calculation diffs the edited room list against the
+-- stored rows and sends just the changed/new rooms (p_room_upserts) and the ids
+-- of removed rooms (p_room_deletes), so an edit of one room's gas bill sends
+-- one small row instead of rewriting the whole month.
+--
+-- An upsert entry with an id updates that row; one without an id updates the
+-- month's room of the same room_name, or inserts it if there is none. That keeps
+-- two concurrent "add room" saves from creating duplicate rows.
+
+create or replace function public.save_calculation_delta(
+    p_month text,
+    p_year integer,
+    p_main_data jsonb,
+    p_room_upserts jsonb default '[]'::jsonb,
+    p_room_deletes bigint[] default '{}'
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_id bigint;
+    r record;
+begin
+    insert into public.main_calculations (month, year, main_data)
+    values (p_month, p_year, p_main_data)
+    on conflict (month, year) do update
+        set main_data = excluded.main_data
+    returning id into v_id;
+
+    if coalesce(array_length(p_room_deletes, 1), 0) > 0 then
+        delete from public.room_calculations
+        where main_calculation_id = v_id
+          and id = any(p_room_deletes);
+    end if;
+
+    for r in
+        select *
+        from jsonb_to_recordset(coalesce(p_room_upserts, '[]'::jsonb)) as x(
+            id bigint,
+            room_data jsonb,
+            photo_url text,
+            nid_front_url text,
+            nid_back_url text,
+            police_form_url text
+        )
+    loop
+        update public.room_calculations c
+           set room_data = r.room_data,
+               photo_url = r.photo_url,
+               nid_front_url = r.nid_front_url,
+               nid_back_url = r.nid_back_url,
+               police_form_url = r.police_form_url
+         where c.main_calculation_id = v_id
+           and (c.id = r.id
+                or (r.id is null and c.room_data->>'room_name' = r.room_data->>'room_name'));
+
+        if not found then
+            insert into public.room_calculations
+                (main_calculation_id, room_data, photo_url, nid_front_url, nid_back_url, police_form_url)
+            values
+                (v_id, r.room_data, r.photo_url, r.nid_front_url, r.nid_back_url, r.police_form_url);
+        end if;
+    end loop;
+
+    return v_id;
+end;
+$$;
+
+grant execute on function public.save_calculation_delta(text, integer, jsonb, jsonb, bigint[]) to anon, authenticated;
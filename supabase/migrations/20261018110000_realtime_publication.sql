@@ -0,0 +1,28 @@
+-- Publishes row changes of the app's tables to Supabase Realtime.
+--
+-- The desktop app subscribes to postgres_changes on these tables
+-- (src/core/realtime.py) and applies inserts, updates and deletes to the open
+-- views instead of reloading them.
+--
+-- REPLICA IDENTITY FULL makes UPDATE and DELETE events carry the old row, so a
+-- deleted room can still be matched to its month (main_calculation_id) and an
+-- archive toggle can be moved between the rental and archived views.
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['rental_records', 'main_calculations', 'room_calculations'] loop
+        if not exists (
+            select 1 from pg_publication_tables
+            where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = t
+        ) then
+            execute format('alter publication supabase_realtime add table public.%I', t);
+        end if;
+    end loop;
+end
+$$;
+
+alter table public.rental_records replica identity full;
+alter table public.main_calculations replica identity full;
+alter table public.room_calculations replica identity full;
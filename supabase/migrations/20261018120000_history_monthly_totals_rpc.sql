@@ -0,0 +1,60 @@
+-- Per-month totals of the rooms' house rent, water, gas and unit bills, summed
+-- on the server.
+--
+-- The history tab's "Total Summary" table used to download every room row and
+-- add the amounts up in Python. This returns one small row per month instead.
+--
+-- Called from SupabaseManager.get_monthly_totals via
+-- supabase.rpc("history_monthly_totals", {"p_month": ..., "p_year": ...});
+-- both filters are optional.
+
+-- room_data amounts are entered as text; anything that is not a plain number
+-- counts as 0, as the client-side sum did.
+create or replace function public.room_amount(p_room_data jsonb, p_key text)
+returns numeric
+language sql
+immutable
+as $$
+    select case
+        when trim(p_room_data->>p_key) ~ '^[-+]?([0-9]+(\.[0-9]*)?|\.[0-9]+)$'
+            then trim(p_room_data->>p_key)::numeric
+        else 0
+    end;
+$$;
+
+create or replace function public.history_monthly_totals(
+    p_month text default null,
+    p_year integer default null
+)
+returns table (
+    month text,
+    year integer,
+    house_rent numeric,
+    water_bill numeric,
+    gas_bill numeric,
+    unit_bill numeric
+)
+language sql
+stable
+as $$
+    select
+        m.month,
+        m.year,
+        sum(public.room_amount(r.room_data, 'house_rent')),
+        sum(public.room_amount(r.room_data, 'water_bill')),
+        sum(public.room_amount(r.room_data, 'gas_bill')),
+        sum(public.room_amount(r.room_data, 'unit_bill'))
+    from public.main_calculations m
+    join public.room_calculations r on r.main_calculation_id = m.id
+    where (p_month is null or m.month = p_month)
+      and (p_year is null or m.year = p_year)
+    group by m.year, m.month
+    order by m.year, m.month;
+$$;
+
+-- Served from room_calculations(main_calculation_id) rather than a scan per month.
+create index if not exists room_calculations_main_calculation_id_idx
+    on public.room_calculations (main_calculation_id);
+
+grant execute on function public.room_amount(jsonb, text) to anon, authenticated;
+grant execute on function public.history_monthly_totals(text, integer) to anon, authenticated;
@@ -0,0 +1,178 @@
+-- Diffs a month's rooms on the server, and stops pairing rooms by a shared name.
+--
+-- save_calculation used to replace all of a month's rooms, and the client
+-- fetched the stored rooms first to send only the changes through
+-- save_calculation_delta: two round trips per save. save_calculation now takes
+-- the full room list and pairs it with the stored rows itself, writing only
+-- the rows that changed, in the same single request.
+--
+-- A room is paired with a stored row by its id or, failing that, by room_name
+-- when exactly one stored row and exactly one new room carry that name. Rooms
+-- sharing a name are never paired by it (the first of two "A" rooms used to
+-- overwrite the second), so they are inserted and their old rows deleted.
+-- save_calculation_delta, kept for clients that still send deltas, follows
+-- the same rule.
+
+create or replace function public.save_calculation(
+    p_month text,
+    p_year integer,
+    p_main_data jsonb,
+    p_rooms jsonb default null
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_id bigint;
+    v_kept bigint[] := '{}';
+    v_match bigint;
+    r record;
+begin
+    insert into public.main_calculations (month, year, main_data)
+    values (p_month, p_year, p_main_data)
+    on conflict (month, year) do update
+        set main_data = excluded.main_data
+    returning id into v_id;
+
+    -- A null room list means "main data only": leave the stored rooms alone.
+    if p_rooms is null then
+        return v_id;
+    end if;
+
+    -- Rooms with an id claim their rows before any room is paired by name.
+    for r in
+        select (e.room->>'id')::bigint as id,
+               e.room->'room_data' as room_data,
+               e.room->>'photo_url' as photo_url,
+               e.room->>'nid_front_url' as nid_front_url,
+               e.room->>'nid_back_url' as nid_back_url,
+               e.room->>'police_form_url' as police_form_url
+        from jsonb_array_elements(p_rooms) with ordinality as e(room, position)
+        order by (e.room->>'id') is null, e.position
+    loop
+        v_match := null;
+        if r.id is not null then
+            select c.id into v_match
+              from public.room_calculations c
+             where c.main_calculation_id = v_id
+               and c.id = r.id;
+        elsif (select count(*)
+                 from jsonb_array_elements(p_rooms) e
+                where e->'room_data'->>'room_name' = r.room_data->>'room_name') = 1 then
+            select min(c.id) into v_match
+              from public.room_calculations c
+             where c.main_calculation_id = v_id
+               and c.room_data->>'room_name' = r.room_data->>'room_name'
+            having count(*) = 1;
+        end if;
+
+        if v_match is not null and v_match = any(v_kept) then
+            v_match := null;
+        end if;
+
+        if v_match is null then
+            insert into public.room_calculations
+                (main_calculation_id, room_data, photo_url, nid_front_url, nid_back_url, police_form_url)
+            values
+                (v_id, r.room_data, r.photo_url, r.nid_front_url, r.nid_back_url, r.police_form_url)
+            returning id into v_match;
+        else
+            update public.room_calculations c
+               set room_data = r.room_data,
+                   photo_url = r.photo_url,
+                   nid_front_url = r.nid_front_url,
+                   nid_back_url = r.nid_back_url,
+                   police_form_url = r.police_form_url
+             where c.id = v_match
+               and (c.room_data, c.photo_url, c.nid_front_url, c.nid_back_url, c.police_form_url)
+                   is distinct from
+                   (r.room_data, r.photo_url, r.nid_front_url, r.nid_back_url, r.police_form_url);
+        end if;
+        v_kept := v_kept || v_match;
+    end loop;
+
+    delete from public.room_calculations
+    where main_calculation_id = v_id
+      and id <> all(v_kept);
+
+    return v_id;
+end;
+$$;
+
+grant execute on function public.save_calculation(text, integer, jsonb, jsonb) to anon, authenticated;
+
+create or replace function public.save_calculation_delta(
+    p_month text,
+    p_year integer,
+    p_main_data jsonb,
+    p_room_upserts jsonb default '[]'::jsonb,
+    p_room_deletes bigint[] default '{}'
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_id bigint;
+    v_match bigint;
+    r record;
+begin
+    insert into public.main_calculations (month, year, main_data)
+    values (p_month, p_year, p_main_data)
+    on conflict (month, year) do update
+        set main_data = excluded.main_data
+    returning id into v_id;
+
+    if coalesce(array_length(p_room_deletes, 1), 0) > 0 then
+        delete from public.room_calculations
+        where main_calculation_id = v_id
+          and id = any(p_room_deletes);
+    end if;
+
+    for r in
+        select *
+        from jsonb_to_recordset(coalesce(p_room_upserts, '[]'::jsonb)) as x(
+            id bigint,
+            room_data jsonb,
+            photo_url text,
+            nid_front_url text,
+            nid_back_url text,
+            police_form_url text
+        )
+    loop
+        v_match := null;
+        if r.id is not null then
+            select c.id into v_match
+              from public.room_calculations c
+             where c.main_calculation_id = v_id
+               and c.id = r.id;
+        elsif (select count(*)
+                 from jsonb_array_elements(p_room_upserts) e
+                where e->'room_data'->>'room_name' = r.room_data->>'room_name') = 1 then
+            select min(c.id) into v_match
+              from public.room_calculations c
+             where c.main_calculation_id = v_id
+               and c.room_data->>'room_name' = r.room_data->>'room_name'
+            having count(*) = 1;
+        end if;
+
+        if v_match is null then
+            insert into public.room_calculations
+                (main_calculation_id, room_data, photo_url, nid_front_url, nid_back_url, police_form_url)
+            values
+                (v_id, r.room_data, r.photo_url, r.nid_front_url, r.nid_back_url, r.police_form_url);
+        else
+            update public.room_calculations c
+               set room_data = r.room_data,
+                   photo_url = r.photo_url,
+                   nid_front_url = r.nid_front_url,
+                   nid_back_url = r.nid_back_url,
+                   police_form_url = r.police_form_url
+             where c.id = v_match;
+        end if;
+    end loop;
+
+    return v_id;
+end;
+$$;
+
+grant execute on function public.save_calculation_delta(text, integer, jsonb, jsonb, bigint[]) to anon, authenticated;
@@ -0,0 +1,30 @@
+-- Stamps rental_records rows with the server time of their last write.
+--
+-- updated_at holds the time of the edit, set by the client that made it, so a
+-- row edited offline and uploaded hours later carries an old updated_at. The
+-- incremental rentals pull reads rows past a watermark; keyed on updated_at it
+-- would never see such a late upload once its watermark had moved past the
+-- edit time. changed_at is set by the database on every insert and update and
+-- is what the pull pages through; updated_at still decides which side of a
+-- conflicting edit wins.
+
+alter table public.rental_records
+    add column if not exists changed_at timestamptz not null default now();
+
+create or replace function public.touch_changed_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.changed_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists rental_records_touch_changed_at on public.rental_records;
+create trigger rental_records_touch_changed_at
+    before insert or update on public.rental_records
+    for each row execute function public.touch_changed_at();
+
+create index if not exists rental_records_changed_at_idx
+    on public.rental_records (changed_at, supabase_id);
@@ -0,0 +1,7 @@
+-- Drops save_calculation_delta.
+--
+-- The app sends a month's full room list to save_calculation, which diffs it
+-- against the stored rows itself (see 20261018130000_save_calculation_server_diff),
+-- so no client calls the delta variant any more.
+
+drop function if exists public.save_calculation_delta(text, integer, jsonb, jsonb, bigint[]);